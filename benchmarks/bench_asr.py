@@ -0,0 +1,113 @@
+"""
+Benchmark of the ASR backends: real-time factor (RTF) and word error rate (WER).
+
+The WER is measured against `data/output/transcription_texto.txt`, itself transcribed by
+whisper-large-v3 with the transformers backend, so it measures how far each backend drifts
+from the reference transcription rather than from a human one.
+
+Usage:
+    python -m benchmarks.bench_asr [--audio data/raw/original_audio_16k.f32]
+        [--backend transformers:openai/whisper-large-v3 --backend faster-whisper:large-v3 ...]
+        [--batch-size 16] [--num-threads 8]
+"""
+
+import argparse
+import re
+import time
+
+import numpy as np
+
+from desafio_hotmart.speech_to_text import ASR
+
+DEFAULT_BACKENDS = [
+    "transformers:openai/whisper-large-v3",
+    "transformers:distil-whisper/distil-large-v3",
+    "faster-whisper:large-v3",
+    "faster-whisper:distil-large-v3",
+]
+
+
+def normalize_words(text: str) -> list:
+    return re.sub(r"[^\w\s]", " ", text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """
+    Word-level Levenshtein distance divided by the number of reference words.
+    """
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    if not ref:
+        return float(len(hyp) > 0)
+
+    # Programação dinâmica linha a linha: distâncias entre ref[:i] e cada prefixo de hyp
+    distances = np.arange(len(hyp) + 1)
+    for i, ref_word in enumerate(ref, start=1):
+        previous, distances = distances, np.empty_like(distances)
+        distances[0] = i
+        substitutions = previous[:-1] + (np.array(hyp) != ref_word)
+        deletions = previous[1:] + 1
+        best = np.minimum(substitutions, deletions)
+        # Inserções dependem do valor à esquerda na mesma linha
+        for j in range(1, len(hyp) + 1):
+            distances[j] = min(best[j - 1], distances[j - 1] + 1)
+
+    return distances[-1] / len(ref)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--audio", default="data/raw/original_audio_16k.f32")
+    parser.add_argument("--reference", default="data/output/transcription_texto.txt")
+    parser.add_argument(
+        "--backend",
+        action="append",
+        metavar="BACKEND:MODEL",
+        help=f"Can be repeated. Defaults to {', '.join(DEFAULT_BACKENDS)}.",
+    )
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--num-threads", type=int, default=None)
+    parser.add_argument("--compute-type", default=None)
+    args = parser.parse_args()
+
+    with open(args.reference) as f:
+        reference = f.read()
+
+    for spec in args.backend or DEFAULT_BACKENDS:
+        backend, model_id = spec.split(":", 1)
+        asr = ASR(
+            args.audio,
+            output_path_with_ts=None,
+            output_path_text=None,
+            model_id=model_id,
+            backend=backend,
+            batch_size=args.batch_size,
+            num_threads=args.num_threads,
+            compute_type=args.compute_type,
+        )
+        audio_seconds = asr.get_audio_duration()
+
+        try:
+            start = time.perf_counter()
+            # O primeiro acesso carrega o modelo, medido à parte da transcrição
+            if backend == "transformers":
+                asr.get_backend().get_pipeline()
+            else:
+                asr.get_backend().get_model()
+            load_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            transcription = asr.speech_to_text()
+            elapsed = time.perf_counter() - start
+        except ImportError as e:
+            print(f"{spec:<50} skipped: {e}")
+            continue
+
+        rtf = f"{elapsed / audio_seconds:.3f}" if audio_seconds else "n/a"
+        print(
+            f"{spec:<50} load={load_seconds:6.1f} s  transcribe={elapsed:7.1f} s  "
+            f"RTF={rtf}  WER={word_error_rate(reference, transcription['text']):.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+End-to-end benchmark of `replace_audio`: ffmpeg stream copy vs. moviepy re-encoding.
+
+A synthetic H.264 video (test pattern + tone) and a dubbed .wav track of the same length are
+generated in a temporary directory, then muxed with each method.
+
+Usage:
+    python -m benchmarks.bench_mux [--duration 120] [--start 0]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.fixtures import make_audio, make_video
+from desafio_hotmart.video_manipulation import replace_audio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=120)
+    parser.add_argument("--start", type=float, default=0)
+    parser.add_argument("--methods", nargs="+", default=["copy", "reencode"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = os.path.join(tmp_dir, "video.mp4")
+        audio_path = os.path.join(tmp_dir, "dubbed.wav")
+        make_video(video_path, args.duration)
+        make_audio(audio_path, args.duration - args.start)
+
+        for method in args.methods:
+            output_path = os.path.join(tmp_dir, f"output_{method}.mp4")
+            start = time.perf_counter()
+            replace_audio(
+                video_path,
+                audio_path,
+                output_path,
+                args.start,
+                args.duration,
+                method=method,
+            )
+            elapsed = time.perf_counter() - start
+            print(
+                f"{method:<10}{elapsed:>8.2f} s  ({args.duration / elapsed:.1f}x realtime)"
+            )
+
+
+if __name__ == "__main__":
+    main()
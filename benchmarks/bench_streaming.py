@@ -0,0 +1,107 @@
+"""
+Benchmark of the streaming dubbing pipeline against the sequential stages, with simulated stage latencies.
+
+The ASR, the translator and the synthesizer are replaced by stand-ins that sleep for a fixed
+time per chunk, so the benchmark measures only the overlap between the stages: the
+sequential run takes the sum of the stage times, the streaming run approaches the time of
+the slowest stage.
+
+Usage:
+    python -m benchmarks.bench_streaming [--chunks 60] [--asr 0.05] [--translate 0.03] [--tts 0.08]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from desafio_hotmart.streaming import StreamingDubber
+from desafio_hotmart.timeline import AudioTimeline
+
+SAMPLE_RATE = 24000
+
+
+class SimulatedTranslator:
+    context_chunks = 0
+
+    def __init__(self, seconds_per_chunk: float):
+        self.seconds_per_chunk = seconds_per_chunk
+
+    def translate_chunks(self, chunks: list, context: list = None) -> dict:
+        time.sleep(self.seconds_per_chunk * len(chunks))
+        return dict(
+            chunks=[dict(chunk, text=chunk["text"].upper()) for chunk in chunks]
+        )
+
+
+class SimulatedSynthesizer:
+    sample_rate = SAMPLE_RATE
+
+
+class SimulatedTTS:
+    synthesizer = SimulatedSynthesizer()
+    n_workers = 1
+
+    def __init__(self, seconds_per_chunk: float):
+        self.seconds_per_chunk = seconds_per_chunk
+
+    def synthesize_chunks(self, texts: list) -> list:
+        time.sleep(self.seconds_per_chunk * len(texts))
+        return [np.full(SAMPLE_RATE, 0.1, dtype=np.float32) for _ in texts]
+
+    def fit_chunk(self, wav, source_speech_duration, source_total_duration, i=None):
+        return wav
+
+
+def transcribed_chunks(n_chunks: int, seconds_per_chunk: float):
+    for i in range(n_chunks):
+        time.sleep(seconds_per_chunk)
+        yield {"timestamp": [2.0 * i, 2.0 * i + 1.5], "text": f"chunk {i}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=60)
+    parser.add_argument("--asr", type=float, default=0.05)
+    parser.add_argument("--translate", type=float, default=0.03)
+    parser.add_argument("--tts", type=float, default=0.08)
+    args = parser.parse_args()
+
+    translator = SimulatedTranslator(args.translate)
+    tts = SimulatedTTS(args.tts)
+
+    start = time.perf_counter()
+    chunks = list(transcribed_chunks(args.chunks, args.asr))
+    translated = translator.translate_chunks(chunks)["chunks"]
+    wavs = tts.synthesize_chunks([chunk["text"] for chunk in translated])
+    timeline = AudioTimeline(0, SAMPLE_RATE)
+    for chunk, wav in zip(translated, wavs):
+        timeline.write(chunk["timestamp"][0], wav)
+    sequential = time.perf_counter() - start
+    print(
+        f"sequential: {sequential:.2f} s (first audio after {sequential:.2f} s), "
+        f"{timeline.duration_seconds:.1f} s of audio"
+    )
+
+    dubber = StreamingDubber(translator, tts)
+    timeline = dubber.run(transcribed_chunks(args.chunks, args.asr))
+    print(
+        f"streaming:  {dubber.stats['wall_time']:.2f} s "
+        f"(first audio after {dubber.stats['time_to_first_audio']:.2f} s), "
+        f"{timeline.duration_seconds:.1f} s of audio"
+    )
+    print(
+        "  busy (s): "
+        + ", ".join(
+            f"{name}={seconds:.2f}"
+            for name, seconds in dubber.stats.items()
+            if name.endswith("_busy")
+        )
+    )
+    print(
+        f"  slowest stage alone: {args.chunks * max(args.asr, args.translate, args.tts):.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark of the time-stretch backends on the chunks of the translated transcript.
+
+Every chunk of `translation_with_timestamps.json` gets a synthetic speech-like waveform
+15% longer than its original speech, which is then sped up at a rate drawn between
+`min_speed_allowed` and `max_speed_allowed`, as `TextToSpeech.speed_up` would.
+
+Usage:
+    python -m benchmarks.bench_time_stretch [--repeat 3]
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.fixtures import speech_like
+from desafio_hotmart.time_stretch import TIME_STRETCH_BACKENDS, time_stretch
+
+SAMPLE_RATE = 24000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--chunks", default="data/output/translation_with_timestamps.json"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-speed", type=float, default=1.0)
+    parser.add_argument("--max-speed", type=float, default=1.25)
+    args = parser.parse_args()
+
+    with open(args.chunks) as f:
+        chunks = json.load(f)["chunks"]
+
+    rng = np.random.default_rng(0)
+    segments = []
+    for chunk in chunks:
+        start, end = chunk["timestamp"]
+        if end is None or end <= start:
+            continue
+        wav = speech_like(1.15 * (end - start), SAMPLE_RATE, rng)
+        rate = rng.uniform(args.min_speed, args.max_speed)
+        segments.append((wav, rate))
+
+    audio_seconds = sum(len(wav) for wav, _ in segments) / SAMPLE_RATE
+    print(f"{len(segments)} segments, {audio_seconds:.1f} s of audio")
+    print(f"{'backend':<10}{'best (s)':>10}{'ms/segment':>12}{'x realtime':>12}")
+
+    for backend in TIME_STRETCH_BACKENDS:
+        runs = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for wav, rate in segments:
+                time_stretch(wav, rate, SAMPLE_RATE, backend=backend)
+            runs.append(time.perf_counter() - start)
+
+        best = min(runs)
+        print(
+            f"{backend:<10}{best:>10.3f}{1000 * best / len(segments):>12.2f}"
+            f"{audio_seconds / best:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark of the sequential, concurrent and packed OpenAI translation against the local stub server.
+
+Usage:
+    python -m benchmarks.bench_translate [--latency 0.2] [--error-rate 0.05] [--drop-rate 0.05]
+        [--concurrency 8] [--pack-max-tokens 1500]
+"""
+
+import argparse
+import os
+import time
+
+from benchmarks.openai_stub import StubOpenAIServer
+from desafio_hotmart.translate import Translator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--chunks", default="data/output/transcription_with_timestamps.json"
+    )
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--drop-rate", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests-per-minute", type=float, default=None)
+    parser.add_argument("--pack-max-tokens", type=int, default=1500)
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    server = StubOpenAIServer(
+        latency=args.latency, error_rate=args.error_rate, drop_rate=args.drop_rate
+    ).start()
+
+    try:
+        for concurrency, packed in (
+            (1, False),
+            (args.concurrency, False),
+            (args.concurrency, True),
+        ):
+            translator = Translator(
+                args.chunks,
+                "openai",
+                os.devnull,
+                os.devnull,
+                concurrency=concurrency,
+                requests_per_minute=args.requests_per_minute,
+                base_url=server.url,
+                packed=packed,
+                pack_max_tokens=args.pack_max_tokens,
+            )
+            start = time.perf_counter()
+            translated = translator.translate_chunks()
+            elapsed = time.perf_counter() - start
+
+            n_chunks = len(translated["chunks"])
+            print(
+                f"concurrency={concurrency:<3} packed={packed!s:<6} {n_chunks} chunks in {elapsed:.2f} s "
+                f"({n_chunks / elapsed:.1f} chunks/s)"
+            )
+            if translator.stats:
+                print(
+                    "  "
+                    + ", ".join(f"{k}={v:.3g}" for k, v in translator.stats.items())
+                )
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
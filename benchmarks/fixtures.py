@@ -0,0 +1,147 @@
+"""
+Synthetic, reproducible inputs for the benchmarks: speech-like audio, test-pattern videos and chunk transcripts of any length.
+
+Nothing is downloaded: the audio is generated from a seeded random generator, the video by
+ffmpeg's test sources, and the chunks are tiled from the committed transcripts
+(`data/output/transcription_with_timestamps.json`, `data/output/translation_with_timestamps.json`).
+"""
+
+import json
+from typing import List, Optional
+
+import numpy as np
+import soundfile as sf
+
+from desafio_hotmart.timestamps import normalize_chunks
+from desafio_hotmart.video_manipulation import run_ffmpeg
+
+SOURCE_CHUNKS = "data/output/transcription_with_timestamps.json"
+TRANSLATED_CHUNKS = "data/output/translation_with_timestamps.json"
+
+
+def speech_like(duration: float, sample_rate: int, rng: np.random.Generator):
+    """
+    Generate a speech-like waveform: a harmonic voice with a drifting pitch, modulated by a syllabic envelope.
+    """
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    f0 = 120 + 30 * np.sin(2 * np.pi * rng.uniform(0.3, 0.8) * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voice = sum(np.sin(h * phase) / h for h in range(1, 8))
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * rng.uniform(3, 5) * t)) ** 2
+    noise = 0.02 * rng.standard_normal(len(t))
+    return (0.2 * voice * envelope + noise).astype(np.float32)
+
+
+def speech_with_pauses(duration: float, sample_rate: int, seed: int = 0) -> np.ndarray:
+    """
+    Generate `duration` seconds of utterances (1 to 6 s) separated by pauses (0.3 to 1.2 s) with a low noise floor.
+    """
+    rng = np.random.default_rng(seed)
+    n_samples = int(duration * sample_rate)
+    wav = (0.002 * rng.standard_normal(n_samples)).astype(np.float32)
+
+    position = 0
+    while position < n_samples:
+        utterance = speech_like(rng.uniform(1, 6), sample_rate, rng)
+        end = min(position + len(utterance), n_samples)
+        wav[position:end] += utterance[: end - position]
+        position = end + int(rng.uniform(0.3, 1.2) * sample_rate)
+
+    return wav
+
+
+def make_speech_audio(
+    path: str, duration: float, sample_rate: int = 24000, seed: int = 0
+) -> None:
+    """
+    Write a mono 16-bit .wav of speech-like audio with pauses, like a dubbed track or a speaker reference.
+    """
+    sf.write(
+        path, speech_with_pauses(duration, sample_rate, seed), sample_rate, "PCM_16"
+    )
+
+
+def make_video(
+    path: str,
+    duration: float,
+    audio_path: Optional[str] = None,
+    size: str = "1280x720",
+    fps: int = 30,
+):
+    """
+    Generate an H.264/AAC video with a keyframe every 2 seconds, whose audio is `audio_path` (a tone if None).
+    """
+    audio_input = (
+        ["-i", audio_path]
+        if audio_path
+        else ["-f", "lavfi", "-i", "sine=frequency=220"]
+    )
+    run_ffmpeg(
+        [
+            "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={fps}",
+            *audio_input,
+            "-t", str(duration),
+            "-map", "0:v", "-map", "1:a",
+            "-c:v", "libx264", "-preset", "veryfast", "-g", str(2 * fps),
+            "-c:a", "aac",
+            path,
+        ]
+    )  # fmt: skip
+
+
+def make_audio(path: str, duration: float, sample_rate: int = 24000):
+    """
+    Generate a mono .wav tone, like the track exported by `TextToSpeech`.
+    """
+    run_ffmpeg(
+        [
+            "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate={sample_rate}",
+            "-t", str(duration),
+            path,
+        ]
+    )  # fmt: skip
+
+
+def fixture_chunks(path: str, duration: Optional[float] = None) -> List[dict]:
+    """
+    Load the chunks of a committed transcript, repeated back to back until they cover `duration` seconds.
+
+    Args:
+        path (str): The path of the transcript (JSON with "chunks").
+        duration (float, optional): The length to cover, in seconds. Defaults to None (the transcript as is).
+
+    Returns:
+        List[dict]: The chunks, with absolute and increasing timestamps.
+    """
+    with open(path) as f:
+        chunks = normalize_chunks(json.load(f)["chunks"])
+    if duration is None or not chunks:
+        return chunks
+
+    span = chunks[-1]["timestamp"][1]
+    tiled = []
+    offset = 0.0
+    while offset < duration:
+        for chunk in chunks:
+            start, end = chunk["timestamp"]
+            if offset + start >= duration:
+                break
+            tiled.append(
+                dict(
+                    chunk,
+                    timestamp=[offset + start, min(offset + end, duration)],
+                )
+            )
+        offset += span
+
+    return tiled
+
+
+def write_chunks(path: str, chunks: List[dict]) -> None:
+    """
+    Write chunks in the format of the pipeline's transcripts.
+    """
+    with open(path, "w") as f:
+        json.dump(
+            {"text": "".join(chunk["text"] for chunk in chunks), "chunks": chunks}, f
+        )
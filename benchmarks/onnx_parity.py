@@ -0,0 +1,171 @@
+"""
+Parity check of the ONNX Runtime backend against PyTorch, on the committed transcripts.
+
+NLLB: the chunks of `data/output/transcription_with_timestamps.json` are translated with
+the PyTorch pipeline and with the ONNX one (float32, and int8 with `--quantize`), and each
+ONNX translation is compared to the PyTorch one by word error rate (WER).
+
+XTTS vocoder: the chunks of `data/output/translation_with_timestamps.json` are synthesized
+with PyTorch while the inputs and output of the HiFi-GAN decoder are captured; the same GPT
+latents are then decoded by the ONNX graph, and the two waveforms are compared by their
+signal-to-noise ratio (SNR).
+
+The exit code is 1 when a mean WER or a minimum SNR is past its threshold.
+
+Usage:
+    python -m benchmarks.onnx_parity [--chunks 20] [--quantize] [--skip-tts]
+        [--speaker data/raw/original_audio.wav] [--max-wer 0.02] [--max-wer-int8 0.15] [--min-snr 40]
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import torch
+
+from benchmarks.bench_asr import word_error_rate
+from benchmarks.fixtures import SOURCE_CHUNKS, TRANSLATED_CHUNKS
+from desafio_hotmart.onnx_backend import ONNX_CACHE_DIR, load_xtts_vocoder
+from desafio_hotmart.translate import Translator
+
+
+def load_texts(path: str, n_chunks: int) -> list:
+    with open(path) as f:
+        chunks = json.load(f)["chunks"]
+    return [
+        chunk["text"].strip() for chunk in chunks[:n_chunks] if chunk["text"].strip()
+    ]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def nllb_parity(texts: list, args) -> list:
+    """
+    Translate the texts with PyTorch and ONNX Runtime, returning one report per ONNX variant.
+    """
+    common = dict(
+        data_with_timestamps_path=None,
+        translator="nllb",
+        output_path_json=None,
+        output_path_txt=None,
+        onnx_cache_dir=args.cache_dir,
+        intra_op_threads=args.intra_op_threads,
+        inter_op_threads=args.inter_op_threads,
+    )
+    reference, torch_seconds = timed(
+        Translator(**common).translate_batch_with_nllb, texts
+    )
+
+    reports = []
+    for quantize in (False, True) if args.quantize else (False,):
+        translator = Translator(**common, backend="onnx", quantize=quantize)
+        # A exportação (e o carregamento) fica fora da medição
+        translator.get_nllb_pipeline()
+        translations, onnx_seconds = timed(translator.translate_batch_with_nllb, texts)
+        wers = [word_error_rate(ref, hyp) for ref, hyp in zip(reference, translations)]
+        reports.append(
+            dict(
+                name="nllb:onnx" + (":int8" if quantize else ""),
+                chunks=len(texts),
+                mean_wer=float(np.mean(wers)),
+                exact_matches=sum(wer == 0 for wer in wers),
+                speedup=torch_seconds / onnx_seconds,
+                passed=float(np.mean(wers))
+                <= (args.max_wer_int8 if quantize else args.max_wer),
+            )
+        )
+    return reports
+
+
+def vocoder_parity(texts: list, args) -> dict:
+    """
+    Decode the GPT latents of each text with the PyTorch and the ONNX HiFi-GAN decoder, and compare the waveforms.
+    """
+    from desafio_hotmart.synthesis import Synthesizer
+
+    synthesizer = Synthesizer("coqui", args.speaker)
+    xtts = synthesizer.get_coqui_model().synthesizer.tts_model
+    onnx_decoder = load_xtts_vocoder(
+        xtts,
+        synthesizer.model,
+        args.cache_dir,
+        args.intra_op_threads,
+        args.inter_op_threads,
+    )
+
+    captured = []
+    handle = xtts.hifigan_decoder.register_forward_hook(
+        lambda module, inputs, kwargs, output: captured.append(
+            (inputs[0], kwargs.get("g"), output)
+        ),
+        with_kwargs=True,
+    )
+    try:
+        for text in texts:
+            synthesizer.synthesize_with_coqui(text)
+    finally:
+        handle.remove()
+
+    snrs, torch_seconds, onnx_seconds = [], 0.0, 0.0
+    with torch.inference_mode():
+        for latents, g, reference in captured:
+            _, seconds = timed(xtts.hifigan_decoder, latents, g)
+            torch_seconds += seconds
+            wav, seconds = timed(onnx_decoder, latents, g)
+            onnx_seconds += seconds
+
+            reference = reference.numpy().ravel()
+            noise = reference - wav.numpy().ravel()[: len(reference)]
+            snrs.append(
+                10 * np.log10(np.sum(reference**2) / max(np.sum(noise**2), 1e-20))
+            )
+
+    return dict(
+        name="xtts-hifigan:onnx",
+        chunks=len(captured),
+        min_snr_db=float(np.min(snrs)),
+        mean_snr_db=float(np.mean(snrs)),
+        speedup=torch_seconds / onnx_seconds,
+        passed=float(np.min(snrs)) >= args.min_snr,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--quantize", action="store_true", help="Also check int8 NLLB")
+    parser.add_argument("--skip-tts", action="store_true")
+    parser.add_argument("--speaker", default="data/raw/original_audio.wav")
+    parser.add_argument("--cache-dir", default=ONNX_CACHE_DIR)
+    parser.add_argument("--intra-op-threads", type=int, default=None)
+    parser.add_argument("--inter-op-threads", type=int, default=None)
+    parser.add_argument("--max-wer", type=float, default=0.02)
+    parser.add_argument("--max-wer-int8", type=float, default=0.15)
+    parser.add_argument("--min-snr", type=float, default=40.0)
+    args = parser.parse_args()
+
+    reports = nllb_parity(load_texts(SOURCE_CHUNKS, args.chunks), args)
+    if not args.skip_tts:
+        reports.append(vocoder_parity(load_texts(TRANSLATED_CHUNKS, args.chunks), args))
+
+    for report in reports:
+        print(
+            f"{report['name']:<20} {'ok' if report['passed'] else 'FAILED':<7}"
+            + ", ".join(
+                f"{key}={value:.3g}"
+                for key, value in report.items()
+                if key not in ("name", "passed")
+            )
+        )
+
+    if not all(report["passed"] for report in reports):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
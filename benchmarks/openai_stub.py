@@ -0,0 +1,163 @@
+"""
+A local stub of the OpenAI chat completions endpoint, for offline tests and benchmarks.
+
+Each request waits `latency` seconds and answers with the user message prefixed by "[en] ".
+Packed requests (with a JSON-schema `response_format`) get one prefixed translation per chunk,
+of which a fraction `drop_rate` is left out, to exercise the re-requests. A fraction
+`error_rate` of the requests fails with a 429 or a 500 response, to exercise retries.
+
+Usage:
+    python -m benchmarks.openai_stub --port 8089 --latency 0.3 --error-rate 0.1
+
+Then point the Translator to it with `base_url="http://127.0.0.1:8089/v1"` (any OPENAI_API_KEY works).
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubOpenAIServer(ThreadingHTTPServer):
+    """
+    A threaded HTTP server that mimics `POST /v1/chat/completions`.
+
+    Args:
+        port (int, optional): The port to listen on (0 picks a free one). Defaults to 0.
+        latency (float, optional): The delay of each response, in seconds. Defaults to 0.2.
+        error_rate (float, optional): The fraction of requests answered with 429 or 500. Defaults to 0.
+        drop_rate (float, optional): The fraction of the chunks of packed requests left out of the response. Defaults to 0.
+        seed (int, optional): The seed of the error draws. Defaults to 0.
+
+    Attributes:
+        url (str): The base URL to give to the OpenAI client.
+        n_requests (int): The number of requests received.
+        n_errors (int): The number of error responses sent.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        port: int = 0,
+        latency: float = 0.2,
+        error_rate: float = 0,
+        drop_rate: float = 0,
+        seed: int = 0,
+    ):
+        super().__init__(("127.0.0.1", port), _StubHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.n_requests = 0
+        self.n_errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def start(self) -> "StubOpenAIServer":
+        """
+        Serve in a background thread.
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop serving and close the socket.
+        """
+        self.shutdown()
+        self.server_close()
+
+    def draw_error(self):
+        with self._lock:
+            self.n_requests += 1
+            if self._random.random() >= self.error_rate:
+                return None
+            self.n_errors += 1
+            return self._random.choice([429, 500])
+
+    def draw_drop(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.drop_rate
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.server.latency)
+
+        if not self.path.endswith("/chat/completions"):
+            return self._reply(404, {"error": {"message": "Not found"}})
+
+        status = self.server.draw_error()
+        if status is not None:
+            return self._reply(
+                status, {"error": {"message": "Stub error", "code": status}}
+            )
+
+        user_message = body["messages"][-1]["content"]
+        if body.get("response_format", {}).get("type") == "json_schema":
+            chunks = json.loads(user_message)["chunks"]
+            content = json.dumps(
+                dict(
+                    translations=[
+                        dict(id=chunk["id"], text=f"[en] {chunk['text']}")
+                        for chunk in chunks
+                        if not self.server.draw_drop()
+                    ]
+                )
+            )
+        else:
+            content = f"[en] {user_message}"
+
+        completion = dict(
+            id="chatcmpl-stub",
+            object="chat.completion",
+            created=int(time.time()),
+            model=body["model"],
+            choices=[
+                dict(
+                    index=0,
+                    message=dict(role="assistant", content=content),
+                    finish_reason="stop",
+                )
+            ],
+            usage=dict(prompt_tokens=0, completion_tokens=0, total_tokens=0),
+        )
+        self._reply(200, completion)
+
+    def _reply(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 429:
+            self.send_header("Retry-After", "0.1")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubOpenAIServer(args.port, args.latency, args.error_rate, args.drop_rate)
+    print(f"Serving the OpenAI stub at {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,583 @@
+"""
+Offline benchmark suite of the pipeline stages, with results history and regression check against a baseline.
+
+Each stage is timed in isolation on synthetic inputs of `--duration` seconds (see
+`benchmarks.fixtures`): a test-pattern video with speech-like audio, and the committed
+transcripts tiled to the same length.
+
+    extract    ffmpeg audio extraction (ASR samples + speaker .wav)
+    vad        block reading + energy VAD segmentation of the extracted audio
+    segment    sentence re-segmentation of the transcript, with cuts snapped to the audio
+    asr        streaming ASR (needs the model in the local Hugging Face cache; skipped otherwise)
+    translate  OpenAI translation against the local stub server (`benchmarks.openai_stub`)
+    translate_packed  the same, with packed multi-chunk requests
+    load       loading of the translated transcript (timing + texts), JSON vs chunk store
+    tts        TTS assembly: cached waveforms, speed fitting, timeline and .wav export (no TTS model)
+    stretch    time stretch of every chunk
+    stretch_pydub  the same, with the original pydub implementation, as the reference of the WSOLA speedup
+    mux        ffmpeg stream-copy mux of the dubbed track
+    hls        progressive HLS output of the dubbed track, one segment at a time as the audio is finalized
+    startup    import of the CLI and construction of the stages from params.yaml, in a fresh interpreter
+
+With `--segment`, the translation, TTS and stretch benchmarks run on the sentence segments
+instead of the Whisper chunks, to measure what the re-segmentation saves downstream.
+
+Every run is appended to the history file (one JSON line per run, with the commit and the
+machine), which is local to each checkout and not committed. The baseline,
+`benchmarks/results/baseline.json`, is committed: it is the record of a reference run with
+the default settings, plus the per-stage "thresholds" (relative slowdowns; the stages of a
+few milliseconds are noisier and get a larger one). After an intended performance change,
+re-run with `--save-baseline` on the reference machine and commit the file: the thresholds
+of the current baseline are kept. With a baseline, each stage slower than the baseline by
+more than its threshold is reported as a regression and the exit code is 1; a baseline
+recorded on another machine or with other settings is only indicative, and a warning is
+printed. The startup benchmark is also a regression, with or without a baseline, when a
+heavy library (torch, transformers, TTS...) is imported before any stage runs.
+
+Usage:
+    python -m benchmarks.run [--duration 60] [--repeat 3] [--stages extract vad translate ...]
+        [--baseline benchmarks/results/baseline.json] [--threshold 0.25] [--save-baseline]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from benchmarks.fixtures import (
+    SOURCE_CHUNKS,
+    TRANSLATED_CHUNKS,
+    fixture_chunks,
+    make_speech_audio,
+    make_video,
+    speech_like,
+    write_chunks,
+)
+from benchmarks.openai_stub import StubOpenAIServer
+
+RESULTS_DIR = "benchmarks/results"
+HISTORY_PATH = os.path.join(RESULTS_DIR, "history.jsonl")
+BASELINE_PATH = os.path.join(RESULTS_DIR, "baseline.json")
+SAMPLE_RATE = 24000
+ASR_SAMPLE_RATE = 16000
+
+
+def best_of(fn: Callable[[], None], repeat: int) -> float:
+    """
+    Return the best wall time of `repeat` calls, in seconds.
+    """
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return min(runs)
+
+
+def prepare_fixtures(tmp_dir: str, duration: float, segment: bool = False) -> dict:
+    """
+    Generate the synthetic inputs shared by the benchmarks.
+
+    Args:
+        tmp_dir (str): The directory of the generated files.
+        duration (float): The length of the audio, video and transcripts, in seconds.
+        segment (bool, optional): Whether to re-segment the transcripts into sentences. Defaults to False.
+
+    Returns:
+        dict: The paths of the "video", the "speech" track, the extracted "asr_audio" and "speaker_audio",
+            and of the tiled "source_chunks" and "translated_chunks".
+    """
+    from desafio_hotmart.segmentation import SentenceSegmenter
+    from desafio_hotmart.video_manipulation import extract_audio, load_raw_audio
+
+    paths = {
+        name: os.path.join(tmp_dir, filename)
+        for name, filename in dict(
+            speech="speech.wav",
+            video="video.mp4",
+            asr_audio="audio_16k.f32",
+            speaker_audio="speaker.wav",
+            source_chunks="transcription_with_timestamps.json",
+            translated_chunks="translation_with_timestamps.json",
+        ).items()
+    }
+
+    make_speech_audio(paths["speech"], duration, SAMPLE_RATE)
+    make_video(paths["video"], duration, paths["speech"], size="640x360")
+    extract_audio(
+        paths["video"], paths["asr_audio"], paths["speaker_audio"], 0, duration
+    )
+    for name, path in (
+        ("source_chunks", SOURCE_CHUNKS),
+        ("translated_chunks", TRANSLATED_CHUNKS),
+    ):
+        chunks = fixture_chunks(path, duration)
+        if segment:
+            segmenter = SentenceSegmenter(load_raw_audio(paths["asr_audio"]))
+            chunks = list(segmenter.segment(chunks))
+        write_chunks(paths[name], chunks)
+    return paths
+
+
+def bench_extract(paths: dict, args) -> dict:
+    from desafio_hotmart.video_manipulation import extract_audio
+
+    asr_audio = os.path.join(os.path.dirname(paths["video"]), "bench_extract.f32")
+    speaker_audio = os.path.join(os.path.dirname(paths["video"]), "bench_extract.wav")
+    seconds = best_of(
+        lambda: extract_audio(
+            paths["video"], asr_audio, speaker_audio, 0, args.duration
+        ),
+        args.repeat,
+    )
+    return dict(seconds=seconds)
+
+
+def bench_vad(paths: dict, args) -> dict:
+    from desafio_hotmart.vad import EnergyVAD
+    from desafio_hotmart.video_manipulation import read_audio_blocks
+
+    n_segments = []
+
+    def run():
+        vad = EnergyVAD(ASR_SAMPLE_RATE)
+        blocks = read_audio_blocks(paths["asr_audio"], ASR_SAMPLE_RATE)
+        n_segments.append(sum(1 for _ in vad.segments(blocks)))
+
+    return dict(seconds=best_of(run, args.repeat), segments=n_segments[-1])
+
+
+def bench_segment(paths: dict, args) -> dict:
+    from desafio_hotmart.segmentation import SentenceSegmenter
+    from desafio_hotmart.video_manipulation import load_raw_audio
+
+    chunks = fixture_chunks(SOURCE_CHUNKS, args.duration)
+    stats = []
+
+    def run():
+        segmenter = SentenceSegmenter(load_raw_audio(paths["asr_audio"]))
+        for _ in segmenter.segment(chunks):
+            pass
+        stats.append(segmenter.stats())
+
+    return dict(seconds=best_of(run, args.repeat), **stats[-1])
+
+
+def bench_asr(paths: dict, args) -> dict:
+    from desafio_hotmart.speech_to_text import ASR
+
+    asr = ASR(
+        paths["asr_audio"],
+        output_path_with_ts=None,
+        output_path_text=None,
+        model_id=args.asr_model,
+        backend=args.asr_backend,
+    )
+    start = time.perf_counter()
+    # O primeiro acesso carrega o modelo, medido à parte da transcrição
+    backend = asr.get_backend()
+    if args.asr_backend == "transformers":
+        backend.get_pipeline()
+    else:
+        backend.get_model()
+    load_seconds = time.perf_counter() - start
+
+    # Uma única execução: a transcrição domina o tempo total da suíte
+    start = time.perf_counter()
+    n_chunks = sum(1 for _ in asr.stream_speech_to_text())
+    return dict(
+        seconds=time.perf_counter() - start,
+        load_seconds=load_seconds,
+        chunks=n_chunks,
+    )
+
+
+def bench_translate(paths: dict, args, packed: bool = False) -> dict:
+    from desafio_hotmart.translate import Translator
+
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    server = StubOpenAIServer(latency=args.api_latency).start()
+    try:
+        translator = Translator(
+            paths["source_chunks"],
+            "openai",
+            os.devnull,
+            os.devnull,
+            concurrency=args.concurrency,
+            base_url=server.url,
+            packed=packed,
+        )
+        seconds = best_of(translator.translate_chunks, args.repeat)
+    finally:
+        server.stop()
+
+    return dict(seconds=seconds, requests=server.n_requests // args.repeat)
+
+
+def bench_load(paths: dict, args) -> dict:
+    from desafio_hotmart.chunk_store import ChunkStore, json_to_chunk_store
+    from desafio_hotmart.timestamps import bounds_timing, chunk_timing
+
+    store_path = json_to_chunk_store(paths["translated_chunks"])
+
+    def load_json():
+        with open(paths["translated_chunks"]) as f:
+            chunks = json.load(f)["chunks"]
+        chunk_timing(chunks)
+        for chunk in chunks:
+            chunk["text"]
+
+    def load_store():
+        store = ChunkStore(store_path)
+        bounds_timing(store.starts, store.ends)
+        for i in range(len(store)):
+            store.text(i)
+
+    return dict(
+        seconds=best_of(load_store, args.repeat),
+        json_seconds=best_of(load_json, args.repeat),
+        json_bytes=os.path.getsize(paths["translated_chunks"]),
+        store_bytes=os.path.getsize(store_path),
+    )
+
+
+def bench_tts(paths: dict, args) -> dict:
+    from desafio_hotmart.text_to_speech import TextToSpeech
+
+    tmp_dir = os.path.dirname(paths["video"])
+    tts = TextToSpeech(
+        paths["translated_chunks"],
+        os.path.join(tmp_dir, "dubbed.wav"),
+        "google",
+        paths["speaker_audio"],
+        cache_path=os.path.join(tmp_dir, "tts_cache.db"),
+    )
+
+    # Sem modelo de TTS: o cache recebe falas sintéticas 15% mais longas que a fala original
+    rng = np.random.default_rng(0)
+    chunks = tts.complete_text["chunks"]
+    wavs = [
+        speech_like(1.15 * float(duration), tts.synthesizer.sample_rate, rng)
+        for duration in tts.timing["speech_durations"]
+    ]
+    keys = tts._cache_keys([chunk["text"] for chunk in chunks])
+    tts.cache.put_audios(zip(keys, wavs), tts.synthesizer.sample_rate)
+
+    seconds = best_of(
+        lambda: tts.export_audio(tts.convert_chunks_to_speech()), args.repeat
+    )
+    return dict(seconds=seconds, chunks=len(chunks))
+
+
+def bench_stretch(paths: dict, args, backend: Optional[str] = None) -> dict:
+    from desafio_hotmart.time_stretch import time_stretch
+
+    with open(paths["translated_chunks"]) as f:
+        chunks = json.load(f)["chunks"]
+
+    rng = np.random.default_rng(0)
+    segments = [
+        (speech_like(1.15 * (end - start), SAMPLE_RATE, rng), rng.uniform(1, 1.25))
+        for start, end in (chunk["timestamp"] for chunk in chunks)
+        if end > start
+    ]
+
+    def run():
+        for wav, rate in segments:
+            time_stretch(
+                wav, rate, SAMPLE_RATE, backend=backend or args.stretch_backend
+            )
+
+    return dict(seconds=best_of(run, args.repeat), segments=len(segments))
+
+
+def bench_mux(paths: dict, args) -> dict:
+    from desafio_hotmart.video_manipulation import replace_audio
+
+    output_path = os.path.join(os.path.dirname(paths["video"]), "output.mp4")
+    seconds = best_of(
+        lambda: replace_audio(
+            paths["video"],
+            paths["speech"],
+            output_path,
+            0,
+            args.duration,
+            method="copy",
+        ),
+        args.repeat,
+    )
+    return dict(seconds=seconds)
+
+
+def bench_hls(paths: dict, args) -> dict:
+    import soundfile as sf
+
+    from desafio_hotmart.hls import HLSWriter
+    from desafio_hotmart.timeline import AudioTimeline
+
+    speech, sample_rate = sf.read(paths["speech"], dtype="float32")
+    output_dir = os.path.join(os.path.dirname(paths["video"]), "hls")
+    first_segment, n_segments = [], []
+
+    def run():
+        start = time.perf_counter()
+        hls = HLSWriter(paths["video"], output_dir, sample_rate, 0, args.duration)
+        # O áudio dublado fica pronto um segundo por vez, como na etapa de TTS
+        audio = AudioTimeline(args.duration, sample_rate)
+        for second in range(int(np.ceil(args.duration))):
+            audio.write(
+                second, speech[second * sample_rate : (second + 1) * sample_rate]
+            )
+            if hls.update(audio, second + 1) and hls.n_written == 1:
+                first_segment.append(time.perf_counter() - start)
+        hls.finish(audio)
+        n_segments.append(hls.n_segments)
+
+    seconds = best_of(run, args.repeat)
+    return dict(
+        seconds=seconds,
+        first_segment_seconds=min(first_segment),
+        segments=n_segments[-1],
+    )
+
+
+STARTUP_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+import yaml
+import main
+from desafio_hotmart.backends import HEAVY_MODULES
+from desafio_hotmart.stages import build_stages
+with open(sys.argv[1]) as f:
+    build_stages(yaml.safe_load(f))
+seconds = time.perf_counter() - start
+print(json.dumps(dict(
+    seconds=seconds,
+    peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    heavy_modules=[module for module in HEAVY_MODULES if module in sys.modules],
+)))
+"""
+
+
+def bench_startup(paths: dict, args) -> dict:
+    # Um interpretador novo a cada repetição: os módulos já importados não contam
+    runs = [
+        json.loads(
+            subprocess.run(
+                [sys.executable, "-c", STARTUP_SCRIPT, args.config],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+        )
+        for _ in range(args.repeat)
+    ]
+    return min(runs, key=lambda run: run["seconds"])
+
+
+BENCHMARKS = {
+    "extract": bench_extract,
+    "vad": bench_vad,
+    "segment": bench_segment,
+    "asr": bench_asr,
+    "translate": bench_translate,
+    "translate_packed": lambda paths, args: bench_translate(paths, args, packed=True),
+    "load": bench_load,
+    "tts": bench_tts,
+    "stretch": bench_stretch,
+    "stretch_pydub": lambda paths, args: bench_stretch(paths, args, backend="pydub"),
+    "mux": bench_mux,
+    "hls": bench_hls,
+    "startup": bench_startup,
+}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args) -> dict:
+    """
+    Run the selected benchmarks and return the record of the run.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = prepare_fixtures(tmp_dir, args.duration, args.segment)
+        for name in args.stages:
+            try:
+                metrics = BENCHMARKS[name](paths, args)
+            except (ImportError, OSError) as e:
+                # Dependência ou modelo ausente (ex.: ASR sem o modelo no cache local)
+                print(f"{name:<16} skipped: {e}")
+                continue
+            metrics["realtime"] = args.duration / metrics["seconds"]
+            results[name] = metrics
+            print(
+                f"{name:<16}{metrics['seconds']:>9.3f} s  ({metrics['realtime']:.1f}x realtime)"
+            )
+
+    return dict(
+        timestamp=datetime.datetime.now().isoformat(timespec="seconds"),
+        commit=git_commit(),
+        python=platform.python_version(),
+        platform=platform.platform(),
+        cpu_count=os.cpu_count(),
+        settings=dict(
+            duration=args.duration,
+            repeat=args.repeat,
+            api_latency=args.api_latency,
+            concurrency=args.concurrency,
+            stretch_backend=args.stretch_backend,
+            segment=args.segment,
+            config=args.config,
+            asr=f"{args.asr_backend}:{args.asr_model}",
+        ),
+        results=results,
+    )
+
+
+def compare(record: dict, baseline: dict, default_threshold: float) -> Dict[str, dict]:
+    """
+    Compare the stage times of a run with the baseline.
+
+    Args:
+        record (dict): The record of the run.
+        baseline (dict): The baseline record, optionally with per-stage "thresholds" (relative slowdowns, e.g. 0.25).
+        default_threshold (float): The threshold of the stages without one in the baseline.
+
+    Returns:
+        Dict[str, dict]: For each stage of the run, the baseline and current seconds, the relative change,
+            the threshold and the status ("ok", "faster", "regression" or "new").
+    """
+    thresholds = baseline.get("thresholds", {})
+    comparison = {}
+    for name, metrics in record["results"].items():
+        threshold = thresholds.get(name, default_threshold)
+        reference = baseline["results"].get(name)
+        if reference is None:
+            comparison[name] = dict(status="new", seconds=metrics["seconds"])
+            continue
+
+        change = metrics["seconds"] / reference["seconds"] - 1
+        if change > threshold:
+            status = "regression"
+        elif change < -threshold:
+            status = "faster"
+        else:
+            status = "ok"
+        comparison[name] = dict(
+            status=status,
+            baseline_seconds=reference["seconds"],
+            seconds=metrics["seconds"],
+            change=change,
+            threshold=threshold,
+        )
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--stages", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS)
+    )
+    parser.add_argument("--api-latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--stretch-backend", default="wsola")
+    parser.add_argument(
+        "--segment",
+        action="store_true",
+        help="Run the downstream benchmarks on the sentence segments instead of the Whisper chunks.",
+    )
+    parser.add_argument("--asr-backend", default="transformers")
+    parser.add_argument("--asr-model", default="openai/whisper-tiny")
+    parser.add_argument(
+        "--config",
+        default="params.yaml",
+        help="The configuration whose stages are built by the startup benchmark.",
+    )
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Relative slowdown reported as a regression, for the stages without a threshold in the baseline.",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store this run as the new baseline (keeping the thresholds of the current one).",
+    )
+    args = parser.parse_args()
+
+    record = run_suite(args)
+
+    history_dir = os.path.dirname(args.history)
+    if history_dir:
+        os.makedirs(history_dir, exist_ok=True)
+    with open(args.history, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+    baseline = None
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = []
+    heavy_modules = record["results"].get("startup", {}).get("heavy_modules")
+    if heavy_modules:
+        print(f"startup imports heavy libraries: {', '.join(heavy_modules)}")
+        regressions.append("startup")
+    if baseline is not None:
+        if baseline.get("settings") != record["settings"]:
+            print("Warning: the baseline was recorded with other settings.")
+        if (baseline.get("platform"), baseline.get("cpu_count")) != (
+            record["platform"],
+            record["cpu_count"],
+        ):
+            print("Warning: the baseline was recorded on another machine.")
+        print(f"\nCompared with the baseline of {baseline['timestamp']}:")
+        for name, result in compare(record, baseline, args.threshold).items():
+            if result["status"] == "new":
+                print(f"{name:<16} new")
+                continue
+            print(
+                f"{name:<16}{result['baseline_seconds']:>9.3f} s -> {result['seconds']:.3f} s "
+                f"({result['change']:+.0%}, threshold {result['threshold']:.0%})  {result['status']}"
+            )
+            if result["status"] == "regression" and name not in regressions:
+                regressions.append(name)
+
+    if args.save_baseline:
+        if baseline is not None and "thresholds" in baseline:
+            record["thresholds"] = baseline["thresholds"]
+        baseline_dir = os.path.dirname(args.baseline)
+        if baseline_dir:
+            os.makedirs(baseline_dir, exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(record, f, indent=4)
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        raise SystemExit(f"Performance regression in: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
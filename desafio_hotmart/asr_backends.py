@@ -0,0 +1,330 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional, Union
+
+import numpy as np
+
+from desafio_hotmart.model_registry import model_registry
+
+# torch, transformers, ctranslate2 e faster_whisper são importados apenas pelo backend escolhido (ver desafio_hotmart.backends)
+
+# Códigos ISO 639-1 usados pelo faster-whisper (o pipeline do transformers aceita o nome do idioma)
+LANGUAGE_CODES = {"portuguese": "pt", "english": "en", "spanish": "es"}
+
+
+class ASRBackend(ABC):
+    """
+    Base class of the Whisper inference backends used by `ASR`.
+
+    Args:
+        model_id (str): The id (or local path) of the Whisper checkpoint.
+        batch_size (int, optional): The number of 30 s windows (or speech segments) decoded at once. Defaults to 16.
+        num_threads (int, optional): The number of CPU threads used for inference. Defaults to None (the library default).
+        compute_type (str, optional): The precision of the weights (e.g. "int8", "float16", "float32"). Defaults to None (backend default).
+
+    Attributes:
+        COMPUTE_TYPES (tuple): The values of `compute_type` accepted by the backend.
+
+    Methods:
+        transcribe(audio: Union[str, dict], language: str) -> dict:
+            Transcribe an audio file or raw samples of any length.
+
+        transcribe_batch(segments: List[np.ndarray], sampling_rate: int, language: str) -> List[dict]:
+            Transcribe a batch of speech segments of at most 30 s each.
+
+    Raises:
+        ValueError: If the compute_type is not supported by the backend.
+    """
+
+    COMPUTE_TYPES = ()
+
+    def __init__(
+        self,
+        model_id: str,
+        batch_size: int = 16,
+        num_threads: Optional[int] = None,
+        compute_type: Optional[str] = None,
+    ):
+        if compute_type is not None and compute_type not in self.COMPUTE_TYPES:
+            raise ValueError(
+                f"Invalid compute_type for the {type(self).__name__}. "
+                f"Please choose one of {list(self.COMPUTE_TYPES)} or None."
+            )
+
+        self.model_id = model_id
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.compute_type = compute_type
+
+    @abstractmethod
+    def transcribe(self, audio: Union[str, dict], language: str) -> dict:
+        """
+        Transcribe an audio file or raw samples of any length.
+
+        Args:
+            audio (Union[str, dict]): The path of an audio file, or {"raw": samples, "sampling_rate": rate}.
+            language (str): The language of the audio (e.g. "portuguese").
+
+        Returns:
+            dict: The "text" and the "chunks" ({"timestamp": (start, end), "text": ...}) of the transcription.
+        """
+
+    @abstractmethod
+    def transcribe_batch(
+        self, segments: List[np.ndarray], sampling_rate: int, language: str
+    ) -> List[dict]:
+        """
+        Transcribe a batch of speech segments of at most 30 s each.
+
+        Args:
+            segments (List[np.ndarray]): The mono float32 samples of each segment.
+            sampling_rate (int): The sample rate of the segments.
+            language (str): The language of the audio (e.g. "portuguese").
+
+        Returns:
+            List[dict]: One transcription per segment, with timestamps relative to the start of the segment.
+        """
+
+
+class TransformersBackend(ASRBackend):
+    """
+    Whisper with the Hugging Face transformers pipeline, on GPU (float16) when available, otherwise on CPU (float32).
+
+    Works with the OpenAI checkpoints (e.g. "openai/whisper-large-v3") and the distilled
+    ones (e.g. "distil-whisper/distil-large-v3"). The `compute_type` is the name of a torch dtype.
+    """
+
+    COMPUTE_TYPES = ("float16", "bfloat16", "float32")
+
+    def get_pipeline(self):
+        """
+        Returns the ASR pipeline, built only once per process and kept in the model registry.
+
+        Returns:
+            ASR pipeline: The pipeline for automatic speech recognition.
+        """
+        import torch
+
+        if torch.cuda.is_available():
+            device = torch.device("cuda")
+        elif torch.backends.mps.is_available():
+            device = torch.device("mps")
+        else:
+            device = torch.device("cpu")
+
+        if self.compute_type is not None:
+            torch_dtype = getattr(torch, self.compute_type)
+        else:
+            torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
+
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+
+        def load():
+            from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline
+
+            model = AutoModelForSpeechSeq2Seq.from_pretrained(
+                self.model_id,
+                torch_dtype=torch_dtype,
+                low_cpu_mem_usage=True,
+                use_safetensors=True,
+            )
+            model.to(device)
+            processor = AutoProcessor.from_pretrained(self.model_id)
+
+            return pipeline(
+                "automatic-speech-recognition",
+                model=model,
+                tokenizer=processor.tokenizer,
+                feature_extractor=processor.feature_extractor,
+                batch_size=self.batch_size,
+                return_timestamps=True,
+                torch_dtype=torch_dtype,
+                device=device,
+            )
+
+        return model_registry.get(f"{self.model_id}:{torch_dtype}", str(device), load)
+
+    def transcribe(self, audio: Union[str, dict], language: str) -> dict:
+        pipe = self.get_pipeline()
+        return pipe(audio, generate_kwargs={"language": language})
+
+    def transcribe_batch(
+        self, segments: List[np.ndarray], sampling_rate: int, language: str
+    ) -> List[dict]:
+        pipe = self.get_pipeline()
+        return pipe(
+            [{"raw": samples, "sampling_rate": sampling_rate} for samples in segments],
+            batch_size=min(len(segments), self.batch_size),
+            generate_kwargs={"language": language},
+        )
+
+
+class FasterWhisperBackend(ASRBackend):
+    """
+    Whisper with CTranslate2 (faster-whisper), int8 on CPU by default.
+
+    Accepts the faster-whisper model names (e.g. "large-v3", "distil-large-v3") or the id of
+    a CTranslate2 checkpoint (e.g. "Systran/faster-whisper-large-v3"). Long audio, and the
+    speech segments of the streaming ASR, are decoded in batches of `batch_size` windows.
+    Requires the optional `faster-whisper` package (1.2 or newer, which takes `clip_timestamps`
+    in seconds). The `compute_type` is one of the CTranslate2 quantization types.
+    """
+
+    COMPUTE_TYPES = (
+        "int8",
+        "int8_float32",
+        "int8_float16",
+        "int8_bfloat16",
+        "int16",
+        "float16",
+        "bfloat16",
+        "float32",
+    )
+
+    def get_model(self):
+        """
+        Returns the faster-whisper model, loaded only once per process and kept in the model registry.
+
+        Returns:
+            WhisperModel: The CTranslate2 Whisper model.
+
+        Raises:
+            ImportError: If faster-whisper is not installed.
+        """
+        try:
+            import ctranslate2
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError(
+                "The faster-whisper backend requires the faster-whisper package "
+                "(poetry install -E faster-whisper)."
+            ) from e
+
+        # O CTranslate2 detecta a GPU sozinho, sem depender do torch
+        device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+        compute_type = self.compute_type or ("float16" if device == "cuda" else "int8")
+
+        def load():
+            return WhisperModel(
+                self.model_id,
+                device=device,
+                compute_type=compute_type,
+                cpu_threads=self.num_threads or 0,
+            )
+
+        return model_registry.get(
+            f"faster-whisper:{self.model_id}:{compute_type}", device, load
+        )
+
+    @staticmethod
+    def _language_code(language: str) -> str:
+        return LANGUAGE_CODES.get(language.lower(), language)
+
+    @staticmethod
+    def _to_output(segments, offset: float = 0.0) -> dict:
+        chunks = [
+            {
+                "timestamp": (
+                    round(segment.start - offset, 3),
+                    round(segment.end - offset, 3),
+                ),
+                "text": segment.text,
+            }
+            for segment in segments
+        ]
+        return {"text": "".join(chunk["text"] for chunk in chunks), "chunks": chunks}
+
+    def transcribe(self, audio: Union[str, dict], language: str) -> dict:
+        model = self.get_model()
+        if isinstance(audio, dict):
+            audio = np.asarray(audio["raw"], dtype=np.float32)
+
+        if self.batch_size > 1:
+            from faster_whisper import BatchedInferencePipeline
+
+            segments, _ = BatchedInferencePipeline(model=model).transcribe(
+                audio,
+                language=self._language_code(language),
+                batch_size=self.batch_size,
+            )
+        else:
+            segments, _ = model.transcribe(
+                audio, language=self._language_code(language)
+            )
+
+        return self._to_output(segments)
+
+    def transcribe_batch(
+        self, segments: List[np.ndarray], sampling_rate: int, language: str
+    ) -> List[dict]:
+        from faster_whisper import BatchedInferencePipeline
+
+        if not segments:
+            return []
+
+        # Os segmentos são concatenados e passados como clip_timestamps: cada um vira uma janela de 30 s
+        # do batch, e os timestamps voltam no tempo do áudio concatenado
+        offsets = np.concatenate(
+            [[0], np.cumsum([len(samples) for samples in segments])]
+        ) / float(sampling_rate)
+        audio = np.concatenate(
+            [np.asarray(samples, dtype=np.float32) for samples in segments]
+        )
+        output, _ = BatchedInferencePipeline(model=self.get_model()).transcribe(
+            audio,
+            language=self._language_code(language),
+            batch_size=min(len(segments), self.batch_size),
+            vad_filter=False,
+            clip_timestamps=[
+                dict(start=float(offsets[i]), end=float(offsets[i + 1]))
+                for i in range(len(segments))
+            ],
+            without_timestamps=False,
+        )
+
+        grouped = [[] for _ in segments]
+        for segment in output:
+            middle = (segment.start + segment.end) / 2
+            i = int(np.searchsorted(offsets, middle, side="right")) - 1
+            grouped[min(max(i, 0), len(segments) - 1)].append(segment)
+
+        return [
+            self._to_output(group, float(offset))
+            for group, offset in zip(grouped, offsets)
+        ]
+
+
+ASR_BACKENDS = {
+    "transformers": TransformersBackend,
+    "faster-whisper": FasterWhisperBackend,
+}
+
+
+def get_asr_backend(
+    backend: str,
+    model_id: str,
+    batch_size: int = 16,
+    num_threads: Optional[int] = None,
+    compute_type: Optional[str] = None,
+) -> ASRBackend:
+    """
+    Build an ASR backend by name.
+
+    Args:
+        backend (str): The name of the backend ("transformers" or "faster-whisper").
+        model_id (str): The id (or local path) of the Whisper checkpoint.
+        batch_size (int, optional): The number of windows (or segments) decoded at once. Defaults to 16.
+        num_threads (int, optional): The number of CPU threads used for inference. Defaults to None (the library default).
+        compute_type (str, optional): The precision of the weights. Defaults to None (backend default).
+
+    Returns:
+        ASRBackend: The backend.
+
+    Raises:
+        ValueError: If the backend is unknown, or the compute_type is not supported by it.
+    """
+    if backend not in ASR_BACKENDS:
+        raise ValueError(
+            f"Invalid ASR backend. Please choose one of {sorted(ASR_BACKENDS)}."
+        )
+    return ASR_BACKENDS[backend](model_id, batch_size, num_threads, compute_type)
@@ -0,0 +1,169 @@
+import importlib
+import importlib.util
+import sys
+from typing import Dict, Iterable, List, Optional
+
+# Bibliotecas pesadas de cada backend: os módulos do pacote só as importam quando o backend é usado
+BACKENDS = {
+    "asr": {
+        "transformers": ["torch", "transformers"],
+        "faster-whisper": ["ctranslate2", "faster_whisper"],
+    },
+    "translator": {
+        "nllb": ["torch", "transformers"],
+        "nllb-onnx": ["transformers", "optimum", "onnxruntime"],
+        "openai": ["openai"],
+    },
+    "tts": {
+        "google": ["gtts"],
+        "coqui": ["torch", "TTS"],
+        "coqui-onnx": ["torch", "TTS", "onnx", "onnxruntime"],
+    },
+    "mux": {
+        "copy": [],
+        "reencode": ["moviepy"],
+    },
+}
+
+# Backends usados por cada etapa do pipeline
+STAGE_BACKENDS = {
+    "extract": [],
+    "transcribe": ["asr"],
+    "segment": [],
+    "translate": ["translator"],
+    "tts": ["tts"],
+    "dub": ["asr", "translator", "tts"],
+    "mux": ["mux"],
+}
+
+EXTRAS = {
+    "ctranslate2": "faster-whisper",
+    "faster_whisper": "faster-whisper",
+    "onnx": "onnx",
+    "onnxruntime": "onnx",
+    "optimum": "onnx",
+}
+
+# Todas as bibliotecas pesadas, que não devem ser importadas na inicialização da CLI
+HEAVY_MODULES = sorted(
+    {
+        module
+        for kind in BACKENDS.values()
+        for modules in kind.values()
+        for module in modules
+    }
+)
+
+
+def backend_modules(kind: str, name: str) -> List[str]:
+    """
+    The heavy libraries imported by a backend.
+
+    Args:
+        kind (str): The kind of backend ("asr", "translator", "tts" or "mux").
+        name (str): The name of the backend.
+
+    Returns:
+        List[str]: The names of the top-level modules.
+
+    Raises:
+        ValueError: If the kind or the backend is unknown.
+    """
+    if kind not in BACKENDS:
+        raise ValueError(
+            f"Invalid backend kind. Please choose one of {sorted(BACKENDS)}."
+        )
+    if name not in BACKENDS[kind]:
+        raise ValueError(
+            f"Invalid {kind} backend. Please choose one of {sorted(BACKENDS[kind])}."
+        )
+    return BACKENDS[kind][name]
+
+
+def missing_modules(kind: str, name: str) -> List[str]:
+    """
+    The libraries of a backend that are not installed, found without importing them.
+
+    Args:
+        kind (str): The kind of backend.
+        name (str): The name of the backend.
+
+    Returns:
+        List[str]: The missing modules.
+    """
+    return [
+        module
+        for module in backend_modules(kind, name)
+        # Um módulo já importado pode não ter __spec__ (find_spec falharia)
+        if module not in sys.modules and importlib.util.find_spec(module) is None
+    ]
+
+
+def import_backend(kind: str, name: str) -> None:
+    """
+    Import the libraries of a backend (e.g. to load them before a timed section).
+
+    Args:
+        kind (str): The kind of backend.
+        name (str): The name of the backend.
+    """
+    for module in backend_modules(kind, name):
+        importlib.import_module(module)
+
+
+def selected_backends(config: dict) -> Dict[str, str]:
+    """
+    The backend of each kind selected in the configuration.
+
+    Args:
+        config (dict): The configuration loaded from params.yaml.
+
+    Returns:
+        Dict[str, str]: The name of the backend of each kind.
+    """
+    translator = config["model"]["translator"]
+    if translator == "nllb" and config["translation"]["backend"] == "onnx":
+        translator = "nllb-onnx"
+    tts = config["model"]["tts"]
+    if tts == "coqui" and config["tts"]["backend"] == "onnx":
+        tts = "coqui-onnx"
+
+    return dict(
+        asr=config["asr"]["backend"],
+        translator=translator,
+        tts=tts,
+        mux=config["mux"]["method"],
+    )
+
+
+def check_backends(config: dict, stages: Optional[Iterable[str]] = None) -> None:
+    """
+    Check that the libraries of the backends selected for some stages are installed, before any stage runs.
+
+    Args:
+        config (dict): The configuration loaded from params.yaml.
+        stages (Iterable[str], optional): The names of the stages. Defaults to None (every stage).
+
+    Raises:
+        ValueError: If a selected backend is unknown.
+        ImportError: If a library of a selected backend is missing.
+    """
+    stages = STAGE_BACKENDS if stages is None else stages
+    selected = selected_backends(config)
+    kinds = {kind for stage in stages for kind in STAGE_BACKENDS.get(stage, [])}
+
+    missing = {}
+    for kind in sorted(kinds):
+        for module in missing_modules(kind, selected[kind]):
+            missing.setdefault(module, f"{kind}={selected[kind]}")
+    if missing:
+        raise ImportError(
+            "Missing libraries for the selected backends: "
+            + ", ".join(
+                f"{module} ({backend}"
+                + (f", poetry install -E {EXTRAS[module]}" if module in EXTRAS else "")
+                + ")"
+                for module, backend in missing.items()
+            )
+            + "."
+        )
@@ -0,0 +1,290 @@
+import copy
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+import yaml
+
+from desafio_hotmart.backends import backend_modules, selected_backends
+from desafio_hotmart.pipeline import PipelineRunner
+from desafio_hotmart.profiling import profiler
+from desafio_hotmart.stages import build_stages
+
+
+def load_manifest(path: str) -> List[dict]:
+    """
+    Load the list of videos of a batch job.
+
+    The manifest is either a text file with one video path per line (blank lines and lines
+    starting with "#" are ignored), or a YAML/JSON list whose items are video paths or dicts
+    with a "video" and, optionally, an "output_dir", "subclip_start_seconds" and
+    "subclip_end_seconds".
+
+    Args:
+        path (str): The path of the manifest.
+
+    Returns:
+        List[dict]: One dict per video, with at least the "video" key.
+    """
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml", ".json")):
+            entries = yaml.safe_load(f) or []
+        else:
+            entries = [
+                line.strip()
+                for line in f
+                if line.strip() and not line.strip().startswith("#")
+            ]
+
+    return [entry if isinstance(entry, dict) else {"video": entry} for entry in entries]
+
+
+def video_config(config: dict, entry: dict, output_root: str) -> dict:
+    """
+    Build the configuration of one video of a batch job, with every intermediate and output file in its own directory.
+
+    The persistent caches stay shared between the videos.
+
+    Args:
+        config (dict): The configuration loaded from params.yaml.
+        entry (dict): The manifest entry of the video.
+        output_root (str): The directory where the per-video directories are created.
+
+    Returns:
+        dict: The configuration of the video.
+    """
+    config = copy.deepcopy(config)
+    name = os.path.splitext(os.path.basename(entry["video"]))[0]
+    output_dir = entry.get("output_dir") or os.path.join(output_root, name)
+
+    config["data"]["input"]["video"] = entry["video"]
+    for group in ("intermediate", "output"):
+        config["data"][group] = {
+            key: os.path.join(output_dir, os.path.basename(path))
+            for key, path in config["data"][group].items()
+        }
+    config["pipeline"]["state_path"] = os.path.join(
+        output_dir, os.path.basename(config["pipeline"]["state_path"])
+    )
+    config["profiling"]["output_dir"] = os.path.join(output_dir, "profile")
+    config["hls"]["output_dir"] = os.path.join(output_dir, "hls")
+    for key in ("subclip_start_seconds", "subclip_end_seconds"):
+        if key in entry:
+            config["base"][key] = entry[key]
+
+    return config
+
+
+# Cada processo do pool de modelos mantém os seus modelos no model registry entre os vídeos
+def _init_worker(num_threads: Optional[int]) -> None:
+    # Só importa o torch quando um backend selecionado o usa
+    if num_threads:
+        import torch
+
+        torch.set_num_threads(num_threads)
+
+
+def _uses_torch(config: dict) -> bool:
+    return any(
+        "torch" in backend_modules(kind, name)
+        for kind, name in selected_backends(config).items()
+    )
+
+
+def _run_stage(config: dict, name: str, force: bool) -> float:
+    profiling = config["profiling"]
+    runner = PipelineRunner(
+        build_stages(config),
+        config,
+        config["pipeline"]["state_path"],
+        profile_dir=profiling["output_dir"] if profiling["cprofile"] else None,
+    )
+    # Cada etapa grava o seu próprio trace, pois roda em um processo do pool
+    profiler.enabled = profiling["enabled"]
+    profiler.reset()
+    start = time.perf_counter()
+    try:
+        runner.run_stage(name, force=force)
+    finally:
+        if profiler.enabled:
+            profiler.export(os.path.join(profiling["output_dir"], f"trace_{name}.json"))
+    return time.perf_counter() - start
+
+
+class BatchRunner:
+    """
+    Dubs many videos, each with its own resumable pipeline, scheduling their stages over two process pools.
+
+    Stages that load a large model (ASR, translation, TTS) run in the "model" pool, whose few
+    workers keep their models loaded from one video to the next; ffmpeg and signal-processing
+    stages (extraction, muxing) run in the "cpu" pool. The stages of one video run in order,
+    while the stages of different videos overlap: one video can be muxed while the next one
+    is transcribed. A failed video is reported and skipped; the other videos go on, and a pool
+    whose worker died (e.g. killed by the OOM killer) is replaced by a new one.
+
+    Args:
+        entries (List[dict]): The manifest entries (see `load_manifest`).
+        config (dict): The configuration loaded from params.yaml.
+        output_root (str): The directory where the per-video directories are created.
+        cpu_workers (int, optional): The number of processes for the "cpu" stages. Defaults to 2.
+        model_workers (int, optional): The number of processes for the "model" stages. Defaults to 1.
+
+    Attributes:
+        configs (List[dict]): The configuration of each video.
+        results (Dict[str, dict]): The status ("done" or "failed"), the stage timings and the error of each video.
+
+    Methods:
+        run(force: Iterable[str] = ()) -> Dict[str, dict]:
+            Run every video and return the results.
+
+        export_results(path: str) -> None:
+            Write the results to a JSON file.
+    """
+
+    def __init__(
+        self,
+        entries: List[dict],
+        config: dict,
+        output_root: str,
+        cpu_workers: int = 2,
+        model_workers: int = 1,
+    ):
+        self.configs = [video_config(config, entry, output_root) for entry in entries]
+        self.cpu_workers = cpu_workers
+        self.model_workers = model_workers
+        self.results = {}
+
+        state_paths = [c["pipeline"]["state_path"] for c in self.configs]
+        duplicates = {path for path in state_paths if state_paths.count(path) > 1}
+        if duplicates:
+            raise ValueError(
+                f"Several videos share the output directory of {sorted(duplicates)}. "
+                "Please set a distinct output_dir in the manifest."
+            )
+
+    def run(self, force=()) -> Dict[str, dict]:
+        """
+        Run every video, resuming each one from its first stage that is not up to date.
+
+        Args:
+            force (Iterable[str], optional): The names of the stages to run even if up to date ("all" forces every stage). Defaults to ().
+
+        Returns:
+            Dict[str, dict]: The results, keyed by video path.
+
+        Raises:
+            ValueError: If a forced stage does not exist.
+        """
+        force = set(force)
+        plans = []
+        for config in self.configs:
+            stages = PipelineRunner(
+                build_stages(config), config, config["pipeline"]["state_path"]
+            ).stages
+            unknown = force - {stage.name for stage in stages} - {"all"}
+            if unknown:
+                raise ValueError(
+                    f"Unknown stage(s) {sorted(unknown)}. Please choose among {[stage.name for stage in stages]} or 'all'."
+                )
+            plans.append(
+                dict(
+                    config=config,
+                    stages=[stage.name for stage in stages],
+                    resources={stage.name: stage.resource for stage in stages},
+                )
+            )
+            self.results[config["data"]["input"]["video"]] = dict(
+                status="pending", timings={}, error=None
+            )
+
+        cpu_threads = os.cpu_count() or 1
+        context = multiprocessing.get_context("spawn")
+        # Os processos de modelo dividem os núcleos entre si; os de CPU não importam o torch
+        model_threads = (
+            max(1, cpu_threads // self.model_workers)
+            if any(_uses_torch(config) for config in self.configs)
+            else None
+        )
+
+        def make_pool(resource):
+            if resource == "model":
+                return ProcessPoolExecutor(
+                    self.model_workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(model_threads,),
+                )
+            return ProcessPoolExecutor(self.cpu_workers, mp_context=context)
+
+        pools = {resource: make_pool(resource) for resource in ("cpu", "model")}
+
+        def replace_pool(resource, broken):
+            # Vários futures do mesmo pool quebrado falham: o pool é recriado uma única vez
+            if pools[resource] is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                pools[resource] = make_pool(resource)
+
+        def submit(plan):
+            name = plan["stages"].pop(0)
+            resource = plan["resources"][name]
+            stage_force = "all" in force or name in force
+            try:
+                future = pools[resource].submit(
+                    _run_stage, plan["config"], name, stage_force
+                )
+            except BrokenProcessPool:
+                replace_pool(resource, pools[resource])
+                future = pools[resource].submit(
+                    _run_stage, plan["config"], name, stage_force
+                )
+            return future, (plan, name, pools[resource])
+
+        try:
+            running = {}
+            for plan in plans:
+                future, task = submit(plan)
+                running[future] = task
+
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    plan, name, pool = running.pop(future)
+                    video = plan["config"]["data"]["input"]["video"]
+                    result = self.results[video]
+                    try:
+                        result["timings"][name] = future.result()
+                    except Exception as e:
+                        if isinstance(e, BrokenProcessPool):
+                            replace_pool(plan["resources"][name], pool)
+                        result.update(status="failed", error=f"{name}: {e!r}")
+                        print(f"[{video}] {name} failed: {e!r}")
+                        continue
+
+                    if plan["stages"]:
+                        future, task = submit(plan)
+                        running[future] = task
+                    else:
+                        result["status"] = "done"
+                        print(f"[{video}] done")
+        finally:
+            for pool in pools.values():
+                pool.shutdown(cancel_futures=True)
+
+        return self.results
+
+    def export_results(self, path: str) -> None:
+        """
+        Write the results to a JSON file.
+
+        Args:
+            path (str): The path of the JSON file.
+        """
+        results_dir = os.path.dirname(path)
+        if results_dir and not os.path.exists(results_dir):
+            os.makedirs(results_dir)
+        with open(path, "w") as f:
+            json.dump(self.results, f, indent=4)
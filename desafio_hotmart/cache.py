@@ -0,0 +1,386 @@
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """
+    Hash the contents of a file.
+
+    Args:
+        path (str): The path of the file.
+        block_size (int, optional): The size of the blocks read from the file. Defaults to 1 MiB.
+
+    Returns:
+        str: The SHA-256 hex digest of the file.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SQLiteCache:
+    """
+    A persistent, content-addressed key-value cache stored in a SQLite database.
+
+    Entries are evicted in least-recently-used order whenever the cache exceeds
+    `max_entries` or `max_bytes`. The database runs in WAL mode, so several processes
+    can read and write the same cache file concurrently.
+
+    Args:
+        path (str): The path of the SQLite database file.
+        max_entries (int, optional): The maximum number of entries. Defaults to None (no limit).
+        max_bytes (int, optional): The maximum total size of the stored values. Defaults to None (no limit).
+
+    Attributes:
+        hits (int): The number of lookups found in the cache by this instance.
+        misses (int): The number of lookups not found in the cache by this instance.
+
+    Methods:
+        make_key(**fields) -> str:
+            Hash the fields that identify an entry into a cache key.
+
+        get_many(keys: Iterable[str]) -> Dict[str, bytes]:
+            Return the cached values of the keys that are in the cache.
+
+        put_many(items: Iterable[Tuple[str, bytes]]) -> None:
+            Store the values and evict the least recently used entries if needed.
+
+        stats() -> dict:
+            Return the hit rate and the size of the cache.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        cache_dir = os.path.dirname(path)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(**fields) -> str:
+        """
+        Hash the fields that identify an entry into a cache key.
+
+        Returns:
+            str: The SHA-256 hex digest of the fields.
+        """
+        payload = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """
+        Return the cached values of the keys that are in the cache, marking them as recently used.
+
+        Args:
+            keys (Iterable[str]): The cache keys.
+
+        Returns:
+            Dict[str, bytes]: The values of the keys found in the cache.
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+
+        with self._lock:
+            # Consulta em blocos, respeitando o limite de parâmetros do SQLite
+            for i in range(0, len(keys), 500):
+                block = keys[i : i + 500]
+                placeholders = ",".join("?" * len(block))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({placeholders})",
+                    block,
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE entries SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+
+        return found
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Return the cached value of the key, or None if it is not in the cache.
+        """
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Iterable[Tuple[str, bytes]]) -> None:
+        """
+        Store the values and evict the least recently used entries if the cache is over its limits.
+
+        Args:
+            items (Iterable[Tuple[str, bytes]]): The (key, value) pairs to store.
+        """
+        now = time.time()
+        rows = [(key, value, len(value), now) for key, value in items]
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def put(self, key: str, value: bytes) -> None:
+        """
+        Store the value of the key.
+        """
+        self.put_many([(key, value)])
+
+    def _evict(self) -> None:
+        if self.max_entries is None and self.max_bytes is None:
+            return
+
+        n_entries, total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        if (self.max_entries is None or n_entries <= self.max_entries) and (
+            self.max_bytes is None or total_bytes <= self.max_bytes
+        ):
+            return
+
+        to_delete = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_access ASC"
+        ):
+            if (self.max_entries is None or n_entries <= self.max_entries) and (
+                self.max_bytes is None or total_bytes <= self.max_bytes
+            ):
+                break
+            to_delete.append((key,))
+            n_entries -= 1
+            total_bytes -= size
+
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", to_delete)
+
+    def stats(self) -> dict:
+        """
+        Return the hit rate of this instance and the current size of the cache.
+
+        Returns:
+            dict: The hits, misses, hit rate, number of entries and total bytes.
+        """
+        with self._lock:
+            n_entries, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+
+        lookups = self.hits + self.misses
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / lookups if lookups else 0.0,
+            entries=n_entries,
+            bytes=total_bytes,
+        )
+
+    def close(self) -> None:
+        """
+        Close the connection to the database.
+        """
+        self._conn.close()
+
+
+class TranslationCache(SQLiteCache):
+    """
+    A persistent cache of translated chunks, keyed by the hash of the source text and of every setting that changes the translation.
+
+    Methods:
+        make_translation_key(text: str, backend: str, model: str, system_prompt: Optional[str], temperature: Optional[float],
+                target_language: str, runtime: Optional[str] = None, precision: Optional[str] = None) -> str:
+            Hash the source text and the translation settings into a cache key.
+
+        get_translations(keys: List[str]) -> Dict[str, str]:
+            Return the cached translations of the keys that are in the cache.
+
+        put_translations(items: Iterable[Tuple[str, str]]) -> None:
+            Store the translations.
+    """
+
+    def make_translation_key(
+        self,
+        text: str,
+        backend: str,
+        model: str,
+        system_prompt: Optional[str],
+        temperature: Optional[float],
+        target_language: str,
+        runtime: Optional[str] = None,
+        precision: Optional[str] = None,
+    ) -> str:
+        """
+        Hash the source text and the translation settings into a cache key.
+
+        The runtime ("torch" or "onnx") and the precision of the weights (e.g. "int8") of a
+        local model are part of the key, since they change its output slightly.
+
+        Returns:
+            str: The cache key.
+        """
+        return self.make_key(
+            text=text,
+            backend=backend,
+            model=model,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            target_language=target_language,
+            runtime=runtime,
+            precision=precision,
+        )
+
+    def get_translations(self, keys: List[str]) -> Dict[str, str]:
+        """
+        Return the cached translations of the keys that are in the cache.
+
+        Args:
+            keys (List[str]): The cache keys.
+
+        Returns:
+            Dict[str, str]: The translations found in the cache.
+        """
+        return {
+            key: value.decode("utf-8") for key, value in self.get_many(keys).items()
+        }
+
+    def put_translations(self, items: Iterable[Tuple[str, str]]) -> None:
+        """
+        Store the translations.
+
+        Args:
+            items (Iterable[Tuple[str, str]]): The (key, translated text) pairs.
+        """
+        self.put_many((key, text.encode("utf-8")) for key, text in items)
+
+
+class AudioCache(SQLiteCache):
+    """
+    A persistent cache of synthesized chunks, stored as FLAC and keyed by the hash of the text and of every setting that changes the voice.
+
+    Methods:
+        make_audio_key(text: str, voice: str, model: str, language: str, speaker_hash: Optional[str], sample_rate: int,
+                runtime: Optional[str] = None, precision: Optional[str] = None) -> str:
+            Hash the text and the synthesis settings into a cache key.
+
+        get_audios(keys: List[str]) -> Dict[str, np.ndarray]:
+            Return the cached waveforms of the keys that are in the cache.
+
+        put_audios(items: Iterable[Tuple[str, np.ndarray]], sample_rate: int) -> None:
+            Compress and store the waveforms.
+    """
+
+    def make_audio_key(
+        self,
+        text: str,
+        voice: str,
+        model: str,
+        language: str,
+        speaker_hash: Optional[str],
+        sample_rate: int,
+        runtime: Optional[str] = None,
+        precision: Optional[str] = None,
+    ) -> str:
+        """
+        Hash the text and the synthesis settings into a cache key.
+
+        The runtime ("torch" or "onnx") and the precision of the weights of a local model are
+        part of the key, since they change the waveform slightly.
+
+        Returns:
+            str: The cache key.
+        """
+        return self.make_key(
+            text=text,
+            voice=voice,
+            model=model,
+            language=language,
+            speaker_hash=speaker_hash,
+            sample_rate=sample_rate,
+            runtime=runtime,
+            precision=precision,
+        )
+
+    def get_audios(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Return the cached waveforms of the keys that are in the cache.
+
+        Args:
+            keys (List[str]): The cache keys.
+
+        Returns:
+            Dict[str, np.ndarray]: The mono float32 waveforms found in the cache.
+        """
+        return {
+            key: sf.read(io.BytesIO(value), dtype="float32")[0]
+            for key, value in self.get_many(keys).items()
+        }
+
+    def put_audios(
+        self, items: Iterable[Tuple[str, np.ndarray]], sample_rate: int
+    ) -> None:
+        """
+        Compress (FLAC) and store the waveforms.
+
+        Args:
+            items (Iterable[Tuple[str, np.ndarray]]): The (key, mono float waveform) pairs.
+            sample_rate (int): The sample rate of the waveforms.
+        """
+
+        def encode(wav):
+            buffer = io.BytesIO()
+            sf.write(
+                buffer,
+                np.clip(wav, -1, 1),
+                sample_rate,
+                format="FLAC",
+                subtype="PCM_16",
+            )
+            return buffer.getvalue()
+
+        self.put_many((key, encode(wav)) for key, wav in items)
@@ -0,0 +1,370 @@
+import json
+import mmap
+import os
+import struct
+from typing import Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"DHCHUNK1"
+# Rodapé: offset do índice, número de chunks, tamanho dos metadados e o magic
+FOOTER = struct.Struct("<QQQ8s")
+INDEX_DTYPE = np.dtype(
+    [
+        ("start", "<f8"),
+        ("end", "<f8"),
+        ("text_offset", "<u8"),
+        ("text_length", "<u4"),
+        ("extra_length", "<u4"),
+    ]
+)
+
+
+def chunk_store_path(json_path: str) -> str:
+    """
+    The path of the columnar artifact written next to a JSON transcript (same name, ".chunks" extension).
+    """
+    return os.path.splitext(json_path)[0] + ".chunks"
+
+
+def is_chunk_store(path: str) -> bool:
+    """
+    Check whether a file is a chunk store (and not a JSON transcript).
+    """
+    if not os.path.isfile(path):
+        return False
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class ChunkStore:
+    """
+    A compact, columnar file of timestamped chunks: a float64 start/end index and a UTF-8 text blob, read through memory maps.
+
+    The file holds the texts (and the extra keys of each chunk, as JSON) back to back, then
+    the index (one fixed-size record per chunk), the top-level fields of the transcript
+    (JSON) and a fixed-size footer. Opening a store reads only the footer: the index and the
+    texts are memory-mapped, so the start/end columns are zero-copy views and a text is
+    decoded only when accessed.
+
+    Appending never rewrites the texts already stored: the new texts, the whole index (32
+    bytes per chunk) and the metadata are written after the end of the file, synced, and the
+    append is committed by writing the new footer last. The previous index, metadata and
+    footer stay in the file as dead bytes of the text region. If an append is interrupted,
+    the file ends in an incomplete footer, and opening the store falls back to the last
+    complete one (the torn tail is overwritten by the next append). The bytes of a version
+    are never modified, so the `starts` and `ends` arrays read before an append stay valid,
+    but do not see the new chunks.
+
+    Missing end timestamps (None) are stored as NaN and read back as None, so the JSON
+    converters are lossless.
+
+    Args:
+        path (str): The path of the store.
+        meta (dict, optional): The top-level fields of the transcript (e.g. "text"), written when the store is created.
+            Defaults to None (an empty store is created only if the file does not exist).
+        overwrite (bool, optional): Whether to replace an existing store. Defaults to False.
+
+    Attributes:
+        meta (dict): The top-level fields of the transcript.
+        starts (np.ndarray): The start of each chunk, in seconds (read-only view of the file).
+        ends (np.ndarray): The end of each chunk, in seconds, NaN when missing (read-only view of the file).
+
+    Methods:
+        text(i: int) -> str:
+            Decode the text of a chunk.
+
+        append(chunks: Iterable[dict]) -> None:
+            Add chunks at the end of the store.
+
+        to_dict() -> dict:
+            Convert the store to the JSON transcript format.
+    """
+
+    def __init__(self, path: str, meta: Optional[dict] = None, overwrite: bool = False):
+        self.path = path
+        if overwrite or not os.path.isfile(path):
+            self._write(path, meta or {})
+        self._open()
+
+    @staticmethod
+    def _write(path: str, meta: dict, chunks: Iterable[dict] = ()) -> None:
+        store_dir = os.path.dirname(path)
+        if store_dir and not os.path.exists(store_dir):
+            os.makedirs(store_dir)
+
+        index, blob = _encode_chunks(chunks, len(MAGIC))
+        meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(blob)
+            f.write(index.tobytes())
+            f.write(meta_bytes)
+            f.write(
+                FOOTER.pack(len(MAGIC) + len(blob), len(index), len(meta_bytes), MAGIC)
+            )
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _find_footer(self) -> Tuple[int, int, int, int]:
+        """
+        Find the last complete footer of the file (the trailing one, unless an append was interrupted).
+
+        Returns:
+            Tuple[int, int, int, int]: The index offset, the number of chunks, the metadata length and the size of the committed file.
+
+        Raises:
+            ValueError: If the file has no complete footer.
+        """
+        with open(self.path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as data:
+            # Cada candidato é um magic seguido do fim do arquivo ou de uma versão posterior
+            end = len(data)
+            while True:
+                position = data.rfind(MAGIC, len(MAGIC), end)
+                footer_end = position + len(MAGIC)
+                if position < 0 or footer_end < len(MAGIC) + FOOTER.size:
+                    raise ValueError(f"{self.path} is not a chunk store.")
+                index_offset, n_chunks, meta_length, _ = FOOTER.unpack(
+                    data[footer_end - FOOTER.size : footer_end]
+                )
+                footer_start = footer_end - FOOTER.size
+                if (
+                    len(MAGIC) <= index_offset <= footer_start
+                    and index_offset + n_chunks * INDEX_DTYPE.itemsize + meta_length
+                    == footer_start
+                ):
+                    return index_offset, n_chunks, meta_length, footer_end
+                end = footer_end - 1
+
+    def _open(self) -> None:
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a chunk store.")
+        index_offset, n_chunks, meta_length, self._size = self._find_footer()
+        with open(self.path, "rb") as f:
+            f.seek(index_offset + n_chunks * INDEX_DTYPE.itemsize)
+            self.meta = json.loads(f.read(meta_length).decode("utf-8"))
+
+        self._index_offset = index_offset
+        # np.memmap não aceita tamanho zero
+        self._index = (
+            np.memmap(
+                self.path,
+                dtype=INDEX_DTYPE,
+                mode="r",
+                offset=index_offset,
+                shape=(n_chunks,),
+            )
+            if n_chunks
+            else np.zeros(0, dtype=INDEX_DTYPE)
+        )
+        self._blob = (
+            np.memmap(self.path, dtype=np.uint8, mode="r", shape=(index_offset,))
+            if n_chunks
+            else np.zeros(0, dtype=np.uint8)
+        )
+
+    @property
+    def starts(self) -> np.ndarray:
+        return self._index["start"]
+
+    @property
+    def ends(self) -> np.ndarray:
+        return self._index["end"]
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def text(self, i: int) -> str:
+        """
+        Decode the text of a chunk.
+
+        Args:
+            i (int): The index of the chunk.
+
+        Returns:
+            str: The text.
+        """
+        record = self._index[i]
+        offset = int(record["text_offset"])
+        return (
+            self._blob[offset : offset + int(record["text_length"])]
+            .tobytes()
+            .decode("utf-8")
+        )
+
+    def __getitem__(self, i: int) -> dict:
+        record = self._index[i]
+        offset = int(record["text_offset"]) + int(record["text_length"])
+        chunk = dict(
+            timestamp=[
+                _to_json_number(record["start"]),
+                _to_json_number(record["end"]),
+            ],
+            text=self.text(i),
+        )
+        if record["extra_length"]:
+            extra = self._blob[offset : offset + int(record["extra_length"])]
+            chunk.update(json.loads(extra.tobytes().decode("utf-8")))
+        return chunk
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, chunks: Iterable[dict]) -> None:
+        """
+        Add chunks at the end of the store.
+
+        Args:
+            chunks (Iterable[dict]): The chunks, each with a "timestamp" (start, end), a "text" and optionally other keys.
+        """
+        # Os novos textos começam no fim da versão atual: nenhum byte dela é reescrito
+        records, blob = _encode_chunks(chunks, self._size)
+        if not len(records):
+            return
+
+        index = np.concatenate([np.asarray(self._index), records])
+        meta = json.dumps(self.meta, ensure_ascii=False).encode("utf-8")
+        index_offset = self._size + len(blob)
+
+        with open(self.path, "r+b") as f:
+            # Descarta a cauda de um append interrompido
+            f.truncate(self._size)
+            f.seek(self._size)
+            f.write(blob)
+            f.write(index.tobytes())
+            f.write(meta)
+            f.flush()
+            os.fsync(f.fileno())
+            # O rodapé é escrito por último: é ele que confirma a nova versão
+            f.write(FOOTER.pack(index_offset, len(index), len(meta), MAGIC))
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._open()
+
+    def to_dict(self) -> dict:
+        """
+        Convert the store to the JSON transcript format.
+
+        Returns:
+            dict: The top-level fields and the "chunks".
+        """
+        return dict(self.meta, chunks=list(self))
+
+
+def _to_json_number(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+def _encode_chunks(chunks: Iterable[dict], offset: int) -> Tuple[np.ndarray, bytes]:
+    """
+    Encode chunks as index records and the bytes of their texts.
+
+    Args:
+        chunks (Iterable[dict]): The chunks, each with a "timestamp" (start, end), a "text" and optionally other keys.
+        offset (int): The position of the texts in the file.
+
+    Returns:
+        Tuple[np.ndarray, bytes]: The index records and the texts (followed by the extra keys, as JSON) back to back.
+    """
+    records = []
+    blob = bytearray()
+    for chunk in chunks:
+        text = chunk["text"].encode("utf-8")
+        extra = {k: v for k, v in chunk.items() if k not in ("timestamp", "text")}
+        extra = json.dumps(extra, ensure_ascii=False).encode("utf-8") if extra else b""
+        start, end = chunk["timestamp"]
+        records.append(
+            (
+                np.nan if start is None else start,
+                np.nan if end is None else end,
+                offset + len(blob),
+                len(text),
+                len(extra),
+            )
+        )
+        blob += text + extra
+    return np.array(records, dtype=INDEX_DTYPE), bytes(blob)
+
+
+def json_to_chunk_store(json_path: str, store_path: Optional[str] = None) -> str:
+    """
+    Convert a JSON transcript (transcription, segmentation or translation) to a chunk store.
+
+    Args:
+        json_path (str): The path of the JSON transcript.
+        store_path (str, optional): The path of the store. Defaults to None (`chunk_store_path(json_path)`).
+
+    Returns:
+        str: The path of the store.
+    """
+    with open(json_path) as f:
+        data = json.load(f)
+    store_path = store_path or chunk_store_path(json_path)
+    write_chunk_store(store_path, data)
+    return store_path
+
+
+def write_chunk_store(path: str, data: dict) -> None:
+    """
+    Write a transcript (a dict with "chunks" and other top-level fields) to a new chunk store.
+
+    Args:
+        path (str): The path of the store, replaced if it exists.
+        data (dict): The transcript.
+    """
+    # Escrita atômica, em uma única passada: leitores nunca veem um arquivo pela metade
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        ChunkStore._write(
+            tmp_path,
+            {key: value for key, value in data.items() if key != "chunks"},
+            data["chunks"],
+        )
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+
+def chunk_store_to_json(
+    store_path: str, json_path: Optional[str] = None, indent: Optional[int] = None
+) -> dict:
+    """
+    Convert a chunk store back to a JSON transcript.
+
+    Args:
+        store_path (str): The path of the store.
+        json_path (str, optional): Where to write the JSON. Defaults to None (not written).
+        indent (int, optional): The indentation of the JSON. Defaults to None (compact).
+
+    Returns:
+        dict: The transcript.
+    """
+    data = ChunkStore(store_path).to_dict()
+    if json_path is not None:
+        with open(json_path, "w") as f:
+            json.dump(data, f, indent=indent)
+    return data
+
+
+def load_chunks(path: str) -> dict:
+    """
+    Load a transcript from a JSON file or a chunk store. The chunks of a store are read lazily.
+
+    Args:
+        path (str): The path of the JSON transcript or of the store.
+
+    Returns:
+        dict: The transcript, whose "chunks" is a list (JSON) or a `ChunkStore`.
+    """
+    if is_chunk_store(path):
+        store = ChunkStore(path)
+        return dict(store.meta, chunks=store)
+    with open(path) as f:
+        return json.load(f)
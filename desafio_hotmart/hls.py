@@ -0,0 +1,242 @@
+import glob
+import math
+import os
+from typing import List
+
+import numpy as np
+import soundfile as sf
+
+from desafio_hotmart.profiling import profiler
+from desafio_hotmart.timeline import AudioTimeline
+from desafio_hotmart.video_manipulation import (
+    keyframe_times,
+    previous_keyframe,
+    run_ffmpeg,
+)
+
+PLAYLIST_NAME = "playlist.m3u8"
+SEGMENT_PATTERN = "segment_{:05d}.ts"
+
+
+def plan_segments(
+    keyframes: List[float],
+    start_seconds: float,
+    end_seconds: float,
+    segment_seconds: float = 6,
+) -> List[float]:
+    """
+    Choose the boundaries of the segments among the keyframes, so that every segment starts on a keyframe.
+
+    Each segment ends at the first keyframe at least `segment_seconds` after its start; the
+    last one ends at `end_seconds`, and is merged with the previous one when shorter than half
+    a segment.
+
+    Args:
+        keyframes (List[float]): The sorted keyframe timestamps of the video, in seconds. The first is the start of the first segment.
+        start_seconds (float): The start of the subclip (the first keyframe may be before it).
+        end_seconds (float): The end of the subclip.
+        segment_seconds (float, optional): The minimum duration of a segment. Defaults to 6.
+
+    Returns:
+        List[float]: The boundaries, from the first keyframe to `end_seconds` (n_segments + 1 values).
+    """
+    boundaries = [keyframes[0] if keyframes else start_seconds]
+    for keyframe in keyframes[1:]:
+        if keyframe >= end_seconds:
+            break
+        if keyframe - boundaries[-1] >= segment_seconds:
+            boundaries.append(keyframe)
+
+    if len(boundaries) > 1 and end_seconds - boundaries[-1] < segment_seconds / 2:
+        boundaries.pop()
+    boundaries.append(end_seconds)
+    return boundaries
+
+
+class HLSWriter:
+    """
+    Writes the dubbed video as an HLS stream (MPEG-TS segments and a .m3u8 playlist) that grows while the dubbed audio is produced.
+
+    The segments are cut at keyframes of the source video (see `plan_segments`), so their video
+    is stream-copied without decoding a frame, and only the audio of each segment is encoded
+    (AAC). A segment is written as soon as the dubbed audio is final up to its end, and the
+    playlist (an EVENT playlist, which players poll while it grows) then lists it; `finish`
+    writes the remaining segments and closes the playlist. The segment files and the playlist
+    are renamed into place, so a player never reads a file being written.
+
+    Like the stream-copy mux, the first segment starts at the last keyframe before the subclip
+    start, with silence over the lead-in.
+
+    Args:
+        video_path (str): The path to the source video.
+        output_dir (str): The directory of the segments and of the playlist. Previous segments in it are removed.
+        sample_rate (int): The sample rate of the dubbed audio.
+        subclip_start_seconds (float, optional): The start time of the subclip in seconds. Defaults to 0.
+        subclip_end_seconds (float, optional): The end time of the subclip in seconds. Defaults to 245.
+        segment_seconds (float, optional): The minimum duration of a segment. Defaults to 6.
+        audio_bitrate (str, optional): The bitrate of the encoded AAC audio. Defaults to "192k".
+
+    Attributes:
+        playlist_path (str): The path of the playlist.
+        boundaries (List[float]): The boundaries of the segments, in seconds of the source video.
+        n_written (int): The number of segments written so far.
+
+    Methods:
+        update(audio: AudioTimeline, final_seconds: float) -> int:
+            Write the segments whose dubbed audio is final, and return how many were written.
+
+        finish(audio: AudioTimeline) -> None:
+            Write the remaining segments and close the playlist.
+    """
+
+    def __init__(
+        self,
+        video_path: str,
+        output_dir: str,
+        sample_rate: int,
+        subclip_start_seconds: float = 0,
+        subclip_end_seconds: float = 245,
+        segment_seconds: float = 6,
+        audio_bitrate: str = "192k",
+    ):
+        self.video_path = video_path
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.subclip_start_seconds = subclip_start_seconds
+        self.audio_bitrate = audio_bitrate
+        self.playlist_path = os.path.join(output_dir, PLAYLIST_NAME)
+
+        first = previous_keyframe(video_path, subclip_start_seconds)
+        keyframes = keyframe_times(video_path, first, subclip_end_seconds - first)
+        self.boundaries = plan_segments(
+            [first] + [t for t in keyframes if t > first + 0.001],
+            subclip_start_seconds,
+            subclip_end_seconds,
+            segment_seconds,
+        )
+        self.n_written = 0
+
+        # Segmentos de uma execução anterior não podem aparecer na nova playlist
+        os.makedirs(output_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(output_dir, "segment_*.ts")):
+            os.remove(path)
+        self._write_playlist(ended=False)
+
+    @property
+    def n_segments(self) -> int:
+        return len(self.boundaries) - 1
+
+    def _audio_window(self, audio: AudioTimeline, i: int) -> np.ndarray:
+        # Tempo do áudio dublado = tempo do vídeo - início do subclip (negativo no lead-in)
+        start = int(
+            round((self.boundaries[i] - self.subclip_start_seconds) * self.sample_rate)
+        )
+        end = int(
+            round(
+                (self.boundaries[i + 1] - self.subclip_start_seconds) * self.sample_rate
+            )
+        )
+        window = np.zeros(end - start, dtype=np.float32)
+        samples = audio.samples[max(start, 0) : max(end, 0)]
+        offset = max(-start, 0)
+        window[offset : offset + len(samples)] = samples
+        return window
+
+    def _write_segment(self, audio: AudioTimeline, i: int) -> None:
+        start, end = self.boundaries[i], self.boundaries[i + 1]
+        path = os.path.join(self.output_dir, SEGMENT_PATTERN.format(i))
+        audio_path = f"{path}.wav"
+        tmp_path = f"{path}.tmp"
+
+        with profiler.span("hls.segment", "io", segment=i):
+            sf.write(
+                audio_path,
+                np.clip(self._audio_window(audio, i), -1, 1),
+                self.sample_rate,
+                subtype="PCM_16",
+            )
+            try:
+                run_ffmpeg(
+                    [
+                        "-ss",
+                        str(start),
+                        "-i",
+                        self.video_path,
+                        "-i",
+                        audio_path,
+                        "-map",
+                        "0:v:0",
+                        "-map",
+                        "1:a:0",
+                        "-t",
+                        str(end - start),
+                        "-c:v",
+                        "copy",
+                        "-c:a",
+                        "aac",
+                        "-b:a",
+                        self.audio_bitrate,
+                        # Timestamps contínuos entre os segmentos, codificados de forma independente
+                        "-output_ts_offset",
+                        str(start - self.boundaries[0]),
+                        "-f",
+                        "mpegts",
+                        tmp_path,
+                    ]
+                )
+            finally:
+                os.remove(audio_path)
+            os.replace(tmp_path, path)
+
+    def _write_playlist(self, ended: bool) -> None:
+        durations = np.diff(self.boundaries)
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            # A duração alvo não pode mudar enquanto a playlist cresce: usa a do maior segmento planejado
+            f"#EXT-X-TARGETDURATION:{math.ceil(durations.max())}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+        ]
+        for i in range(self.n_written):
+            lines += [f"#EXTINF:{durations[i]:.3f},", SEGMENT_PATTERN.format(i)]
+        if ended:
+            lines.append("#EXT-X-ENDLIST")
+
+        tmp_path = f"{self.playlist_path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.playlist_path)
+
+    def update(self, audio: AudioTimeline, final_seconds: float) -> int:
+        """
+        Write the segments whose dubbed audio is final, and list them in the playlist.
+
+        Args:
+            audio (AudioTimeline): The dubbed audio written so far.
+            final_seconds (float): The time (in seconds of the dubbed audio) up to which the audio will not change.
+
+        Returns:
+            int: The number of segments written by this call.
+        """
+        written = 0
+        while self.n_written < self.n_segments and (
+            self.boundaries[self.n_written + 1] - self.subclip_start_seconds
+            <= final_seconds
+        ):
+            self._write_segment(audio, self.n_written)
+            self.n_written += 1
+            written += 1
+        if written:
+            self._write_playlist(ended=False)
+        return written
+
+    def finish(self, audio: AudioTimeline) -> None:
+        """
+        Write the remaining segments and close the playlist.
+
+        Args:
+            audio (AudioTimeline): The final dubbed audio.
+        """
+        self.update(audio, math.inf)
+        self._write_playlist(ended=True)
@@ -0,0 +1,102 @@
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from desafio_hotmart.profiling import profiler
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of loaded models, keyed by model name and device.
+
+    Models are loaded lazily on the first `get` and kept in memory until `release` is called,
+    so every caller in the same process shares a single copy of each checkpoint.
+
+    Attributes:
+        load_times (dict): The time (in seconds) spent loading each (name, device) pair.
+
+    Methods:
+        get(name: str, device: str, loader: Callable[[], Any]) -> Any:
+            Return the model for (name, device), loading it with `loader` if needed.
+
+        is_loaded(name: str, device: str) -> bool:
+            Check whether the model is already in memory.
+
+        release(name: str, device: Optional[str] = None) -> None:
+            Drop the model (on every device if `device` is None) from the registry.
+
+        release_all() -> None:
+            Drop every model from the registry.
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self.load_times = {}
+
+    def _key_lock(self, key: tuple) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, name: str, device: str, loader: Callable[[], Any]) -> Any:
+        """
+        Return the model for (name, device), loading it with `loader` if needed.
+
+        Args:
+            name (str): The name of the model.
+            device (str): The device where the model lives (e.g. "cpu", "cuda").
+            loader (Callable[[], Any]): A function that loads the model when it is not in memory.
+
+        Returns:
+            Any: The loaded model.
+        """
+        key = (name, device)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        # Um lock por chave, para que carregar um modelo não bloqueie o carregamento dos demais
+        with self._key_lock(key):
+            if key not in self._models:
+                start = time.perf_counter()
+                with profiler.span(name, "model_load", device=device):
+                    self._models[key] = loader()
+                self.load_times[key] = time.perf_counter() - start
+            return self._models[key]
+
+    def is_loaded(self, name: str, device: str) -> bool:
+        """
+        Check whether the model is already in memory.
+
+        Args:
+            name (str): The name of the model.
+            device (str): The device where the model lives.
+
+        Returns:
+            bool: True if the model is loaded.
+        """
+        return (name, device) in self._models
+
+    def release(self, name: str, device: Optional[str] = None) -> None:
+        """
+        Drop the model from the registry, so it can be garbage collected.
+
+        Args:
+            name (str): The name of the model.
+            device (str, optional): The device of the model. If None, the model is released on every device.
+        """
+        with self._lock:
+            for key in list(self._models):
+                if key[0] == name and (device is None or key[1] == device):
+                    del self._models[key]
+
+    def release_all(self) -> None:
+        """
+        Drop every model from the registry.
+        """
+        with self._lock:
+            self._models.clear()
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,272 @@
+import os
+import shutil
+from typing import Optional
+
+import numpy as np
+
+# torch, onnxruntime e optimum são importados apenas quando o backend onnx é usado
+ONNX_CACHE_DIR = "data/cache/onnx"
+ONNX_OPSET = 17
+HIFIGAN_FILE = "hifigan_decoder.onnx"
+
+
+def import_onnxruntime():
+    """
+    Import onnxruntime, which is an optional dependency of the ONNX backend.
+
+    Raises:
+        ImportError: If onnxruntime is not installed.
+    """
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise ImportError(
+            "The onnx backend requires the onnxruntime, onnx and optimum packages "
+            "(poetry install -E onnx)."
+        ) from e
+    return onnxruntime
+
+
+def session_options(
+    intra_op_threads: Optional[int] = None, inter_op_threads: Optional[int] = None
+):
+    """
+    Build the options of an ONNX Runtime session, with every graph optimization enabled.
+
+    Args:
+        intra_op_threads (int, optional): The threads used inside an operator (e.g. a MatMul). Defaults to None (one per core).
+        inter_op_threads (int, optional): The threads used to run independent operators in parallel. Defaults to None (sequential execution).
+
+    Returns:
+        onnxruntime.SessionOptions: The session options.
+    """
+    ort = import_onnxruntime()
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if intra_op_threads:
+        options.intra_op_num_threads = intra_op_threads
+    if inter_op_threads:
+        # As threads inter-op só são usadas no modo de execução paralelo
+        options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        options.inter_op_num_threads = inter_op_threads
+    return options
+
+
+def export_dir(cache_dir: str, name: str, quantize: bool = False) -> str:
+    """
+    The directory of the exported graphs of a model in the cache (one per model and precision).
+    """
+    return os.path.join(
+        cache_dir, name.replace("/", "--") + ("-int8" if quantize else "")
+    )
+
+
+def _publish(tmp_dir: str, path: str) -> None:
+    # Outro processo pode ter exportado o mesmo modelo ao mesmo tempo: fica a primeira cópia
+    try:
+        os.replace(tmp_dir, path)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def quantize_dir(src_dir: str, dst_dir: str) -> str:
+    """
+    Quantize every ONNX graph of an export directory to int8 (dynamic quantization of the weights), copying the other files.
+
+    Args:
+        src_dir (str): The directory of the float32 export.
+        dst_dir (str): The directory of the int8 export, created only once.
+
+    Returns:
+        str: `dst_dir`.
+    """
+    if os.path.isdir(dst_dir):
+        return dst_dir
+
+    import_onnxruntime()
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    tmp_dir = f"{dst_dir}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    for filename in os.listdir(src_dir):
+        src = os.path.join(src_dir, filename)
+        if filename.endswith(".onnx"):
+            quantize_dynamic(
+                src, os.path.join(tmp_dir, filename), weight_type=QuantType.QInt8
+            )
+        elif not filename.endswith((".onnx_data", ".onnx.data")):
+            shutil.copy2(src, tmp_dir)
+
+    _publish(tmp_dir, dst_dir)
+    return dst_dir
+
+
+def export_nllb(
+    model: str, cache_dir: str = ONNX_CACHE_DIR, quantize: bool = False
+) -> str:
+    """
+    Export an NLLB checkpoint to ONNX (encoder, decoder and decoder with past) with optimum, only once.
+
+    Args:
+        model (str): The id of the checkpoint (e.g. "facebook/nllb-200-distilled-600M").
+        cache_dir (str, optional): The directory of the exported graphs. Defaults to "data/cache/onnx".
+        quantize (bool, optional): Whether to quantize the graphs to int8. Defaults to False.
+
+    Returns:
+        str: The directory of the export, loadable with `ORTModelForSeq2SeqLM.from_pretrained`.
+    """
+    import_onnxruntime()
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer
+
+    fp32_dir = export_dir(cache_dir, model)
+    if not os.path.isdir(fp32_dir):
+        tmp_dir = f"{fp32_dir}.{os.getpid()}.tmp"
+        ORTModelForSeq2SeqLM.from_pretrained(model, export=True).save_pretrained(
+            tmp_dir
+        )
+        AutoTokenizer.from_pretrained(model).save_pretrained(tmp_dir)
+        _publish(tmp_dir, fp32_dir)
+
+    if quantize:
+        return quantize_dir(fp32_dir, export_dir(cache_dir, model, quantize=True))
+    return fp32_dir
+
+
+def load_nllb_pipeline(
+    model: str,
+    src_lang: str,
+    tgt_lang: str,
+    cache_dir: str = ONNX_CACHE_DIR,
+    quantize: bool = False,
+    intra_op_threads: Optional[int] = None,
+    inter_op_threads: Optional[int] = None,
+):
+    """
+    Build a translation pipeline whose NLLB model runs on ONNX Runtime (CPU), exporting the model on the first use.
+
+    Args:
+        model (str): The id of the checkpoint.
+        src_lang (str): The source language (e.g. "por_Latn").
+        tgt_lang (str): The target language (e.g. "eng_Latn").
+        cache_dir (str, optional): The directory of the exported graphs. Defaults to "data/cache/onnx".
+        quantize (bool, optional): Whether to run the int8 graphs. Defaults to False.
+        intra_op_threads (int, optional): The intra-op threads of the sessions. Defaults to None.
+        inter_op_threads (int, optional): The inter-op threads of the sessions. Defaults to None.
+
+    Returns:
+        TranslationPipeline: The translation pipeline, used like the PyTorch one.
+    """
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer, pipeline
+
+    path = export_nllb(model, cache_dir, quantize)
+    ort_model = ORTModelForSeq2SeqLM.from_pretrained(
+        path,
+        provider="CPUExecutionProvider",
+        session_options=session_options(intra_op_threads, inter_op_threads),
+    )
+    return pipeline(
+        "translation",
+        model=ort_model,
+        tokenizer=AutoTokenizer.from_pretrained(path),
+        src_lang=src_lang,
+        tgt_lang=tgt_lang,
+    )
+
+
+class OnnxHifiganDecoder:
+    """
+    Drop-in replacement of the XTTS HiFi-GAN decoder (GPT latents → waveform) that runs an ONNX Runtime session.
+
+    Called like the PyTorch decoder, `decoder(latents, g=speaker_embedding)`, with and returning torch tensors.
+
+    Args:
+        session (onnxruntime.InferenceSession): The session of the exported decoder.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    def __call__(self, latents, g=None):
+        import torch
+
+        wav = self.session.run(
+            None,
+            {
+                "latents": latents.detach().cpu().numpy().astype(np.float32),
+                "speaker_embedding": g.detach().cpu().numpy().astype(np.float32),
+            },
+        )[0]
+        return torch.from_numpy(wav)
+
+
+def export_xtts_vocoder(xtts, name: str, cache_dir: str = ONNX_CACHE_DIR) -> str:
+    """
+    Export the HiFi-GAN decoder of an XTTS model to ONNX, with a variable number of latent frames, only once.
+
+    The autoregressive GPT of XTTS (sampling loop with a KV cache) stays in PyTorch: only the
+    vocoder, a feed-forward convolutional network, is exported. It is kept in float32, since
+    int8 convolutions degrade the waveform audibly.
+
+    Args:
+        xtts (Xtts): The loaded XTTS model (`TTS(...).synthesizer.tts_model`).
+        name (str): The name of the model, used in the cache (e.g. "tts_models/multilingual/multi-dataset/xtts_v2").
+        cache_dir (str, optional): The directory of the exported graphs. Defaults to "data/cache/onnx".
+
+    Returns:
+        str: The path of the exported graph.
+    """
+    import torch
+
+    path = os.path.join(export_dir(cache_dir, f"{name}-hifigan"), HIFIGAN_FILE)
+    if os.path.isfile(path):
+        return path
+
+    tmp_dir = f"{os.path.dirname(path)}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    decoder = xtts.hifigan_decoder.eval()
+    latents = torch.randn(1, 32, xtts.args.gpt_n_model_channels)
+    speaker_embedding = torch.randn(1, xtts.args.d_vector_dim, 1)
+    with torch.inference_mode():
+        torch.onnx.export(
+            decoder,
+            (latents, speaker_embedding),
+            os.path.join(tmp_dir, HIFIGAN_FILE),
+            input_names=["latents", "speaker_embedding"],
+            output_names=["wav"],
+            dynamic_axes={"latents": {1: "frames"}, "wav": {2: "samples"}},
+            opset_version=ONNX_OPSET,
+        )
+
+    _publish(tmp_dir, os.path.dirname(path))
+    return path
+
+
+def load_xtts_vocoder(
+    xtts,
+    name: str,
+    cache_dir: str = ONNX_CACHE_DIR,
+    intra_op_threads: Optional[int] = None,
+    inter_op_threads: Optional[int] = None,
+) -> OnnxHifiganDecoder:
+    """
+    Load the ONNX HiFi-GAN decoder of an XTTS model, exporting it on the first use.
+
+    Args:
+        xtts (Xtts): The loaded XTTS model.
+        name (str): The name of the model, used in the cache.
+        cache_dir (str, optional): The directory of the exported graphs. Defaults to "data/cache/onnx".
+        intra_op_threads (int, optional): The intra-op threads of the session. Defaults to None.
+        inter_op_threads (int, optional): The inter-op threads of the session. Defaults to None.
+
+    Returns:
+        OnnxHifiganDecoder: The decoder, to put in place of `xtts.hifigan_decoder`.
+    """
+    ort = import_onnxruntime()
+    session = ort.InferenceSession(
+        export_xtts_vocoder(xtts, name, cache_dir),
+        sess_options=session_options(intra_op_threads, inter_op_threads),
+        providers=["CPUExecutionProvider"],
+    )
+    return OnnxHifiganDecoder(session)
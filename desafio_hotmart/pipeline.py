@@ -0,0 +1,239 @@
+import cProfile
+import hashlib
+import json
+import os
+from typing import Callable, Iterable, List, Optional
+
+from desafio_hotmart.cache import file_sha256
+from desafio_hotmart.profiling import profiler
+
+
+class Stage:
+    """
+    A step of the pipeline, with the files it reads and writes and the settings that change its output.
+
+    Args:
+        name (str): The name of the stage.
+        run (Callable[[dict], None]): The function that runs the stage, given the configuration.
+        inputs (List[str]): The paths of the files read by the stage.
+        outputs (List[str]): The paths of the files written by the stage.
+        params (dict, optional): The settings that change the output of the stage. Defaults to {}.
+        depends_on (List[str], optional): The names of the stages that must run before this one. Defaults to [].
+        resource (str, optional): The kind of worker the stage needs in batch jobs: "cpu" (ffmpeg, signal processing)
+            or "model" (loads a large model). Defaults to "cpu".
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[dict], None],
+        inputs: List[str],
+        outputs: List[str],
+        params: Optional[dict] = None,
+        depends_on: Optional[List[str]] = None,
+        resource: str = "cpu",
+    ):
+        self.name = name
+        self.run = run
+        self.inputs = inputs
+        self.outputs = outputs
+        self.params = params or {}
+        self.depends_on = depends_on or []
+        self.resource = resource
+
+
+class PipelineRunner:
+    """
+    Runs the stages of the pipeline in dependency order, skipping the stages whose inputs and settings did not change.
+
+    After each stage completes, its fingerprint (the hash of its settings and of the contents
+    of its inputs) is saved to a state file. A stage is up to date when its current fingerprint
+    matches the saved one and its outputs still exist, so an interrupted job resumes from the
+    first stage that did not complete.
+
+    Args:
+        stages (List[Stage]): The stages of the pipeline.
+        config (dict): The configuration passed to each stage.
+        state_path (str): The path of the JSON file with the fingerprints of the completed stages.
+        profile_dir (str, optional): Where to write a cProfile dump (`<stage>.prof`) of each stage that runs. Defaults to None (no dump).
+
+    Methods:
+        fingerprint(stage: Stage) -> str:
+            Hash the settings and the input contents of a stage.
+
+        is_up_to_date(stage: Stage) -> bool:
+            Check whether the stage can be skipped.
+
+        run_stage(name: str, force: bool = False) -> bool:
+            Run a single stage if it is not up to date.
+
+        run(force: Iterable[str] = ()) -> List[str]:
+            Run the stages that are not up to date and return their names.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        config: dict,
+        state_path: str,
+        profile_dir: Optional[str] = None,
+    ):
+        self.stages = self._sort(stages)
+        self.config = config
+        self.state_path = state_path
+        self.profile_dir = profile_dir
+        self.state = self._load_state()
+
+    @staticmethod
+    def _sort(stages: List[Stage]) -> List[Stage]:
+        by_name = {stage.name: stage for stage in stages}
+        ordered, visiting, done = [], set(), set()
+
+        def visit(stage):
+            if stage.name in done:
+                return
+            if stage.name in visiting:
+                raise ValueError(f"Cycle in the pipeline at stage '{stage.name}'")
+            visiting.add(stage.name)
+            for dependency in stage.depends_on:
+                visit(by_name[dependency])
+            visiting.discard(stage.name)
+            done.add(stage.name)
+            ordered.append(stage)
+
+        for stage in stages:
+            visit(stage)
+
+        return ordered
+
+    def _load_state(self) -> dict:
+        if os.path.isfile(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {"stages": {}, "files": {}}
+
+    def _save_state(self) -> None:
+        state_dir = os.path.dirname(self.state_path)
+        if state_dir and not os.path.exists(state_dir):
+            os.makedirs(state_dir)
+
+        # Escrita atômica: um job interrompido nunca deixa o estado corrompido
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=4)
+        os.replace(tmp_path, self.state_path)
+
+    def _file_hash(self, path: str) -> Optional[str]:
+        if not os.path.isfile(path):
+            return None
+
+        # Só recalcula o hash quando tamanho ou mtime mudam (o vídeo pode ter vários GB)
+        stat = os.stat(path)
+        cached = self.state["files"].get(path)
+        if (
+            cached
+            and cached["size"] == stat.st_size
+            and cached["mtime"] == stat.st_mtime_ns
+        ):
+            return cached["sha256"]
+
+        digest = file_sha256(path)
+        self.state["files"][path] = dict(
+            size=stat.st_size, mtime=stat.st_mtime_ns, sha256=digest
+        )
+        return digest
+
+    def fingerprint(self, stage: Stage) -> str:
+        """
+        Hash the settings and the input contents of a stage.
+
+        Args:
+            stage (Stage): The stage.
+
+        Returns:
+            str: The SHA-256 hex digest.
+        """
+        payload = dict(
+            stage=stage.name,
+            params=stage.params,
+            inputs={path: self._file_hash(path) for path in stage.inputs},
+        )
+        return hashlib.sha256(
+            json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def is_up_to_date(self, stage: Stage) -> bool:
+        """
+        Check whether the stage can be skipped: same fingerprint as its last completed run, and every output still exists.
+
+        Args:
+            stage (Stage): The stage.
+
+        Returns:
+            bool: True if the stage is up to date.
+        """
+        saved = self.state["stages"].get(stage.name)
+        if saved is None or not all(os.path.isfile(path) for path in stage.outputs):
+            return False
+        return saved["fingerprint"] == self.fingerprint(stage)
+
+    def run_stage(self, name: str, force: bool = False) -> bool:
+        """
+        Run a single stage if it is not up to date (its dependencies are assumed to be complete).
+
+        Args:
+            name (str): The name of the stage.
+            force (bool, optional): Whether to run the stage even if it is up to date. Defaults to False.
+
+        Returns:
+            bool: True if the stage ran, False if it was skipped.
+        """
+        stage = next(stage for stage in self.stages if stage.name == name)
+        if not force and self.is_up_to_date(stage):
+            print(f"Skipping {stage.name} (up to date)")
+            return False
+
+        fingerprint = self.fingerprint(stage)
+        with profiler.span(stage.name, "stage"):
+            if self.profile_dir is None:
+                stage.run(self.config)
+            else:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                with cProfile.Profile() as profile:
+                    stage.run(self.config)
+                profile.dump_stats(os.path.join(self.profile_dir, f"{stage.name}.prof"))
+
+        for path in stage.outputs:
+            self._file_hash(path)
+        self.state["stages"][stage.name] = dict(fingerprint=fingerprint)
+        self._save_state()
+        return True
+
+    def run(self, force: Iterable[str] = ()) -> List[str]:
+        """
+        Run the stages that are not up to date, in dependency order.
+
+        Args:
+            force (Iterable[str], optional): The names of the stages to run even if up to date ("all" forces every stage). Defaults to ().
+
+        Returns:
+            List[str]: The names of the stages that ran.
+
+        Raises:
+            ValueError: If a forced stage does not exist.
+        """
+        names = [stage.name for stage in self.stages]
+        force = set(force)
+        if "all" in force:
+            force = set(names)
+        unknown = force - set(names)
+        if unknown:
+            raise ValueError(
+                f"Unknown stage(s) {sorted(unknown)}. Please choose among {names} or 'all'."
+            )
+
+        return [
+            stage.name
+            for stage in self.stages
+            if self.run_stage(stage.name, force=stage.name in force)
+        ]
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> float:
+    """
+    Return the peak resident set size of the current process, in MiB (0 where it is not available).
+    """
+    if resource is None:
+        return 0.0
+    # ru_maxrss em KiB no Linux e em bytes no macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if os.uname().sysname == "Darwin" else peak / 1024
+
+
+class Profiler:
+    """
+    Process-wide recorder of timed spans (stages, model loads, chunks, API calls), exported as a Chrome trace.
+
+    Each span records its wall time, the CPU time of the process and the peak RSS of the
+    process when it ends. Spans are thread-safe and can be nested. When the profiler is
+    disabled, `span` does nothing, so the instrumentation can stay in the code.
+
+    Attributes:
+        enabled (bool): Whether spans are recorded. Defaults to False.
+        events (list): The recorded spans, as Chrome trace "complete" events.
+
+    Methods:
+        span(name: str, category: str = "function", **args):
+            Context manager that records the enclosed block.
+
+        summary() -> Dict[str, dict]:
+            Aggregate the spans by category and name.
+
+        export(path: str) -> None:
+            Write the spans to a Chrome trace file (chrome://tracing, Perfetto) and the summary next to it.
+
+        reset() -> None:
+            Drop the recorded spans.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, category: str = "function", **args):
+        """
+        Record the enclosed block as a span.
+
+        Args:
+            name (str): The name of the span (e.g. the stage or the model).
+            category (str, optional): The kind of span ("stage", "model_load", "inference", "api", ...). Defaults to "function".
+            **args: Extra values stored with the span (e.g. the chunk index).
+        """
+        if not self.enabled:
+            yield
+            return
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall_end = time.perf_counter()
+            event = dict(
+                name=name,
+                cat=category,
+                ph="X",
+                ts=(wall_start - self._origin) * 1e6,
+                dur=(wall_end - wall_start) * 1e6,
+                pid=os.getpid(),
+                tid=threading.get_ident(),
+                args=dict(
+                    args,
+                    cpu_seconds=time.process_time() - cpu_start,
+                    peak_rss_mb=peak_rss_mb(),
+                ),
+            )
+            with self._lock:
+                self.events.append(event)
+
+    def summary(self) -> Dict[str, dict]:
+        """
+        Aggregate the spans by category and name.
+
+        Returns:
+            Dict[str, dict]: For each "category:name", the number of spans, their total and maximum wall time,
+                their total CPU time (in seconds) and the peak RSS (in MiB).
+        """
+        summary = {}
+        with self._lock:
+            events = list(self.events)
+
+        for event in events:
+            stats = summary.setdefault(
+                f"{event['cat']}:{event['name']}",
+                dict(count=0, wall_seconds=0.0, max_wall_seconds=0.0, cpu_seconds=0.0),
+            )
+            wall = event["dur"] / 1e6
+            stats["count"] += 1
+            stats["wall_seconds"] += wall
+            stats["max_wall_seconds"] = max(stats["max_wall_seconds"], wall)
+            stats["cpu_seconds"] += event["args"]["cpu_seconds"]
+            stats["peak_rss_mb"] = max(
+                stats.get("peak_rss_mb", 0.0), event["args"]["peak_rss_mb"]
+            )
+
+        return summary
+
+    def export(self, path: str) -> None:
+        """
+        Write the spans to a Chrome trace file (open it in chrome://tracing or ui.perfetto.dev), and their summary to `<path>.summary.json`.
+
+        Args:
+            path (str): The path of the trace file.
+        """
+        trace_dir = os.path.dirname(path)
+        if trace_dir and not os.path.exists(trace_dir):
+            os.makedirs(trace_dir, exist_ok=True)
+
+        with self._lock:
+            events = list(self.events)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+        with open(f"{os.path.splitext(path)[0]}.summary.json", "w") as f:
+            json.dump(self.summary(), f, indent=4)
+
+    def reset(self) -> None:
+        """
+        Drop the recorded spans.
+        """
+        with self._lock:
+            self.events = []
+
+
+profiler = Profiler()
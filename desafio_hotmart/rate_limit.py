@@ -0,0 +1,107 @@
+import asyncio
+import datetime
+import email.utils
+import random
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    An asyncio token-bucket rate limiter.
+
+    Tokens are refilled continuously at `rate` per second, up to `capacity`. Each request
+    consumes one token and waits when the bucket is empty, so bursts are bounded by
+    `capacity` and the sustained throughput by `rate`.
+
+    Args:
+        rate (float): The number of tokens added per second.
+        capacity (float, optional): The maximum number of tokens in the bucket. Defaults to max(1, rate).
+
+    Methods:
+        acquire(tokens: float = 1) -> None:
+            Wait until `tokens` tokens are available and consume them.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("The rate must be positive.")
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """
+        Wait until `tokens` tokens are available and consume them.
+
+        Args:
+            tokens (float, optional): The number of tokens to consume. Defaults to 1.
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = 0.5,
+    maximum: float = 30.0,
+    retry_after: Optional[float] = None,
+) -> float:
+    """
+    Compute the delay before a retry, with exponential backoff and full jitter.
+
+    Args:
+        attempt (int): The number of the retry (starting at 0).
+        base (float, optional): The delay of the first retry, in seconds. Defaults to 0.5.
+        maximum (float, optional): The maximum delay, in seconds. Defaults to 30.
+        retry_after (float, optional): The delay requested by the server (Retry-After header), which takes precedence.
+
+    Returns:
+        float: The delay in seconds.
+    """
+    if retry_after is not None:
+        return min(retry_after, maximum)
+    return random.uniform(0, min(maximum, base * 2**attempt))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header, given either as a number of seconds or as an HTTP date.
+
+    Args:
+        value (str, optional): The value of the header.
+
+    Returns:
+        Optional[float]: The delay in seconds (0 for a date in the past), or None if the header is missing or invalid
+            (the computed backoff is used then).
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        # Datas HTTP são sempre em GMT
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max(0.0, (date - now).total_seconds())
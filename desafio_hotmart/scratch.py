@@ -0,0 +1,147 @@
+import os
+import shutil
+import tempfile
+import time
+import weakref
+from typing import Optional
+
+TMPFS_ROOT = "/dev/shm"
+SCRATCH_PREFIX = "desafio-hotmart-"
+
+
+class ScratchSpace:
+    """
+    A private scratch directory for the temporary files of one job, removed when the job ends.
+
+    Every instance gets a new directory (named after the process id plus a random suffix), so
+    concurrent jobs on the same host never share files, and a new run never picks up the files
+    of a crashed one. The directory is created once, on first use, and removed on exit of the
+    `with` block, whether the job succeeded or failed (or, without a `with` block, when the
+    instance is garbage collected or the interpreter exits).
+
+    Args:
+        root (str, optional): The directory where the scratch directory is created. Defaults to None (tmpfs if
+            `use_tmpfs`, otherwise the system temporary directory).
+        use_tmpfs (bool, optional): Whether to place the scratch directory in memory (/dev/shm), when available. Defaults to False.
+        keep (bool, optional): Whether to keep the files after the job, for debugging. Defaults to False.
+
+    Methods:
+        path(*names: str) -> str:
+            Return the path of a file in the scratch directory, creating its parent directories once.
+
+        cleanup() -> None:
+            Remove the scratch directory and its files.
+    """
+
+    def __init__(
+        self, root: Optional[str] = None, use_tmpfs: bool = False, keep: bool = False
+    ):
+        if root is None:
+            use_tmpfs = (
+                use_tmpfs
+                and os.path.isdir(TMPFS_ROOT)
+                and os.access(TMPFS_ROOT, os.W_OK)
+            )
+            root = TMPFS_ROOT if use_tmpfs else tempfile.gettempdir()
+
+        self.root = root
+        self.keep = keep
+        self._dir = None
+        self._created_dirs = set()
+        self._finalizer = None
+
+    @property
+    def dir(self) -> str:
+        """
+        The scratch directory, created on first access.
+        """
+        if self._dir is None:
+            os.makedirs(self.root, exist_ok=True)
+            self._dir = tempfile.mkdtemp(
+                prefix=f"{SCRATCH_PREFIX}{os.getpid()}-", dir=self.root
+            )
+            self._created_dirs.add(self._dir)
+            if not self.keep:
+                self._finalizer = weakref.finalize(
+                    self, shutil.rmtree, self._dir, ignore_errors=True
+                )
+        return self._dir
+
+    def path(self, *names: str) -> str:
+        """
+        Return the path of a file in the scratch directory, creating its parent directories once.
+
+        Args:
+            *names (str): The path components, relative to the scratch directory.
+
+        Returns:
+            str: The absolute path of the file.
+        """
+        path = os.path.join(self.dir, *names)
+        parent = os.path.dirname(path)
+        if parent not in self._created_dirs:
+            os.makedirs(parent, exist_ok=True)
+            self._created_dirs.add(parent)
+        return path
+
+    def cleanup(self) -> None:
+        """
+        Remove the scratch directory and its files (unless `keep` is set).
+        """
+        if self._finalizer is not None:
+            self._finalizer()
+        self._dir = None
+        self._created_dirs.clear()
+        self._finalizer = None
+
+    def __enter__(self) -> "ScratchSpace":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.cleanup()
+
+
+def remove_stale_scratch(root: Optional[str] = None, max_age_seconds: float = 0) -> int:
+    """
+    Remove the scratch directories left behind by processes that are no longer running (e.g. killed jobs).
+
+    Args:
+        root (str, optional): The directory where the scratch directories were created. Defaults to None
+            (both the system temporary directory and /dev/shm).
+        max_age_seconds (float, optional): Only remove directories older than this. Defaults to 0.
+
+    Returns:
+        int: The number of directories removed.
+    """
+    roots = [root] if root else [tempfile.gettempdir(), TMPFS_ROOT]
+    removed = 0
+
+    for root in roots:
+        if not os.path.isdir(root):
+            continue
+        for name in os.listdir(root):
+            if not name.startswith(SCRATCH_PREFIX):
+                continue
+            path = os.path.join(root, name)
+            try:
+                pid = int(name[len(SCRATCH_PREFIX) :].split("-")[0])
+                age = time.time() - os.path.getmtime(path)
+            except (ValueError, OSError):
+                continue
+            if _is_running(pid) or age < max_age_seconds:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+
+    return removed
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # O processo existe, mas pertence a outro usuário
+        return True
+    return True
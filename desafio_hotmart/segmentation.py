@@ -0,0 +1,178 @@
+import re
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from desafio_hotmart.vad import EnergyVAD
+
+SENTENCE_END = re.compile(r"(?<=[.?!…])\s+")
+CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
+
+
+class SentenceSegmenter:
+    """
+    Re-segments Whisper chunks into sentence units of a target duration, to cut the per-chunk overhead of translation and TTS.
+
+    Whisper often returns tiny fragments (" Vamos lá?") or long run-on chunks. Consecutive
+    chunks are merged until they end a sentence and last at least `min_seconds`, without
+    crossing a pause longer than `max_gap_seconds` (the dubbed speech must stay in its time
+    slot) or growing past `max_seconds`. Chunks longer than `max_seconds` are split at their
+    sentence (or clause) boundaries, with times proportional to the text length. When the
+    waveform is given, every cut that is not already in a pause (splits, and chunks that
+    touch) is moved to the quietest frame within `snap_ms` of it.
+
+    The chunks are consumed as an iterator and each segment is yielded as soon as it is
+    closed, so the segmenter also works on the streaming ASR output.
+
+    Args:
+        samples (np.ndarray, optional): The mono float samples of the transcribed audio, used to snap the cuts. Defaults to None (no snapping).
+        sample_rate (int, optional): The sample rate of `samples`. Defaults to 16000.
+        min_seconds (float, optional): The minimum duration of a segment, unless a pause or the end of the audio closes it first. Defaults to 2.
+        max_seconds (float, optional): The maximum duration of a segment. Defaults to 12.
+        max_gap_seconds (float, optional): The longest pause merged into a segment. Defaults to 0.8.
+        snap_ms (int, optional): How far a cut can be moved to the quietest frame, in milliseconds. Defaults to 300.
+
+    Attributes:
+        source_chunks (List[dict]): The chunks consumed so far, as received.
+
+    Methods:
+        segment(chunks: Iterable[dict]) -> Iterator[dict]:
+            Merge and split chunks into segments, each with the indexes of its "source_chunks".
+
+        stats() -> dict:
+            The number of source chunks and segments, and the reduction in chunk count.
+    """
+
+    def __init__(
+        self,
+        samples: Optional[np.ndarray] = None,
+        sample_rate: int = 16000,
+        min_seconds: float = 2,
+        max_seconds: float = 12,
+        max_gap_seconds: float = 0.8,
+        snap_ms: int = 300,
+    ):
+        if min_seconds > max_seconds:
+            raise ValueError("min_seconds must not be greater than max_seconds.")
+
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.max_gap_seconds = max_gap_seconds
+        self.snap_seconds = snap_ms / 1000
+        self.vad = EnergyVAD(sample_rate, frame_ms=10)
+        self.source_chunks = []
+        self.n_segments = 0
+
+    def _snap(self, t: float, low: float, high: float) -> float:
+        if self.samples is None:
+            return t
+
+        start = max(low, t - self.snap_seconds)
+        end = min(high, t + self.snap_seconds)
+        begin = int(start * self.sample_rate)
+        levels = self.vad.frame_levels(
+            self.samples[begin : int(end * self.sample_rate)]
+        )
+        if len(levels) == 0:
+            return t
+
+        frame_seconds = self.vad.frame_size / self.sample_rate
+        quietest = begin / self.sample_rate + (np.argmin(levels) + 0.5) * frame_seconds
+        return round(float(quietest), 3)
+
+    def _split(self, chunk: dict, index: int) -> List[dict]:
+        start, end = chunk["timestamp"]
+        if end - start <= self.max_seconds:
+            return [dict(timestamp=[start, end], text=chunk["text"], source=[index])]
+
+        pieces = SENTENCE_END.split(chunk["text"].strip())
+        if len(pieces) == 1:
+            pieces = CLAUSE_END.split(chunk["text"].strip())
+        if len(pieces) == 1:
+            return [dict(timestamp=[start, end], text=chunk["text"], source=[index])]
+
+        # Os timestamps do Whisper são por chunk: o tempo de cada parte é proporcional ao seu texto
+        bounds = np.cumsum([0] + [len(piece) for piece in pieces])
+        times = start + (end - start) * bounds / bounds[-1]
+        for i in range(1, len(pieces)):
+            times[i] = self._snap(times[i], times[i - 1], times[i + 1])
+
+        return [
+            dict(
+                timestamp=[round(float(times[i]), 3), round(float(times[i + 1]), 3)],
+                text=" " + piece,
+                source=[index],
+            )
+            for i, piece in enumerate(pieces)
+        ]
+
+    def _close(self, group: dict, following: Optional[dict]) -> dict:
+        if following is not None:
+            end, next_start = group["timestamp"][1], following["timestamp"][0]
+            # Trechos colados (sem pausa entre eles): o corte vai para o ponto mais silencioso
+            if next_start - end < self.vad.frame_size / self.sample_rate:
+                cut = self._snap(end, group["timestamp"][0], following["timestamp"][1])
+                group["timestamp"][1] = following["timestamp"][0] = cut
+
+        self.n_segments += 1
+        return dict(
+            timestamp=group["timestamp"],
+            text=group["text"],
+            source_chunks=sorted(set(group["source"])),
+        )
+
+    def segment(self, chunks: Iterable[dict]) -> Iterator[dict]:
+        """
+        Merge and split chunks into sentence segments.
+
+        Args:
+            chunks (Iterable[dict]): The chunks, on an absolute timeline (see `normalize_chunks`).
+
+        Yields:
+            dict: The segments in order, with their "timestamp", "text" and the indexes of their "source_chunks".
+        """
+        group = None
+        for chunk in chunks:
+            index = len(self.source_chunks)
+            self.source_chunks.append(chunk)
+
+            for unit in self._split(chunk, index):
+                if group is None:
+                    group = unit
+                    continue
+
+                start, end = group["timestamp"]
+                gap = unit["timestamp"][0] - end
+                too_long = unit["timestamp"][1] - start > self.max_seconds
+                sentence_done = (
+                    group["text"].rstrip().endswith((".", "?", "!", "…"))
+                    and end - start >= self.min_seconds
+                )
+                if gap > self.max_gap_seconds or too_long or sentence_done:
+                    yield self._close(group, unit)
+                    group = unit
+                else:
+                    group = dict(
+                        timestamp=[start, unit["timestamp"][1]],
+                        text=group["text"] + unit["text"],
+                        source=group["source"] + unit["source"],
+                    )
+
+        if group is not None:
+            yield self._close(group, None)
+
+    def stats(self) -> dict:
+        """
+        The number of source chunks and segments, and the reduction in chunk count.
+
+        Returns:
+            dict: "source_chunks", "segments" and "reduction" (the fraction of chunks removed).
+        """
+        n_chunks = len(self.source_chunks)
+        return dict(
+            source_chunks=n_chunks,
+            segments=self.n_segments,
+            reduction=1 - self.n_segments / n_chunks if n_chunks else 0.0,
+        )
@@ -1,8 +1,14 @@
 import json
 import os
+from typing import Iterator, List, Optional, Union
 
-import torch
-from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline
+import numpy as np
+
+from desafio_hotmart.asr_backends import ASRBackend, get_asr_backend
+from desafio_hotmart.profiling import profiler
+from desafio_hotmart.timestamps import normalize_chunks
+from desafio_hotmart.vad import EnergyVAD
+from desafio_hotmart.video_manipulation import load_raw_audio, read_audio_blocks
 
 
 class ASR:
@@ -10,31 +16,44 @@ class ASR:
     Automatic Speech Recognition (ASR) class.
 
     Args:
-        model_id (str): The ID of the ASR model to use.
-        audio_path (str): The path to the audio file to transcribe.
+        model_id (str): The ID of the Whisper model to use (e.g. "openai/whisper-large-v3", "distil-whisper/distil-large-v3",
+            or "large-v3" / "distil-large-v3" with the faster-whisper backend).
+        audio_path (Union[str, np.ndarray]): The path to the audio file to transcribe, or its mono float32 samples.
+            Raw float32 files (.f32, written by `extract_audio`) are memory-mapped instead of decoded.
         output_path_with_ts (str): The path to save the transcription with timestamps in JSON format.
         output_path_text (str): The path to save the transcription in text format. Defaults to "data/output/transcricao.txt".
         language (str): The language of the audio file. Defaults to "portuguese".
+        sampling_rate (int): The sample rate of raw float32 audio. Defaults to 16000.
+        backend (str): The inference backend ("transformers" or "faster-whisper"). Defaults to "transformers".
+        batch_size (int): The number of 30 s windows (or speech segments) decoded at once. Defaults to 16.
+        num_threads (int, optional): The number of CPU threads used for inference. Defaults to None (the library default).
+        compute_type (str, optional): The precision of the weights (e.g. "int8" with faster-whisper). Defaults to None (backend default).
 
     Methods:
-        get_asr_pipeline: Returns the ASR pipeline.
+        get_backend: Returns the ASR inference backend.
+        get_audio_input: Returns the audio in the format expected by the ASR pipeline.
         speech_to_text: Transcribes the audio file to text.
+        stream_speech_to_text: Transcribes the audio block by block, yielding the chunks as they are ready.
+        transcribe_streaming: Transcribes the audio in streaming mode and exports the transcription.
+        get_audio_duration: Returns the duration of the audio, when it is available as raw samples.
         export_transcription: Exports the transcription to JSON and text files.
         run: Runs the ASR process and returns the transcription.
     """
 
     def __init__(
         self,
-        audio_path: str,
+        audio_path: Union[str, np.ndarray],
         output_path_with_ts: str,
         output_path_text: str,
         model_id: str = "openai/whisper-large-v3",
         language: str = "portuguese",
+        sampling_rate: int = 16000,
+        backend: str = "transformers",
+        batch_size: int = 16,
+        num_threads: Optional[int] = None,
+        compute_type: Optional[str] = None,
     ):
-        if model_id != "openai/whisper-large-v3":
-            raise ValueError("Only the 'openai/whisper-large-v3' model is supported.")
-
-        if not os.path.isfile(audio_path):
+        if isinstance(audio_path, str) and not os.path.isfile(audio_path):
             raise FileNotFoundError(f"Audio file not found at {audio_path}")
 
         self.model_id = model_id
@@ -42,62 +61,158 @@ class ASR:
         self.output_path_ts = output_path_with_ts
         self.output_path_text = output_path_text
         self.language = language
+        self.sampling_rate = sampling_rate
+        self.backend = get_asr_backend(
+            backend, model_id, batch_size, num_threads, compute_type
+        )
 
-    def get_asr_pipeline(self):
+    def get_backend(self) -> ASRBackend:
         """
-        Returns the ASR pipeline.
+        Returns the ASR inference backend.
 
         Returns:
-            ASR pipeline: The pipeline for automatic speech recognition.
+            ASRBackend: The backend that runs the Whisper model.
+        """
+        return self.backend
+
+    def get_audio_input(self):
         """
-        if torch.cuda.is_available():
-            device = torch.device("cuda")
-        elif torch.backends.mps.is_available():
-            device = torch.device("mps")
+        Returns the audio in the format expected by the ASR pipeline.
+
+        Returns:
+            Union[str, dict]: The path of an encoded audio file, or the raw samples with their sample rate.
+        """
+        if isinstance(self.audio_path, np.ndarray):
+            audio = self.audio_path
+        elif self.audio_path.endswith(".f32"):
+            audio = load_raw_audio(self.audio_path)
         else:
-            device = torch.device("cpu")
+            return self.audio_path
 
-        torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
+        return {
+            "raw": np.asarray(audio, dtype=np.float32),
+            "sampling_rate": self.sampling_rate,
+        }
 
-        model = AutoModelForSpeechSeq2Seq.from_pretrained(
-            self.model_id,
-            torch_dtype=torch_dtype,
-            low_cpu_mem_usage=True,
-            use_safetensors=True,
-        )
+    def speech_to_text(self) -> dict:
+        """
+        Transcribes the audio file to text.
 
-        model.to(device)
+        Returns:
+            dict: The transcription result with timestamps.
+        """
+        with profiler.span("asr", "inference", model=self.model_id):
+            return self.backend.transcribe(self.get_audio_input(), self.language)
 
-        processor = AutoProcessor.from_pretrained(self.model_id)
+    def stream_speech_to_text(
+        self,
+        block_seconds: float = 30,
+        batch_size: int = 8,
+        vad: Optional[EnergyVAD] = None,
+    ) -> Iterator[dict]:
+        """
+        Transcribes the audio block by block, yielding the chunks as they are ready.
 
-        return pipeline(
-            "automatic-speech-recognition",
-            model=model,
-            tokenizer=processor.tokenizer,
-            feature_extractor=processor.feature_extractor,
-            batch_size=16,
-            return_timestamps=True,
-            torch_dtype=torch_dtype,
-            device=device,
-        )
+        The audio is read in blocks (never loaded whole), split into speech segments of at most
+        30 s by a voice activity detector, and the segments are transcribed in batches. Memory
+        use is bounded by the block and batch sizes, whatever the length of the audio.
 
-    def speech_to_text(self) -> dict:
+        Args:
+            block_seconds (float, optional): The length of the audio blocks read at a time. Defaults to 30.
+            batch_size (int, optional): The number of speech segments transcribed at once. Defaults to 8.
+            vad (EnergyVAD, optional): The voice activity detector. Defaults to None (an `EnergyVAD` with default settings).
+
+        Yields:
+            dict: The chunks ({"timestamp": [start, end], "text": ...}) in order, with absolute timestamps.
         """
-        Transcribes the audio file to text.
+        vad = vad or EnergyVAD(self.sampling_rate)
+        blocks = read_audio_blocks(self.audio_path, self.sampling_rate, block_seconds)
+
+        batch = []
+        for segment in vad.segments(blocks):
+            batch.append(segment)
+            if len(batch) == batch_size:
+                yield from self._transcribe_segments(batch)
+                batch = []
+        if batch:
+            yield from self._transcribe_segments(batch)
+
+    def _transcribe_segments(self, segments: list) -> Iterator[dict]:
+        with profiler.span(
+            "asr.batch",
+            "inference",
+            segments=len(segments),
+            audio_seconds=sum(len(samples) for _, samples in segments)
+            / self.sampling_rate,
+        ):
+            outputs = self.backend.transcribe_batch(
+                [samples for _, samples in segments], self.sampling_rate, self.language
+            )
+        for (start, samples), output in zip(segments, outputs):
+            end = start + len(samples) / self.sampling_rate
+            chunks = output.get("chunks") or [
+                {"timestamp": (0.0, None), "text": output["text"]}
+            ]
+            # Cada segmento é uma única janela do Whisper, iniciada em `start`
+            for chunk in normalize_chunks(chunks, [start], end):
+                if chunk["text"].strip():
+                    yield chunk
+
+    def transcribe_streaming(
+        self,
+        block_seconds: float = 30,
+        batch_size: int = 8,
+        vad: Optional[EnergyVAD] = None,
+    ) -> dict:
+        """
+        Transcribes the audio in streaming mode and exports the transcription.
+
+        Args:
+            block_seconds (float, optional): The length of the audio blocks read at a time. Defaults to 30.
+            batch_size (int, optional): The number of speech segments transcribed at once. Defaults to 8.
+            vad (EnergyVAD, optional): The voice activity detector. Defaults to None (an `EnergyVAD` with default settings).
 
         Returns:
             dict: The transcription result with timestamps.
         """
-        pipe = self.get_asr_pipeline()
-        return pipe(self.audio_path, generate_kwargs={"language": self.language})
+        chunks = list(self.stream_speech_to_text(block_seconds, batch_size, vad))
+        transcriptions = {
+            "text": "".join(chunk["text"] for chunk in chunks),
+            "chunks": chunks,
+        }
+        self.export_transcription(transcriptions)
+        return transcriptions
+
+    def get_audio_duration(self) -> Optional[float]:
+        """
+        Returns the duration of the audio, when it is available as raw samples.
+
+        Returns:
+            Optional[float]: The duration in seconds, or None for encoded audio files.
+        """
+        audio = self.get_audio_input()
+        if isinstance(audio, dict):
+            return len(audio["raw"]) / audio["sampling_rate"]
+        return None
 
-    def export_transcription(self, transcriptions: dict):
+    def export_transcription(
+        self, transcriptions: dict, window_offsets: Optional[List[float]] = None
+    ):
         """
-        Exports the transcription to JSON and text files.
+        Exports the transcription to JSON and text files, with the chunks on one monotonic absolute timeline.
 
         Args:
             transcriptions (dict): The transcription result with timestamps.
+            window_offsets (List[float], optional): The absolute start of each Whisper decoding window, when known.
+                Defaults to None (inferred from the timestamp resets).
         """
+        transcriptions = dict(
+            transcriptions,
+            chunks=normalize_chunks(
+                transcriptions["chunks"], window_offsets, self.get_audio_duration()
+            ),
+        )
+
         output_dir = os.path.dirname(self.output_path_ts)
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
@@ -0,0 +1,617 @@
+import json
+import os
+from typing import Optional
+
+from desafio_hotmart.chunk_store import (
+    chunk_store_path,
+    json_to_chunk_store,
+    load_chunks,
+    write_chunk_store,
+)
+from desafio_hotmart.hls import PLAYLIST_NAME, HLSWriter
+from desafio_hotmart.pipeline import Stage
+from desafio_hotmart.scratch import ScratchSpace
+from desafio_hotmart.segmentation import SentenceSegmenter
+from desafio_hotmart.speech_to_text import ASR
+from desafio_hotmart.streaming import StreamingDubber
+from desafio_hotmart.text_to_speech import TextToSpeech
+from desafio_hotmart.timestamps import normalize_chunks
+from desafio_hotmart.translate import Translator
+from desafio_hotmart.vad import EnergyVAD
+from desafio_hotmart.video_manipulation import (
+    extract_audio,
+    load_raw_audio,
+    replace_audio,
+)
+
+
+def job_scratch(config: dict) -> ScratchSpace:
+    """
+    Create the scratch space of a stage, removed when the stage ends (successfully or not).
+    """
+    return ScratchSpace(
+        config["scratch"]["root"],
+        use_tmpfs=config["scratch"]["use_tmpfs"],
+        keep=config["scratch"]["keep"],
+    )
+
+
+def sentence_segmenter(config: dict) -> SentenceSegmenter:
+    """
+    Create the sentence segmenter, snapping its cuts to the silences of the extracted audio.
+    """
+    settings = config["segmentation"]
+    return SentenceSegmenter(
+        load_raw_audio(config["data"]["intermediate"]["asr_audio"]),
+        min_seconds=settings["min_seconds"],
+        max_seconds=settings["max_seconds"],
+        max_gap_seconds=settings["max_gap_seconds"],
+        snap_ms=settings["snap_ms"],
+    )
+
+
+def hls_writer(config: dict, sample_rate: int) -> Optional[HLSWriter]:
+    """
+    Create the writer of the progressive HLS output of the dubbed video, when it is enabled.
+    """
+    settings = config["hls"]
+    if not settings["enabled"]:
+        return None
+    return HLSWriter(
+        config["data"]["input"]["video"],
+        settings["output_dir"],
+        sample_rate,
+        config["base"]["subclip_start_seconds"],
+        config["base"]["subclip_end_seconds"],
+        segment_seconds=settings["segment_seconds"],
+        audio_bitrate=config["mux"]["audio_bitrate"],
+    )
+
+
+def chunks_artifact(config: dict, json_path: str) -> str:
+    """
+    The artifact read by the next stage: the chunk store next to the JSON transcript, when the columnar artifacts are enabled.
+    """
+    if config["pipeline"]["columnar"]:
+        return chunk_store_path(json_path)
+    return json_path
+
+
+def chunks_outputs(config: dict, json_path: str) -> list:
+    """
+    The files written for a transcript: the JSON, and its chunk store when the columnar artifacts are enabled.
+    """
+    if config["pipeline"]["columnar"]:
+        return [json_path, chunk_store_path(json_path)]
+    return [json_path]
+
+
+def export_chunk_store(config: dict, json_path: str, data: dict = None) -> None:
+    """
+    Write the chunk store of a transcript next to its JSON, when the columnar artifacts are enabled.
+    """
+    if not config["pipeline"]["columnar"]:
+        return
+    if data is None:
+        json_to_chunk_store(json_path)
+    else:
+        write_chunk_store(chunk_store_path(json_path), data)
+
+
+def translation_input(config: dict) -> str:
+    """
+    The chunks to translate: the sentence segments, or the Whisper chunks when the re-segmentation is disabled.
+    """
+    if config["segmentation"]["enabled"]:
+        path = config["data"]["output"]["segmented_text_with_timestamps"]
+    else:
+        path = config["data"]["output"]["transcribed_text_with_timestamps"]
+    return chunks_artifact(config, path)
+
+
+def export_segments(config: dict, segments: list) -> None:
+    """
+    Write the sentence segments, in the format of the transcription (with the indexes of their source chunks).
+    """
+    path = config["data"]["output"]["segmented_text_with_timestamps"]
+    output_dir = os.path.dirname(path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    data = {
+        "text": "".join(segment["text"] for segment in segments),
+        "chunks": segments,
+    }
+    with open(path, "w") as f:
+        json.dump(data, f)
+    export_chunk_store(config, path, data)
+
+
+def extract_audio_stage(config: dict) -> None:
+    """
+    Convert the video to audio.
+    """
+    print("Converting video to audio...")
+    extract_audio(
+        config["data"]["input"]["video"],
+        config["data"]["intermediate"]["asr_audio"],
+        config["data"]["intermediate"]["speaker_audio"],
+        config["base"]["subclip_start_seconds"],
+        config["base"]["subclip_end_seconds"],
+    )
+
+
+def transcribe_stage(config: dict) -> None:
+    """
+    Transcribe the audio to text.
+    """
+    print("Transcribing audio to text...")
+    asr = ASR(
+        config["data"]["intermediate"]["asr_audio"],
+        config["data"]["output"]["transcribed_text_with_timestamps"],
+        config["data"]["output"]["transcribed_text"],
+        config["model"]["asr"],
+        backend=config["asr"]["backend"],
+        batch_size=config["asr"]["batch_size"],
+        num_threads=config["asr"]["num_threads"],
+        compute_type=config["asr"]["compute_type"],
+    )
+    settings = config["asr"]
+    if settings["streaming"]:
+        asr.transcribe_streaming(
+            settings["block_seconds"],
+            settings["batch_size"],
+            EnergyVAD(
+                threshold_db=settings["vad_threshold_db"],
+                min_silence_ms=settings["vad_min_silence_ms"],
+            ),
+        )
+    else:
+        transcription = asr.speech_to_text()
+        asr.export_transcription(transcription)
+    export_chunk_store(
+        config, config["data"]["output"]["transcribed_text_with_timestamps"]
+    )
+
+
+def segment_stage(config: dict) -> None:
+    """
+    Merge and split the transcribed chunks into sentence segments.
+    """
+    print("Segmenting transcription into sentences...")
+    transcription = load_chunks(
+        chunks_artifact(
+            config, config["data"]["output"]["transcribed_text_with_timestamps"]
+        )
+    )
+    chunks = normalize_chunks(list(transcription["chunks"]))
+
+    segmenter = sentence_segmenter(config)
+    segments = list(segmenter.segment(chunks))
+    export_segments(config, segments)
+    print(
+        "Segmentation stats: "
+        + ", ".join(f"{name}={value:.3g}" for name, value in segmenter.stats().items())
+    )
+
+
+def translate_stage(config: dict) -> None:
+    """
+    Translate the transcription from Portuguese to English.
+    """
+    print("Translating text...")
+    translator = Translator(
+        translation_input(config),
+        config["model"]["translator"],
+        config["data"]["output"]["translated_text_with_timestamps"],
+        config["data"]["output"]["translated_text"],
+        concurrency=config["translation"]["concurrency"],
+        requests_per_minute=config["translation"]["requests_per_minute"],
+        max_retries=config["translation"]["max_retries"],
+        batch_size=config["translation"]["batch_size"],
+        quantize=config["translation"]["quantize"],
+        cache_path=config["translation"]["cache_path"],
+        cache_max_bytes=config["translation"]["cache_max_bytes"],
+        packed=config["translation"]["packed"],
+        pack_max_tokens=config["translation"]["pack_max_tokens"],
+        pack_max_chunks=config["translation"]["pack_max_chunks"],
+        context_chunks=config["translation"]["context_chunks"],
+        packed_model=config["translation"]["packed_model"],
+        backend=config["translation"]["backend"],
+        onnx_cache_dir=config["onnx"]["cache_dir"],
+        intra_op_threads=config["onnx"]["intra_op_threads"],
+        inter_op_threads=config["onnx"]["inter_op_threads"],
+    )
+    translated_text = translator.translate_chunks()
+    translator.export_translation(translated_text)
+    export_chunk_store(
+        config,
+        config["data"]["output"]["translated_text_with_timestamps"],
+        translated_text,
+    )
+    if translator.stats:
+        print(
+            "Translation stats: "
+            + ", ".join(
+                f"{name}={value:.3g}" for name, value in translator.stats.items()
+            )
+        )
+
+
+def text_to_speech_stage(config: dict) -> None:
+    """
+    Convert the translated text to speech.
+    """
+    print("Converting text to speech...")
+    with job_scratch(config) as scratch:
+        tts = TextToSpeech(
+            chunks_artifact(
+                config, config["data"]["output"]["translated_text_with_timestamps"]
+            ),
+            config["data"]["output"]["translated_audio"],
+            config["model"]["tts"],
+            config["data"]["intermediate"]["speaker_audio"],
+            language=config["tts"]["language"],
+            model=config["tts"]["model"],
+            n_workers=config["tts"]["n_workers"],
+            batch_size=config["tts"]["batch_size"],
+            stretch_backend=config["tts"]["stretch_backend"],
+            cache_path=config["tts"]["cache_path"],
+            cache_max_bytes=config["tts"]["cache_max_bytes"],
+            scratch=scratch,
+            backend=config["tts"]["backend"],
+            onnx_cache_dir=config["onnx"]["cache_dir"],
+            intra_op_threads=config["onnx"]["intra_op_threads"],
+            inter_op_threads=config["onnx"]["inter_op_threads"],
+        )
+        hls = hls_writer(config, tts.synthesizer.sample_rate)
+        try:
+            translated_audio = tts.convert_chunks_to_speech(
+                on_audio=hls.update if hls else None
+            )
+        finally:
+            tts.close()
+        tts.export_audio(translated_audio)
+        if hls is not None:
+            hls.finish(translated_audio)
+        print(
+            "TTS timings (s): "
+            + ", ".join(
+                f"{name}={seconds:.2f}" for name, seconds in tts.timings.items()
+            )
+        )
+        if tts.cache is not None:
+            print(
+                "TTS cache stats: "
+                + ", ".join(
+                    f"{name}={value:.3g}" for name, value in tts.cache.stats().items()
+                )
+            )
+
+
+def dub_stage(config: dict) -> None:
+    """
+    Transcribe, translate and synthesize at once, with the chunks streaming through the three steps.
+    """
+    print("Dubbing audio (streaming)...")
+    with job_scratch(config) as scratch:
+        data = config["data"]
+        asr_settings = config["asr"]
+        asr = ASR(
+            data["intermediate"]["asr_audio"],
+            data["output"]["transcribed_text_with_timestamps"],
+            data["output"]["transcribed_text"],
+            config["model"]["asr"],
+            backend=config["asr"]["backend"],
+            batch_size=config["asr"]["batch_size"],
+            num_threads=config["asr"]["num_threads"],
+            compute_type=config["asr"]["compute_type"],
+        )
+        translator = Translator(
+            None,
+            config["model"]["translator"],
+            data["output"]["translated_text_with_timestamps"],
+            data["output"]["translated_text"],
+            concurrency=config["translation"]["concurrency"],
+            requests_per_minute=config["translation"]["requests_per_minute"],
+            max_retries=config["translation"]["max_retries"],
+            batch_size=config["translation"]["batch_size"],
+            quantize=config["translation"]["quantize"],
+            cache_path=config["translation"]["cache_path"],
+            cache_max_bytes=config["translation"]["cache_max_bytes"],
+            packed=config["translation"]["packed"],
+            pack_max_tokens=config["translation"]["pack_max_tokens"],
+            pack_max_chunks=config["translation"]["pack_max_chunks"],
+            context_chunks=config["translation"]["context_chunks"],
+            packed_model=config["translation"]["packed_model"],
+            backend=config["translation"]["backend"],
+            onnx_cache_dir=config["onnx"]["cache_dir"],
+            intra_op_threads=config["onnx"]["intra_op_threads"],
+            inter_op_threads=config["onnx"]["inter_op_threads"],
+        )
+        tts = TextToSpeech(
+            None,
+            data["output"]["translated_audio"],
+            config["model"]["tts"],
+            data["intermediate"]["speaker_audio"],
+            language=config["tts"]["language"],
+            model=config["tts"]["model"],
+            n_workers=config["tts"]["n_workers"],
+            batch_size=config["tts"]["batch_size"],
+            stretch_backend=config["tts"]["stretch_backend"],
+            cache_path=config["tts"]["cache_path"],
+            cache_max_bytes=config["tts"]["cache_max_bytes"],
+            scratch=scratch,
+            backend=config["tts"]["backend"],
+            onnx_cache_dir=config["onnx"]["cache_dir"],
+            intra_op_threads=config["onnx"]["intra_op_threads"],
+            inter_op_threads=config["onnx"]["inter_op_threads"],
+        )
+        # Segmentos HLS gravados à medida que o áudio dublado fica pronto
+        hls = hls_writer(config, tts.synthesizer.sample_rate)
+        dubber = StreamingDubber(
+            translator,
+            tts,
+            queue_size=config["pipeline"]["queue_size"],
+            translate_batch_size=config["pipeline"]["translate_batch_size"],
+            tts_batch_size=config["pipeline"]["tts_batch_size"],
+            duration_seconds=asr.get_audio_duration() or 0,
+            on_audio=hls.update if hls else None,
+        )
+
+        chunks = asr.stream_speech_to_text(
+            asr_settings["block_seconds"],
+            asr_settings["batch_size"],
+            EnergyVAD(
+                threshold_db=asr_settings["vad_threshold_db"],
+                min_silence_ms=asr_settings["vad_min_silence_ms"],
+            ),
+        )
+        segmenter = None
+        if config["segmentation"]["enabled"]:
+            # Os segmentos são fechados à medida que os chunks chegam do ASR
+            segmenter = sentence_segmenter(config)
+            chunks = segmenter.segment(chunks)
+        try:
+            translated_audio = dubber.run(chunks)
+        finally:
+            tts.close()
+
+        if segmenter is not None:
+            source_chunks = segmenter.source_chunks
+            export_segments(config, dubber.source_chunks)
+        else:
+            source_chunks = dubber.source_chunks
+        transcription = {
+            "text": "".join(chunk["text"] for chunk in source_chunks),
+            "chunks": source_chunks,
+        }
+        asr.export_transcription(transcription)
+        export_chunk_store(
+            config, data["output"]["transcribed_text_with_timestamps"], transcription
+        )
+        translated_data = translator.build_translated_data(dubber.translated_chunks)
+        translator.export_translation(translated_data)
+        export_chunk_store(
+            config, data["output"]["translated_text_with_timestamps"], translated_data
+        )
+        tts.export_audio(translated_audio)
+        if hls is not None:
+            hls.finish(translated_audio)
+        print(
+            "Streaming stats (s): "
+            + ", ".join(
+                f"{name}={seconds:.2f}" for name, seconds in dubber.stats.items()
+            )
+        )
+
+
+def mux_stage(config: dict) -> None:
+    """
+    Replace the audio of the video with the translated audio.
+    """
+    print("Replacing audio in video...")
+    with job_scratch(config) as scratch:
+        replace_audio(
+            config["data"]["input"]["video"],
+            config["data"]["output"]["translated_audio"],
+            config["data"]["output"]["voice_over_video"],
+            config["base"]["subclip_start_seconds"],
+            config["base"]["subclip_end_seconds"],
+            method=config["mux"]["method"],
+            audio_bitrate=config["mux"]["audio_bitrate"],
+            scratch_dir=scratch.dir,
+        )
+
+
+def build_stages(config: dict) -> list:
+    """
+    Build the stages of the dubbing pipeline (extract → ASR → segment → translate → TTS → mux) from the configuration.
+
+    The params of each stage hold only the settings that change its output, so e.g. a new
+    translation concurrency does not invalidate the translation. In streaming mode
+    (`pipeline.mode`), ASR, translation and TTS run overlapped in a single "dub" stage.
+
+    Args:
+        config (dict): The configuration loaded from params.yaml.
+
+    Returns:
+        list: The stages of the pipeline.
+    """
+    data = config["data"]
+    subclip = dict(
+        start=config["base"]["subclip_start_seconds"],
+        end=config["base"]["subclip_end_seconds"],
+    )
+
+    transcribe_params = dict(
+        model=config["model"]["asr"],
+        backend=config["asr"]["backend"],
+        compute_type=config["asr"]["compute_type"],
+        streaming=config["asr"]["streaming"],
+        block_seconds=config["asr"]["block_seconds"],
+        batch_size=config["asr"]["batch_size"],
+        vad_threshold_db=config["asr"]["vad_threshold_db"],
+        vad_min_silence_ms=config["asr"]["vad_min_silence_ms"],
+    )
+    translate_params = dict(
+        translator=config["model"]["translator"],
+        quantize=config["translation"]["quantize"],
+        packed=config["translation"]["packed"],
+        packed_model=config["translation"]["packed_model"],
+        pack_max_tokens=config["translation"]["pack_max_tokens"],
+        pack_max_chunks=config["translation"]["pack_max_chunks"],
+        context_chunks=config["translation"]["context_chunks"],
+        backend=config["translation"]["backend"],
+    )
+    segmentation = config["segmentation"]
+    segment_params = dict(
+        min_seconds=segmentation["min_seconds"],
+        max_seconds=segmentation["max_seconds"],
+        max_gap_seconds=segmentation["max_gap_seconds"],
+        snap_ms=segmentation["snap_ms"],
+    )
+    tts_params = dict(
+        voice=config["model"]["tts"],
+        model=config["tts"]["model"],
+        language=config["tts"]["language"],
+        stretch_backend=config["tts"]["stretch_backend"],
+        backend=config["tts"]["backend"],
+    )
+    # Com a saída HLS, a etapa que produz o áudio dublado também grava os segmentos do vídeo
+    hls_inputs, hls_outputs = [], []
+    if config["hls"]["enabled"]:
+        tts_params["hls"] = dict(
+            subclip,
+            segment_seconds=config["hls"]["segment_seconds"],
+            audio_bitrate=config["mux"]["audio_bitrate"],
+        )
+        hls_inputs = [data["input"]["video"]]
+        hls_outputs = [os.path.join(config["hls"]["output_dir"], PLAYLIST_NAME)]
+
+    stages = [
+        Stage(
+            "extract",
+            extract_audio_stage,
+            inputs=[data["input"]["video"]],
+            outputs=[
+                data["intermediate"]["asr_audio"],
+                data["intermediate"]["speaker_audio"],
+            ],
+            params=subclip,
+        )
+    ]
+
+    if config["pipeline"]["mode"] == "streaming":
+        outputs = [
+            *chunks_outputs(config, data["output"]["transcribed_text_with_timestamps"]),
+            data["output"]["transcribed_text"],
+            *chunks_outputs(config, data["output"]["translated_text_with_timestamps"]),
+            data["output"]["translated_text"],
+            data["output"]["translated_audio"],
+            *hls_outputs,
+        ]
+        if segmentation["enabled"]:
+            outputs += chunks_outputs(
+                config, data["output"]["segmented_text_with_timestamps"]
+            )
+        stages.append(
+            Stage(
+                "dub",
+                dub_stage,
+                inputs=[
+                    data["intermediate"]["asr_audio"],
+                    data["intermediate"]["speaker_audio"],
+                    *hls_inputs,
+                ],
+                outputs=outputs,
+                params=dict(
+                    transcribe=dict(transcribe_params, streaming=True),
+                    segment=segment_params if segmentation["enabled"] else None,
+                    translate=translate_params,
+                    tts=tts_params,
+                ),
+                depends_on=["extract"],
+                resource="model",
+            )
+        )
+        audio_stage = "dub"
+    else:
+        stages.append(
+            Stage(
+                "transcribe",
+                transcribe_stage,
+                inputs=[data["intermediate"]["asr_audio"]],
+                outputs=[
+                    *chunks_outputs(
+                        config, data["output"]["transcribed_text_with_timestamps"]
+                    ),
+                    data["output"]["transcribed_text"],
+                ],
+                params=transcribe_params,
+                depends_on=["extract"],
+                resource="model",
+            )
+        )
+        if segmentation["enabled"]:
+            stages.append(
+                Stage(
+                    "segment",
+                    segment_stage,
+                    inputs=[
+                        chunks_artifact(
+                            config, data["output"]["transcribed_text_with_timestamps"]
+                        ),
+                        data["intermediate"]["asr_audio"],
+                    ],
+                    outputs=chunks_outputs(
+                        config, data["output"]["segmented_text_with_timestamps"]
+                    ),
+                    params=segment_params,
+                    depends_on=["transcribe"],
+                )
+            )
+        stages += [
+            Stage(
+                "translate",
+                translate_stage,
+                inputs=[translation_input(config)],
+                outputs=[
+                    *chunks_outputs(
+                        config, data["output"]["translated_text_with_timestamps"]
+                    ),
+                    data["output"]["translated_text"],
+                ],
+                params=translate_params,
+                depends_on=["segment" if segmentation["enabled"] else "transcribe"],
+                resource="model",
+            ),
+            Stage(
+                "tts",
+                text_to_speech_stage,
+                inputs=[
+                    chunks_artifact(
+                        config, data["output"]["translated_text_with_timestamps"]
+                    ),
+                    data["intermediate"]["speaker_audio"],
+                    *hls_inputs,
+                ],
+                outputs=[data["output"]["translated_audio"], *hls_outputs],
+                params=tts_params,
+                depends_on=["translate"],
+                resource="model",
+            ),
+        ]
+        audio_stage = "tts"
+
+    stages.append(
+        Stage(
+            "mux",
+            mux_stage,
+            inputs=[data["input"]["video"], data["output"]["translated_audio"]],
+            outputs=[data["output"]["voice_over_video"]],
+            params=dict(subclip, **config["mux"]),
+            depends_on=[audio_stage],
+        )
+    )
+
+    return stages
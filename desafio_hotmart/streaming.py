@@ -0,0 +1,265 @@
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+from desafio_hotmart.text_to_speech import TextToSpeech
+from desafio_hotmart.timeline import AudioTimeline
+from desafio_hotmart.translate import Translator
+
+# Marca o fim do stream em cada fila
+_END = object()
+
+
+class StreamingDubber:
+    """
+    Dubs a stream of transcribed chunks with ASR, translation, TTS and the timeline writer running concurrently.
+
+    Each stage runs in its own thread and hands its chunks to the next one through a bounded
+    queue: when a downstream stage falls behind, the queue fills up and the upstream stage
+    blocks (backpressure), so memory stays bounded. The translation and the synthesis take
+    whatever chunks are waiting, up to their batch size, so they batch when they are the
+    bottleneck and stream chunk by chunk otherwise. The first dubbed audio is written as
+    soon as the first chunks went through every stage, and the total wall time approaches
+    that of the slowest stage.
+
+    A chunk is written to the timeline once the next chunk arrives, because the silence
+    until the next chunk is part of the time the dubbed speech may use.
+
+    Each translation batch is sent with the source texts of the last
+    `translator.context_chunks` chunks before it, so packed requests get the same context as
+    when the whole transcription is translated at once. The synthesis of the stream runs in
+    this process, one batch at a time, so the TTS must not use worker processes.
+
+    Args:
+        translator (Translator): The translator (its `translate_chunks` is called with each batch and the preceding context).
+        tts (TextToSpeech): The text-to-speech converter (its `synthesize_chunks` is called with each batch).
+        queue_size (int, optional): The maximum number of chunks waiting between two stages. Defaults to 8.
+        translate_batch_size (int, optional): The maximum number of chunks translated at once. Defaults to 8.
+        tts_batch_size (int, optional): The maximum number of chunks synthesized at once. Defaults to 4.
+        duration_seconds (float, optional): The expected duration of the audio, used to preallocate the timeline. Defaults to 0.
+        on_audio (Callable[[AudioTimeline, float], None], optional): Called after each chunk is written to the timeline, with the
+            timeline and the time up to which its audio is final (e.g. `HLSWriter.update`). Defaults to None.
+
+    Attributes:
+        source_chunks (list): The transcribed chunks, in order.
+        translated_chunks (list): The translated chunks, in order.
+        stats (dict): The wall time, the time to the first dubbed audio and the busy time of each stage (in seconds).
+
+    Methods:
+        run(chunks: Iterable[dict]) -> AudioTimeline:
+            Dub the chunks and return the final audio.
+
+    Raises:
+        ValueError: If the TTS uses more than one worker process.
+    """
+
+    def __init__(
+        self,
+        translator: Translator,
+        tts: TextToSpeech,
+        queue_size: int = 8,
+        translate_batch_size: int = 8,
+        tts_batch_size: int = 4,
+        duration_seconds: float = 0,
+        on_audio: Optional[Callable[[AudioTimeline, float], None]] = None,
+    ):
+        if tts.n_workers > 1:
+            raise ValueError(
+                "Invalid tts.n_workers for the streaming mode. Please choose 1 "
+                "(the chunks are synthesized in-process, batch by batch)."
+            )
+
+        self.translator = translator
+        self.tts = tts
+        self.queue_size = queue_size
+        self.translate_batch_size = translate_batch_size
+        self.tts_batch_size = tts_batch_size
+        self.duration_seconds = duration_seconds
+        self.on_audio = on_audio
+        self.source_chunks = []
+        self.translated_chunks = []
+        self.stats = {}
+
+        self._stop = threading.Event()
+        self._errors = []
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        # Espera por espaço na fila, desistindo se outra etapa falhou
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get_batch(self, q: queue.Queue, max_items: int) -> Optional[List]:
+        """
+        Block for the next item, then take the items already waiting, up to `max_items`.
+
+        Returns None at the end of the stream (or if another stage failed).
+        """
+        batch = []
+        while not batch:
+            if self._stop.is_set():
+                return None
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _END:
+                return None
+            batch.append(item)
+
+        while len(batch) < max_items:
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                break
+            if item is _END:
+                # Devolve o fim do stream para a próxima chamada
+                q.put(_END)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run_stage(self, name: str, target: Callable[[], None]) -> threading.Thread:
+        def run():
+            try:
+                target()
+            except BaseException as e:
+                self._errors.append(e)
+                self._stop.set()
+
+        thread = threading.Thread(target=run, name=f"dub-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def _timed(self, name: str, fn: Callable, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.stats[f"{name}_busy"] += time.perf_counter() - start
+        return result
+
+    def run(self, chunks: Iterable[dict]) -> AudioTimeline:
+        """
+        Dub the chunks and return the final audio.
+
+        Args:
+            chunks (Iterable[dict]): The transcribed chunks with absolute timestamps, in order (e.g. `ASR.stream_speech_to_text()`).
+
+        Returns:
+            AudioTimeline: The final audio.
+
+        Raises:
+            Exception: The first error raised by any stage (the other stages are stopped).
+        """
+        self.source_chunks, self.translated_chunks = [], []
+        self.stats = dict(asr_busy=0.0, translate_busy=0.0, tts_busy=0.0)
+        self._stop.clear()
+        self._errors = []
+
+        transcribed = queue.Queue(self.queue_size)
+        translated = queue.Queue(self.queue_size)
+        synthesized = queue.Queue(self.queue_size)
+
+        def asr():
+            iterator = iter(chunks)
+            while True:
+                chunk = self._timed("asr", next, iterator, _END)
+                if chunk is _END or not self._put(transcribed, chunk):
+                    break
+                self.source_chunks.append(chunk)
+            self._put(transcribed, _END)
+
+        def translate():
+            context_chunks = self.translator.context_chunks
+            context = []
+            while True:
+                batch = self._get_batch(transcribed, self.translate_batch_size)
+                if batch is None:
+                    break
+                result = self._timed(
+                    "translate", self.translator.translate_chunks, batch, context
+                )
+                # Os últimos textos originais seguem como contexto do próximo lote
+                if context_chunks:
+                    context = (context + [chunk["text"] for chunk in batch])[
+                        -context_chunks:
+                    ]
+                for chunk in result["chunks"]:
+                    self.translated_chunks.append(chunk)
+                    if not self._put(translated, chunk):
+                        return
+            self._put(translated, _END)
+
+        def synthesize():
+            while True:
+                batch = self._get_batch(translated, self.tts_batch_size)
+                if batch is None:
+                    break
+                wavs = self._timed(
+                    "tts",
+                    self.tts.synthesize_chunks,
+                    [chunk["text"] for chunk in batch],
+                )
+                for chunk, wav in zip(batch, wavs):
+                    if not self._put(synthesized, (chunk, wav)):
+                        return
+            self._put(synthesized, _END)
+
+        start = time.perf_counter()
+        threads = [
+            self._run_stage("asr", asr),
+            self._run_stage("translate", translate),
+            self._run_stage("tts", synthesize),
+        ]
+
+        final_audio = AudioTimeline(
+            self.duration_seconds, self.tts.synthesizer.sample_rate
+        )
+        try:
+            self._write_timeline(synthesized, final_audio, start)
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+        self.stats["wall_time"] = time.perf_counter() - start
+        return final_audio
+
+    def _write_timeline(
+        self, synthesized: queue.Queue, final_audio: AudioTimeline, start: float
+    ) -> None:
+        pending = None
+        index = 0
+        while True:
+            batch = self._get_batch(synthesized, 1)
+            if self._errors:
+                return
+            if pending is not None:
+                chunk, wav = pending
+                chunk_start, chunk_end = chunk["timestamp"]
+                # Tempo disponível: a fala original mais o silêncio até o próximo chunk
+                next_start = batch[0][0]["timestamp"][0] if batch else chunk_end
+                wav = self.tts.fit_chunk(
+                    wav,
+                    chunk_end - chunk_start,
+                    max(next_start, chunk_end) - chunk_start,
+                    index,
+                )
+                final_audio.write(chunk_start, wav)
+                if index == 0:
+                    self.stats["time_to_first_audio"] = time.perf_counter() - start
+                index += 1
+                if self.on_audio is not None and batch:
+                    # O próximo chunk não é escrito antes do seu início: o áudio até ali não muda mais
+                    self.on_audio(final_audio, next_start)
+            if batch is None:
+                return
+            pending = batch[0]
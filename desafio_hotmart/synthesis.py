@@ -0,0 +1,407 @@
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Iterator, List, Literal, Optional
+
+import numpy as np
+from pydub import AudioSegment
+
+from desafio_hotmart.model_registry import model_registry
+from desafio_hotmart.onnx_backend import ONNX_CACHE_DIR
+from desafio_hotmart.profiling import profiler
+
+# gtts e TTS (Coqui, com torch) são importados apenas pela voz escolhida (ver desafio_hotmart.backends)
+if TYPE_CHECKING:
+    from TTS.api import TTS
+
+SAMPLE_RATE = 24000
+
+
+class Synthesizer:
+    """
+    Synthesizes text to in-memory audio using either Google Text-to-Speech or Coqui TTS.
+
+    Args:
+        voice (Literal["google", "coqui"]): The voice to use for text-to-speech conversion.
+        speaker_audio_path (str): The path to the speaker audio (.wav) that will be used by Coqui TTS.
+        language (str, optional): The language of the text. Defaults to "en".
+        model (str, optional): The Coqui TTS model. Defaults to "tts_models/multilingual/multi-dataset/xtts_v2".
+        device (str, optional): The device where the Coqui TTS model runs. Defaults to "cpu".
+        backend (Literal["torch", "onnx"], optional): The runtime of the XTTS vocoder: PyTorch, or ONNX Runtime on CPU
+            (exported once to `onnx_cache_dir`; the GPT stays in PyTorch). Defaults to "torch".
+        onnx_cache_dir (str, optional): The directory of the exported ONNX graphs. Defaults to "data/cache/onnx".
+        intra_op_threads (int, optional): The intra-op threads of the ONNX Runtime session. Defaults to None (one per core).
+        inter_op_threads (int, optional): The inter-op threads of the ONNX Runtime session. Defaults to None (sequential execution).
+
+    Attributes:
+        sample_rate (int): The sample rate of the synthesized audio (XTTS native rate, 24 kHz).
+        timings (dict): Accumulated time (in seconds) spent loading the model, computing the speaker latents and synthesizing.
+
+    Methods:
+        get_coqui_model() -> TTS:
+            Get the Coqui TTS model from the process-wide model registry, loading it only once.
+
+        get_speaker_latents() -> tuple:
+            Get the XTTS conditioning latents of the speaker, computing them only once.
+
+        release_model() -> None:
+            Release the Coqui TTS model from the process-wide model registry.
+
+        synthesize_with_coqui(text: str) -> np.ndarray:
+            Convert text to speech using Coqui TTS.
+
+        synthesize_with_google(text: str) -> np.ndarray:
+            Convert text to speech using Google Text-to-Speech.
+
+        synthesize_batch(texts: List[str]) -> List[np.ndarray]:
+            Convert a batch of texts to speech, in order, one text at a time.
+    """
+
+    def __init__(
+        self,
+        voice: Literal["google", "coqui"],
+        speaker_audio_path: str,
+        language: str = "en",
+        model: str = "tts_models/multilingual/multi-dataset/xtts_v2",
+        device: str = "cpu",
+        backend: Literal["torch", "onnx"] = "torch",
+        onnx_cache_dir: str = ONNX_CACHE_DIR,
+        intra_op_threads: Optional[int] = None,
+        inter_op_threads: Optional[int] = None,
+    ):
+        if voice not in ("google", "coqui"):
+            raise ValueError("Invalid voice. Please choose either 'google' or 'coqui'.")
+        if backend not in ("torch", "onnx"):
+            raise ValueError("Invalid backend. Please choose either 'torch' or 'onnx'.")
+
+        self.voice = voice
+        self.speaker_audio_path = speaker_audio_path
+        self.language = language
+        self.model = model
+        self.device = device
+        self.backend = backend
+        self.onnx_cache_dir = onnx_cache_dir
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        # O modelo com o vocoder ONNX é outra entrada do registry
+        self.registry_name = model + (":onnx" if backend == "onnx" else "")
+        self.sample_rate = SAMPLE_RATE
+        self.timings = {"model_load": 0.0, "speaker_latents": 0.0, "synthesis": 0.0}
+        self._speaker_latents = None
+
+        if self.voice == "coqui":
+            os.environ["COQUI_TOS_AGREED"] = "1"
+
+    def get_coqui_model(self) -> "TTS":
+        """
+        Get the Coqui TTS model from the process-wide model registry, loading it only once.
+
+        Returns:
+            TTS: The Coqui TTS model.
+        """
+
+        def load():
+            from TTS.api import TTS
+
+            tts = TTS(self.model, gpu=False).to(self.device)
+            if self.backend == "onnx":
+                from desafio_hotmart.onnx_backend import load_xtts_vocoder
+
+                xtts = tts.synthesizer.tts_model
+                decoder = load_xtts_vocoder(
+                    xtts,
+                    self.model,
+                    self.onnx_cache_dir,
+                    self.intra_op_threads,
+                    self.inter_op_threads,
+                )
+                # Remove o vocoder em PyTorch (e os seus pesos) antes de pôr a sessão do ONNX Runtime no lugar
+                del xtts.hifigan_decoder
+                xtts.hifigan_decoder = decoder
+            return tts
+
+        already_loaded = model_registry.is_loaded(self.registry_name, self.device)
+        tts = model_registry.get(self.registry_name, self.device, load)
+        if not already_loaded:
+            self.timings["model_load"] += model_registry.load_times[
+                (self.registry_name, self.device)
+            ]
+
+        return tts
+
+    def get_speaker_latents(self) -> tuple:
+        """
+        Get the XTTS conditioning latents (GPT latent and speaker embedding) of the speaker audio, computing them only once.
+
+        Returns:
+            tuple: The GPT conditioning latent and the speaker embedding.
+        """
+        if self._speaker_latents is None:
+            xtts = self.get_coqui_model().synthesizer.tts_model
+
+            start = time.perf_counter()
+            with profiler.span("xtts.speaker_latents", "inference"):
+                self._speaker_latents = xtts.get_conditioning_latents(
+                    audio_path=[self.speaker_audio_path],
+                    gpt_cond_len=xtts.config.gpt_cond_len,
+                    max_ref_length=xtts.config.max_ref_len,
+                    sound_norm_refs=xtts.config.sound_norm_refs,
+                )
+            self.timings["speaker_latents"] += time.perf_counter() - start
+
+        return self._speaker_latents
+
+    def release_model(self) -> None:
+        """
+        Release the Coqui TTS model from the process-wide model registry.
+        """
+        model_registry.release(self.registry_name, self.device)
+        self._speaker_latents = None
+
+    def synthesize_with_coqui(self, text: str) -> np.ndarray:
+        """
+        Convert text to speech using Coqui TTS.
+
+        Args:
+            text (str): The text to convert to speech.
+
+        Returns:
+            np.ndarray: The mono float32 waveform, at `self.sample_rate`.
+        """
+        tts = self.get_coqui_model()
+        gpt_cond_latent, speaker_embedding = self.get_speaker_latents()
+
+        start = time.perf_counter()
+        with profiler.span("xtts.synthesize", "inference", chars=len(text)):
+            out = tts.synthesizer.tts_model.inference(
+                text=text,
+                language=self.language,
+                gpt_cond_latent=gpt_cond_latent,
+                speaker_embedding=speaker_embedding,
+                enable_text_splitting=True,
+            )
+        self.timings["synthesis"] += time.perf_counter() - start
+
+        return np.asarray(out["wav"], dtype=np.float32)
+
+    def synthesize_with_google(self, text: str) -> np.ndarray:
+        """
+        Convert text to speech using Google Text-to-Speech.
+
+        Args:
+            text (str): The text to convert to speech.
+
+        Returns:
+            np.ndarray: The mono float32 waveform, at `self.sample_rate`.
+        """
+        from gtts import gTTS
+
+        start = time.perf_counter()
+        buffer = io.BytesIO()
+        with profiler.span("gtts.synthesize", "api", chars=len(text)):
+            gTTS(text, lang=self.language).write_to_fp(buffer)
+        buffer.seek(0)
+        seg = (
+            AudioSegment.from_file(buffer, format="mp3")
+            .set_channels(1)
+            .set_frame_rate(self.sample_rate)
+        )
+        self.timings["synthesis"] += time.perf_counter() - start
+
+        samples = np.array(seg.get_array_of_samples(), dtype=np.float32)
+        return samples / float(1 << (8 * seg.sample_width - 1))
+
+    def synthesize_batch(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        Convert a batch of texts to speech, in order.
+
+        The texts are synthesized one at a time (neither XTTS nor gTTS decodes several texts in
+        one call): the batch is only the unit of work sent to a worker process, cached and
+        written to the timeline at once.
+
+        Args:
+            texts (List[str]): The texts to convert to speech.
+
+        Returns:
+            List[np.ndarray]: One mono float32 waveform per text.
+        """
+        if self.voice == "coqui":
+            return [self.synthesize_with_coqui(text) for text in texts]
+        return [self.synthesize_with_google(text) for text in texts]
+
+
+# Cada processo do pool mantém a sua própria cópia do modelo
+_worker_synthesizer = None
+
+
+def _init_worker(synthesizer_kwargs: dict, num_threads: int) -> None:
+    global _worker_synthesizer
+
+    if synthesizer_kwargs["voice"] == "coqui":
+        import torch
+
+        torch.set_num_threads(num_threads)
+    _worker_synthesizer = Synthesizer(**synthesizer_kwargs)
+
+
+def _synthesize_in_worker(texts: List[str]):
+    before = dict(_worker_synthesizer.timings)
+    wavs = _worker_synthesizer.synthesize_batch(texts)
+    delta = {k: v - before[k] for k, v in _worker_synthesizer.timings.items()}
+    return wavs, delta
+
+
+class SynthesisPool:
+    """
+    A pool of worker processes that synthesize batches of texts, each of which loads its own copy of the model once.
+
+    The processes are started on first use, with as many workers as the batches need (at
+    most `n_workers`), and kept until `close`, so the model is loaded once per pool and not
+    once per call. A later call with more batches than workers restarts the pool with more
+    workers. The CPU threads are split evenly between the started workers.
+
+    Args:
+        synthesizer (Synthesizer): The synthesizer used in-process, whose settings are replicated in the workers
+            (and whose timings accumulate the time spent in the workers).
+        n_workers (int): The maximum number of worker processes.
+
+    Methods:
+        map(batches: List[List[str]]) -> Iterator[List[np.ndarray]]:
+            Synthesize the batches in the workers, yielding the waveforms of each batch in order.
+
+        close() -> None:
+            Shut down the worker processes.
+    """
+
+    def __init__(self, synthesizer: Synthesizer, n_workers: int):
+        self.synthesizer = synthesizer
+        self.n_workers = n_workers
+        self._executor = None
+        self._size = 0
+
+    def _start(self, size: int) -> None:
+        self.close()
+
+        synthesizer = self.synthesizer
+        synthesizer_kwargs = dict(
+            voice=synthesizer.voice,
+            speaker_audio_path=synthesizer.speaker_audio_path,
+            language=synthesizer.language,
+            model=synthesizer.model,
+            device=synthesizer.device,
+            backend=synthesizer.backend,
+            onnx_cache_dir=synthesizer.onnx_cache_dir,
+            inter_op_threads=synthesizer.inter_op_threads,
+        )
+        num_threads = max(1, (os.cpu_count() or 1) // size)
+        synthesizer_kwargs["intra_op_threads"] = (
+            synthesizer.intra_op_threads or num_threads
+        )
+
+        # "spawn" evita herdar o estado do torch/OpenMP do processo pai
+        self._executor = ProcessPoolExecutor(
+            max_workers=size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(synthesizer_kwargs, num_threads),
+        )
+        self._size = size
+
+    def map(self, batches: List[List[str]]) -> Iterator[List[np.ndarray]]:
+        """
+        Synthesize the batches in the workers, all submitted at once, yielding the waveforms of each batch in order.
+
+        Args:
+            batches (List[List[str]]): The texts of each batch.
+
+        Yields:
+            List[np.ndarray]: One mono float32 waveform per text of the batch.
+        """
+        size = min(self.n_workers, len(batches))
+        if size > self._size:
+            self._start(size)
+
+        for batch_wavs, delta in self._executor.map(_synthesize_in_worker, batches):
+            for name, seconds in delta.items():
+                self.synthesizer.timings[name] += seconds
+            yield batch_wavs
+
+    def close(self) -> None:
+        """
+        Shut down the worker processes (and release their models).
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._size = 0
+
+
+def iter_synthesize_chunks(
+    synthesizer: Synthesizer,
+    texts: List[str],
+    batch_size: int = 8,
+    n_workers: int = 1,
+    pool: Optional[SynthesisPool] = None,
+) -> Iterator[List[np.ndarray]]:
+    """
+    Synthesize many chunk texts in batches, yielding the waveforms of each batch as soon as it is ready, in order.
+
+    With `n_workers > 1`, every batch is submitted at once to a `SynthesisPool`: the given
+    one, kept by the caller between calls, or a pool started for this call only.
+
+    Args:
+        synthesizer (Synthesizer): The synthesizer used in-process, whose settings are replicated in the workers.
+        texts (List[str]): The texts to convert to speech.
+        batch_size (int, optional): The number of texts of a batch. Defaults to 8.
+        n_workers (int, optional): The number of worker processes. Defaults to 1 (no pool).
+        pool (SynthesisPool, optional): The pool of worker processes, not closed at the end. Defaults to None
+            (a pool of `n_workers` processes, closed at the end).
+
+    Yields:
+        List[np.ndarray]: One mono float32 waveform per text of the batch.
+    """
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+
+    if n_workers <= 1 or len(batches) <= 1:
+        for batch in batches:
+            yield synthesizer.synthesize_batch(batch)
+        return
+
+    if pool is not None:
+        yield from pool.map(batches)
+        return
+
+    pool = SynthesisPool(synthesizer, n_workers)
+    try:
+        yield from pool.map(batches)
+    finally:
+        pool.close()
+
+
+def synthesize_chunks(
+    synthesizer: Synthesizer,
+    texts: List[str],
+    batch_size: int = 8,
+    n_workers: int = 1,
+) -> List[np.ndarray]:
+    """
+    Synthesize many chunk texts, in batches, either in-process or in a pool of worker processes.
+
+    See `iter_synthesize_chunks`.
+
+    Args:
+        synthesizer (Synthesizer): The synthesizer used in-process, whose settings are replicated in the workers.
+        texts (List[str]): The texts to convert to speech.
+        batch_size (int, optional): The number of texts sent to a worker at once. Defaults to 8.
+        n_workers (int, optional): The number of worker processes. Defaults to 1 (no pool).
+
+    Returns:
+        List[np.ndarray]: One mono float32 waveform per text, in the same order as `texts`.
+    """
+    return [
+        wav
+        for batch in iter_synthesize_chunks(synthesizer, texts, batch_size, n_workers)
+        for wav in batch
+    ]
@@ -1,10 +1,24 @@
-import json
+import itertools
 import os
-from typing import Literal
+from typing import Callable, Iterator, List, Literal, Optional
 
-from gtts import gTTS
+import numpy as np
 from pydub import AudioSegment
-from TTS.api import TTS
+
+from desafio_hotmart.cache import AudioCache, file_sha256
+from desafio_hotmart.chunk_store import ChunkStore, load_chunks
+from desafio_hotmart.onnx_backend import ONNX_CACHE_DIR
+from desafio_hotmart.profiling import profiler
+from desafio_hotmart.scratch import ScratchSpace
+from desafio_hotmart.synthesis import SynthesisPool, Synthesizer, iter_synthesize_chunks
+from desafio_hotmart.time_stretch import time_stretch
+from desafio_hotmart.timeline import AudioTimeline
+from desafio_hotmart.timestamps import (
+    bounds_timing,
+    chunk_timing,
+    is_absolute_timeline,
+    normalize_chunks,
+)
 
 
 class TextToSpeech:
@@ -12,30 +26,51 @@ class TextToSpeech:
     A class that converts text to speech using either Google Text-to-Speech or Coqui TTS.
 
     Args:
-        text_path_with_timestamps (str): The path to the text file with timestamps.
+        text_path_with_timestamps (str): The path to the text file with timestamps (JSON or chunk store). None when the chunks are
+            synthesized as they arrive (streaming mode).
         audio_output_path (str): The path to save the generated audio file.
         voice (Literal["google", "coqui"]): The voice to use for text-to-speech conversion.
         speaker_audio_path (str): The path to the speaker audio file that will be used by Coqui TTS.
         min_speed_allowed (float, optional): The minimum allowed speed for speech. Defaults to 1.
         max_speed_allowed (float, optional): The maximum allowed speed for speech. Defaults to 1.25.
         language (str, optional): The language of the text. Defaults to "en".
-        add_time (float, optional): The time to add to the start of the next chunk when it returns to zero. Defaults to 29.
-        chunk_index_to_adjust_speed (list, optional): The indexes of the chunks to adjust the speed manually. Defaults to [37, 47].
+        chunk_index_to_adjust_speed (List[int], optional): The indexes of the chunks to speed up to `max_speed_allowed` instead of
+            using `set_speed`. Defaults to None (no manual override).
+        model (str, optional): The Coqui TTS model. Defaults to "tts_models/multilingual/multi-dataset/xtts_v2".
+        device (str, optional): The device where the Coqui TTS model runs. Defaults to "cpu".
+        n_workers (int, optional): The number of worker processes used to synthesize the chunks. Defaults to 1.
+        batch_size (int, optional): The number of chunks sent to the synthesizer at once. Defaults to 8.
+        stretch_backend (str, optional): The time-stretch backend used to speed up the speech ("wsola" or "pydub"). Defaults to "wsola".
+        cache_path (str, optional): The path of the persistent synthesis cache (SQLite). Defaults to None (no cache).
+        cache_max_bytes (int, optional): The maximum size of the cached audio, evicted in LRU order. Defaults to None (no limit).
+        scratch (ScratchSpace, optional): The job's scratch space, where a .mp3 speaker audio is converted to .wav.
+            Defaults to None (a private scratch space, removed with the instance).
+        backend (Literal["torch", "onnx"], optional): The runtime of the XTTS vocoder (see `Synthesizer`). Defaults to "torch".
+        onnx_cache_dir (str, optional): The directory of the exported ONNX graphs. Defaults to "data/cache/onnx".
+        intra_op_threads (int, optional): The intra-op threads of the ONNX Runtime session. Defaults to None.
+        inter_op_threads (int, optional): The inter-op threads of the ONNX Runtime session. Defaults to None.
 
     Raises:
         FileNotFoundError: If the speaker audio file, or text file is not found.
         ValueError: If the speaker audio file is not in .mp3 or .wav format.
 
     Attributes:
-        complete_text (dict): The complete text with timestamps.
+        complete_text (dict): The complete text, with the chunk timestamps normalized to one monotonic absolute timeline.
+        timing (dict): The precomputed "starts", "ends", "gaps", "speech_durations" and "total_durations" arrays of the chunks.
         audio_output_path (str): The path to save the generated audio file.
         voice (Literal["google", "coqui"]): The voice to use for text-to-speech conversion.
         speaker_audio_path (str): The path to the speaker audio file.
         min_speed_allowed (float): The minimum allowed speed for speech.
         max_speed_allowed (float): The maximum allowed speed for speech.
         language (str): The language of the text.
-        add_time (float): The time to add to the start of the next chunk when it returns to zero.
-        chunk_index_to_adjust_speed (list): The indexes of the chunks to adjust the speed manually.
+        chunk_index_to_adjust_speed (List[int]): The indexes of the chunks to adjust the speed manually.
+        n_workers (int): The number of worker processes used to synthesize the chunks.
+        batch_size (int): The number of chunks sent to the synthesizer at once.
+        stretch_backend (str): The time-stretch backend used to speed up the speech.
+        synthesizer (Synthesizer): The synthesizer that holds the TTS model and the speaker latents.
+        pool (SynthesisPool): The worker processes of the synthesis, kept until `close`, or None when `n_workers` is 1.
+        cache (AudioCache): The persistent synthesis cache, or None.
+        timings (dict): Accumulated time (in seconds) spent loading the model, computing the speaker latents and synthesizing.
 
     Methods:
         get_chunk_durations_in_seconds(i: int) -> Tuple[float, float]:
@@ -44,44 +79,79 @@ class TextToSpeech:
         set_speed(speed_max: float, speed_min: float) -> float:
             Set the speed for a given chunk based on the durations of the TTS audio and the original audio.
 
-        speed_up(speed: float, seg: AudioSegment, source_total_duration: float) -> AudioSegment:
-            Speed up the audio segment to the given speed, filling the remaining time with silence.
+        speed_up(speed: float, wav: np.ndarray) -> np.ndarray:
+            Speed up the waveform to the given speed.
+
+        release_model() -> None:
+            Release the Coqui TTS model from the process-wide model registry.
 
-        _get_audio_path(i: int) -> str:
-            Get the path to the audio file for the given chunk index.
+        close() -> None:
+            Shut down the worker processes of the synthesis, if any.
 
-        speech_to_text_with_coqui(text: str, i: int, model: str = "tts_models/multilingual/multi-dataset/xtts_v2") -> None:
-            Convert text to speech using Coqui TTS.
+        iter_synthesize_chunks(texts: Optional[List[str]] = None) -> Iterator[List[np.ndarray]]:
+            Synthesize the text chunks in batches of `batch_size`, yielding the waveforms of each batch, reusing the cached audio.
 
-        speech_to_text_with_google(text: str, i: int) -> None:
-            Convert text to speech using Google Text-to-Speech.
+        synthesize_chunks(texts: Optional[List[str]] = None) -> List[np.ndarray]:
+            Synthesize every text chunk to an in-memory waveform, in chunk order, reusing the cached audio.
 
-        convert_chunks_to_speech() -> AudioSegment:
-            Convert the text chunks to speech and return the final audio.
+        fit_chunk(wav: np.ndarray, source_speech_duration: float, source_total_duration: float, i: Optional[int] = None) -> np.ndarray:
+            Speed up the synthesized chunk when it is longer than the original speech.
 
-        export_audio(final_audio: AudioSegment, remove_temp_files: bool = True) -> None:
+        convert_chunks_to_speech(on_audio: Optional[Callable[[AudioTimeline, float], None]] = None) -> AudioTimeline:
+            Convert the text chunks to speech, batch by batch, and write each one at its absolute offset in the final audio.
+
+        export_audio(final_audio: AudioTimeline) -> None:
             Export the final audio to the specified audio output path.
     """
 
     def __init__(
         self,
-        text_path_with_timestamps: str,
+        text_path_with_timestamps: Optional[str],
         audio_output_path: str,
         voice: Literal["google", "coqui"],
         speaker_audio_path: str,
         min_speed_allowed: float = 1,
         max_speed_allowed: float = 1.25,
         language: str = "en",
-        add_time: float = 29,
-        chunk_index_to_adjust_speed: list = [37, 47],
+        chunk_index_to_adjust_speed: Optional[List[int]] = None,
+        model: str = "tts_models/multilingual/multi-dataset/xtts_v2",
+        device: str = "cpu",
+        n_workers: int = 1,
+        batch_size: int = 8,
+        stretch_backend: str = "wsola",
+        cache_path: Optional[str] = None,
+        cache_max_bytes: Optional[int] = None,
+        scratch: Optional[ScratchSpace] = None,
+        backend: Literal["torch", "onnx"] = "torch",
+        onnx_cache_dir: str = ONNX_CACHE_DIR,
+        intra_op_threads: Optional[int] = None,
+        inter_op_threads: Optional[int] = None,
     ):
-        with open(text_path_with_timestamps, "r") as f:
-            self.complete_text = json.load(f)
+        if text_path_with_timestamps is None:
+            self.complete_text = {"chunks": []}
+        else:
+            if not os.path.isfile(text_path_with_timestamps):
+                raise FileNotFoundError(
+                    f"Text file not found at {text_path_with_timestamps}"
+                )
+            self.complete_text = load_chunks(text_path_with_timestamps)
+
+        chunks = self.complete_text["chunks"]
+        if isinstance(chunks, ChunkStore) and is_absolute_timeline(
+            chunks.starts, chunks.ends
+        ):
+            # Colunas mapeadas em memória: o timing não precisa decodificar nenhum texto
+            self.timing = bounds_timing(chunks.starts, chunks.ends)
+        else:
+            # Transcrições antigas ainda têm os timestamps reiniciando a cada janela de 30 s do Whisper
+            self.complete_text["chunks"] = normalize_chunks(list(chunks))
+            self.timing = chunk_timing(self.complete_text["chunks"])
 
-        # Exporta o áudio do speaker para .wav, caso esteja em .mp3
+        # Exporta o áudio do speaker para .wav, caso esteja em .mp3 (no scratch do job, e não ao lado do original)
+        self.scratch = scratch or ScratchSpace()
         if speaker_audio_path.split(".")[-1] == "mp3":
             sound = AudioSegment.from_mp3(speaker_audio_path)
-            speaker_audio_path = speaker_audio_path.replace(".mp3", ".wav")
+            speaker_audio_path = self.scratch.path("speaker.wav")
             sound.export(speaker_audio_path, format="wav")
             self.speaker_audio_path = speaker_audio_path
         elif speaker_audio_path.split(".")[-1] == "wav":
@@ -95,19 +165,41 @@ class TextToSpeech:
         self.max_speed_allowed = max_speed_allowed
         self.min_speed_allowed = min_speed_allowed
         self.language = language
-        self.add_time = add_time
-        self.chunk_index_to_adjust_speed = chunk_index_to_adjust_speed
+        self.chunk_index_to_adjust_speed = chunk_index_to_adjust_speed or []
+        self.n_workers = n_workers
+        self.batch_size = batch_size
+        self.stretch_backend = stretch_backend
+        self.cache = (
+            AudioCache(cache_path, max_bytes=cache_max_bytes) if cache_path else None
+        )
 
         if not os.path.isfile(self.speaker_audio_path):
             raise FileNotFoundError(
                 f"Speaker audio file not found at {self.speaker_audio_path}"
             )
-        if not os.path.isfile(text_path_with_timestamps):
-            raise FileNotFoundError(
-                f"Text file not found at {text_path_with_timestamps}"
-            )
-        if self.voice == "coqui":
-            os.environ["COQUI_TOS_AGREED"] = "1"
+
+        self.synthesizer = Synthesizer(
+            voice=voice,
+            speaker_audio_path=self.speaker_audio_path,
+            language=language,
+            model=model,
+            device=device,
+            backend=backend,
+            onnx_cache_dir=onnx_cache_dir,
+            intra_op_threads=intra_op_threads,
+            inter_op_threads=inter_op_threads,
+        )
+        # Workers mantidos entre as chamadas (cada um carrega o modelo uma única vez), até `close`
+        self.pool = (
+            SynthesisPool(self.synthesizer, n_workers) if n_workers > 1 else None
+        )
+
+    @property
+    def timings(self) -> dict:
+        """
+        Accumulated time (in seconds) spent loading the model, computing the speaker latents and synthesizing.
+        """
+        return self.synthesizer.timings
 
     def get_chunk_durations_in_seconds(self, i: int):
         """
@@ -117,42 +209,11 @@ class TextToSpeech:
             i (int): The index of the current chunk.
 
         Returns:
-            Tuple[float, float]: The complete duration (speech + silence) and the speech duration of the chunk.
+            Tuple[float, float]: The complete duration (speech + silence until the next chunk) and the speech duration of the chunk.
         """
-        is_last_chunck = i == (len(self.complete_text["chunks"]) - 1)
-        if is_last_chunck:
-            current_chunk_ts = self.complete_text["chunks"][i]["timestamp"]
-
-            current_chunk_complete_duration = current_chunk_ts[1] - current_chunk_ts[0]
-            silence_duration = 0
-            current_chunk_speech_duration = current_chunk_complete_duration
-
-        else:
-            current_chunk_ts = self.complete_text["chunks"][i]["timestamp"]
-            next_chunk_ts = self.complete_text["chunks"][i + 1]["timestamp"]
-
-            if next_chunk_ts[0] < current_chunk_ts[1]:
-                # if next_chunk_ts[0] > 0:
-                #     # alguns chunks começam com um pequeno atraso, então é necessário ajustar o tempo
-                #     next_chunk_ts = [ts + (self.add_time  - next_chunk_ts[0]) for ts in next_chunk_ts]
-                # else:
-                # if current_chunk_ts[1] == self.add_time:
-                #     add_time = self.add_time + 1
-                # else:
-                #     add_time = self.add_time
-                next_chunk_ts = [ts + self.add_time for ts in next_chunk_ts]
-
-            current_chunk_complete_duration = next_chunk_ts[0] - current_chunk_ts[0]
-            silence_duration = next_chunk_ts[0] - current_chunk_ts[1]
-            current_chunk_speech_duration = current_chunk_ts[1] - current_chunk_ts[0]
-
-        assert current_chunk_complete_duration == (
-            silence_duration + current_chunk_speech_duration
-        )
-
         return (
-            current_chunk_complete_duration,
-            current_chunk_speech_duration,
+            float(self.timing["total_durations"][i]),
+            float(self.timing["speech_durations"][i]),
         )
 
     def set_speed(
@@ -192,155 +253,201 @@ class TextToSpeech:
 
         return speed
 
-    def speed_up(self, speed: float, seg: AudioSegment, source_total_duration: float):
+    def speed_up(self, speed: float, wav: np.ndarray) -> np.ndarray:
         """
-        Speed up the audio segment to the given speed, filling the remaining time with silence.
+        Speed up the waveform to the given speed, keeping its pitch. The remaining time of the chunk stays silent in the timeline.
 
         Args:
-            speed (float): The speed to accelerate the audio segment to.
-            seg (AudioSegment): The audio segment to accelerate.
-            source_total_duration (float): The total duration of the original audio of the current chunk (speech + silence).
+            speed (float): The speed to accelerate the waveform to.
+            wav (np.ndarray): The mono float32 waveform to accelerate.
 
         Returns:
-            AudioSegment: The accelerated audio segment.
+            np.ndarray: The accelerated waveform.
         """
-        if speed > 1:
-            seg_speed = seg.speedup(playback_speed=speed)
-        else:
+        if speed <= 1:
             # Quando se inseria speed = 1 (menor valor permitido), verificava-se que o áudio perdia qualidade
             # Assim, optou-se por manter o áudio original, sem aceleração (ocupando parte do silêncio do trecho original)
-            seg_speed = seg
-
-        silence_duration = source_total_duration - seg_speed.duration_seconds
+            return wav
 
-        if silence_duration > 0:
-            seg_speed += AudioSegment.silent(
-                silence_duration * 1000, seg_speed.frame_rate
+        with profiler.span(
+            "time_stretch", "dsp", speed=speed, backend=self.stretch_backend
+        ):
+            return time_stretch(
+                wav, speed, self.synthesizer.sample_rate, backend=self.stretch_backend
             )
 
-        return seg_speed
-
-    def _get_audio_path(self, i: int) -> str:
+    def release_model(self) -> None:
         """
-        Get the path to the audio file for the given chunk index.
-
-        Args:
-            i (int): The index of the current chunk.
-
-        Returns:
-            str: The path to the audio file.
+        Release the Coqui TTS model from the process-wide model registry.
         """
-        audio_path = f"data/audio_segments/{i}.wav"
-        audio_dir = os.path.dirname(audio_path)
-        if not os.path.exists(audio_dir):
-            os.makedirs(audio_dir)
+        self.synthesizer.release_model()
 
-        return audio_path
-
-    def speech_to_text_with_coqui(
-        self,
-        text: str,
-        i: int,
-        model: str = "tts_models/multilingual/multi-dataset/xtts_v2",
-    ) -> None:
+    def close(self) -> None:
+        """
+        Shut down the worker processes of the synthesis, if any.
         """
-        Convert text to speech using Coqui TTS.
+        if self.pool is not None:
+            self.pool.close()
+
+    def _cache_keys(self, texts: list) -> list:
+        synthesizer = self.synthesizer
+        coqui = synthesizer.voice == "coqui"
+        # A voz do Coqui depende do áudio de referência do speaker
+        speaker_hash = file_sha256(synthesizer.speaker_audio_path) if coqui else None
+        return [
+            self.cache.make_audio_key(
+                text,
+                synthesizer.voice,
+                synthesizer.model if coqui else "gtts",
+                synthesizer.language,
+                speaker_hash,
+                synthesizer.sample_rate,
+                # O vocoder ONNX gera uma forma de onda um pouco diferente da do PyTorch
+                runtime=synthesizer.backend if coqui else None,
+                precision="float32" if coqui else None,
+            )
+            for text in texts
+        ]
 
-        Args:
-            text (str): The text to convert to speech.
-            i (int): The index of the current chunk.
-            model (str, optional): The path to the Coqui TTS model. Defaults to "tts_models/multilingual/multi-dataset/xtts_v2".
+    def iter_synthesize_chunks(
+        self, texts: Optional[List[str]] = None
+    ) -> Iterator[List[np.ndarray]]:
         """
-        tts = TTS(model, gpu=False)
+        Synthesize the text chunks in batches of `self.batch_size`, yielding the waveforms of each batch in chunk order.
 
-        audio_path = self._get_audio_path(i)
+        Chunks found in the persistent cache are not synthesized again, and repeated texts
+        are synthesized only once. The new waveforms are cached batch by batch.
 
-        tts.tts_to_file(
-            text=text,
-            file_path=audio_path,
-            speaker_wav=self.speaker_audio_path,
-            language=self.language,
-        )
+        Args:
+            texts (List[str], optional): The texts to synthesize. Defaults to None (the text of every loaded chunk).
 
-    def speech_to_text_with_google(self, text: str, i: int) -> None:
+        Yields:
+            List[np.ndarray]: One mono float32 waveform per chunk of the batch, at `self.synthesizer.sample_rate`.
+        """
+        if texts is None:
+            texts = [chunk["text"] for chunk in self.complete_text["chunks"]]
+        if self.cache is None:
+            yield from iter_synthesize_chunks(
+                self.synthesizer, texts, self.batch_size, self.n_workers, self.pool
+            )
+            return
+
+        keys = self._cache_keys(texts)
+        wavs = self.cache.get_audios(keys)
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in wavs}
+        # Os textos ausentes estão na ordem dos chunks: cada lote só espera pelos seus
+        missing_keys = iter(missing)
+        new_batches = iter_synthesize_chunks(
+            self.synthesizer,
+            list(missing.values()),
+            self.batch_size,
+            self.n_workers,
+            self.pool,
+        )
+        for start in range(0, len(keys), self.batch_size):
+            batch_keys = keys[start : start + self.batch_size]
+            while any(key not in wavs for key in batch_keys):
+                batch_wavs = next(new_batches)
+                new_wavs = dict(
+                    zip(itertools.islice(missing_keys, len(batch_wavs)), batch_wavs)
+                )
+                self.cache.put_audios(new_wavs.items(), self.synthesizer.sample_rate)
+                wavs.update(new_wavs)
+            yield [wavs[key] for key in batch_keys]
+
+    def synthesize_chunks(self, texts: Optional[List[str]] = None) -> list:
         """
-        Convert text to speech using Google Text-to-Speech.
+        Synthesize every text chunk to an in-memory waveform, in chunk order.
+
+        Chunks found in the persistent cache are not synthesized again, and repeated texts
+        are synthesized only once.
 
         Args:
-            text (str): The text to convert to speech.
-            i (int): The index of the current chunk.
+            texts (List[str], optional): The texts to synthesize. Defaults to None (the text of every loaded chunk).
+
+        Returns:
+            List[np.ndarray]: One mono float32 waveform per chunk, at `self.synthesizer.sample_rate`.
         """
-        audio = gTTS(text, lang=self.language)
-        audio_path = self._get_audio_path(i)
-        audio.save(audio_path)
+        return [wav for batch in self.iter_synthesize_chunks(texts) for wav in batch]
 
-    def convert_chunks_to_speech(self) -> AudioSegment:
+    def fit_chunk(
+        self,
+        wav: np.ndarray,
+        source_speech_duration: float,
+        source_total_duration: float,
+        i: Optional[int] = None,
+    ) -> np.ndarray:
         """
-        Convert the text chunks to speech and return the final audio.
+        Speed up the synthesized chunk when it is longer than the original speech.
+
+        Args:
+            wav (np.ndarray): The synthesized waveform of the chunk.
+            source_speech_duration (float): The duration of the speech in the original audio of the chunk.
+            source_total_duration (float): The duration of the speech and of the following silence in the original audio.
+            i (int, optional): The index of the chunk, checked against `chunk_index_to_adjust_speed`. Defaults to None.
 
         Returns:
-            AudioSegment: The final audio segment.
+            np.ndarray: The waveform to write to the timeline.
         """
-        final_audio = AudioSegment.empty()
+        tts_duration = len(wav) / self.synthesizer.sample_rate
 
-        for i in range(len(self.complete_text["chunks"])):
+        # Quando fala TTS é mais longa que a fala observada no áudio original, necessidade de acelerar conforme lógica de velocidades (`self.set_speed`)
+        # permitindo-se ocupar parte do silêncio do trecho original (em português) com a fala traduzida (em inglês)
+        # Quando "sobra" tempo, o restante do trecho permanece em silêncio na timeline
+        if tts_duration <= source_speech_duration:
+            return wav
 
-            source_total_duration, source_speech_duration = (
-                self.get_chunk_durations_in_seconds(i)
+        if i in self.chunk_index_to_adjust_speed:
+            # Trechos que ficaram muito acelerados, então foi necessário ajustar manualmente
+            speed = self.max_speed_allowed
+        else:
+            speed = self.set_speed(
+                tts_duration, source_speech_duration, source_total_duration
             )
+        return self.speed_up(speed, wav)
 
-            if not os.path.exists(self._get_audio_path(i)):
-                if self.voice == "google":
-                    self.speech_to_text_with_google(
-                        text=self.complete_text["chunks"][i]["text"], i=i
-                    )
-
-                elif self.voice == "coqui":
-                    self.speech_to_text_with_coqui(
-                        text=self.complete_text["chunks"][i]["text"], i=i
-                    )
-
-            seg = AudioSegment.from_file(self._get_audio_path(i))
-            tts_duration = seg.duration_seconds
-
-            # Quando "sobra" tempo na fala do TTS, preenche-se com silêncio
-            if tts_duration <= source_speech_duration:
-                delta_time = tts_duration - source_speech_duration
-                seg_speed = seg + AudioSegment.silent(delta_time * 1000, seg.frame_rate)
-
-            # Quando fala TTS é mais longa que a fala observada no áudio originak, necessidade de acelerar conforme lógica de velocidades (`self.set_speed`)
-            # permitindo-se ocupar parte do silêncio do trecho original (em português) com a fala traduzida (em inglês)
+    def convert_chunks_to_speech(
+        self, on_audio: Optional[Callable[[AudioTimeline, float], None]] = None
+    ) -> AudioTimeline:
+        """
+        Convert the text chunks to speech, batch by batch, and write each one at its absolute offset in the final audio.
 
-            elif tts_duration > source_speech_duration:
-                if i in self.chunk_index_to_adjust_speed:
-                    # Trechos que ficaram muito acelerados, então foi necessário ajustar manualmente
-                    speed = self.max_speed_allowed
-                else:
-                    speed = self.set_speed(
-                        tts_duration, source_speech_duration, source_total_duration
-                    )
-                seg_speed = self.speed_up(speed, seg, source_total_duration)
+        Args:
+            on_audio (Callable[[AudioTimeline, float], None], optional): Called after each batch of `batch_size` chunks is
+                written, with the timeline and the time up to which its audio is final (e.g. `HLSWriter.update`). Defaults to None.
 
-            final_audio += seg_speed
+        Returns:
+            AudioTimeline: The final audio.
+        """
+        starts = self.timing["starts"]
+        ends = self.timing["ends"]
+
+        sample_rate = self.synthesizer.sample_rate
+        final_audio = AudioTimeline(ends.max() if len(ends) else 0, sample_rate)
+
+        i = 0
+        # A saída progressiva (HLS) avança a cada lote, sem esperar pela síntese de todos os chunks
+        for wavs in self.iter_synthesize_chunks():
+            for wav in wavs:
+                source_total_duration, source_speech_duration = (
+                    self.get_chunk_durations_in_seconds(i)
+                )
+                wav = self.fit_chunk(
+                    wav, source_speech_duration, source_total_duration, i
+                )
+                final_audio.write(starts[i], wav)
+                i += 1
+            if on_audio is not None and i < len(starts):
+                on_audio(final_audio, float(starts[i]))
 
         return final_audio
 
-    def export_audio(
-        self, final_audio: AudioSegment, remove_temp_files: bool = True
-    ) -> None:
+    def export_audio(self, final_audio: AudioTimeline) -> None:
         """
         Export the final audio to the specified audio output path.
 
         Args:
-            final_audio (AudioSegment): The final audio segment.
+            final_audio (AudioTimeline): The final audio.
         """
-        final_audio.export(self.audio_output_path, format="wav")
-
-        # Remove the audio files and the folder "data/audio_segments"
-        if remove_temp_files:
-            for i in range(len(self.complete_text["chunks"])):
-                audio_path = self._get_audio_path(i)
-                if os.path.exists(audio_path):
-                    os.remove(audio_path)
-            if os.path.exists("data/audio_segments"):
-                os.rmdir("data/audio_segments")
+        final_audio.export(self.audio_output_path)
@@ -0,0 +1,165 @@
+from typing import Callable, Dict
+
+import numpy as np
+
+# Fator de decimação da busca grossa do WSOLA, refinada depois no sinal original
+WSOLA_DECIMATION = 8
+# Frames janelados e somados de uma vez na saída (limita a memória em áudios longos)
+WSOLA_BLOCK_FRAMES = 256
+
+
+def _frame_parameters(sample_rate: int, frame_ms: float) -> tuple:
+    frame_length = 2 * int(round(sample_rate * frame_ms / 2000))
+    synthesis_hop = frame_length // 2
+    tolerance = synthesis_hop // 2
+    return frame_length, synthesis_hop, tolerance
+
+
+def stretch_wsola(
+    wav: np.ndarray, rate: float, sample_rate: int, frame_ms: float = 40
+) -> np.ndarray:
+    """
+    Change the speed of a waveform without changing its pitch, using WSOLA (Waveform Similarity Overlap-Add).
+
+    Each output frame is taken from around its nominal input position, shifted by up to half a hop
+    to the position that best continues the previous frame. The template depends on the shift
+    chosen for the previous frame, so the search runs frame by frame, coarse to fine: a direct
+    cross-correlation of the signal decimated by `WSOLA_DECIMATION` over the whole tolerance,
+    then over the `2 * WSOLA_DECIMATION - 1` shifts around the coarse match at full rate. That
+    is about 20 µs per 20 ms hop, a fraction of an FFT cross-correlation over every shift.
+    The frames are then windowed and overlap-added in place into the preallocated output, in
+    batches of `WSOLA_BLOCK_FRAMES`.
+
+    Args:
+        wav (np.ndarray): The mono float waveform.
+        rate (float): The playback rate (> 1 speeds up, < 1 slows down).
+        sample_rate (int): The sample rate of the waveform.
+        frame_ms (float, optional): The analysis frame length in milliseconds. Defaults to 40.
+
+    Returns:
+        np.ndarray: The stretched float32 waveform, with `round(len(wav) / rate)` samples.
+    """
+    wav = np.asarray(wav, dtype=np.float32)
+    n_out = int(round(len(wav) / rate))
+    frame_length, hop, tolerance = _frame_parameters(sample_rate, frame_ms)
+
+    if n_out == 0 or len(wav) < frame_length:
+        return np.interp(
+            np.linspace(0, len(wav) - 1, n_out), np.arange(len(wav)), wav
+        ).astype(np.float32)
+
+    n_frames = int(np.ceil(n_out / hop)) + 2
+    analysis_hop = hop * rate
+    decimation = WSOLA_DECIMATION
+
+    # Zeros nas bordas para que a busca (±tolerance), o template e o último frame não saiam do sinal.
+    # O hop extra no início evita o fade-in da janela sobre os primeiros samples
+    padded = np.pad(
+        wav,
+        (tolerance + hop, frame_length + 2 * tolerance + 2 * hop + decimation),
+    )
+    max_position = len(padded) - frame_length - 2 * tolerance - hop - decimation
+    nominals = np.minimum(
+        np.round(np.arange(n_frames) * analysis_hop).astype(np.int64), max_position
+    )
+
+    # Busca grossa na média de cada `decimation` samples
+    coarse = padded[: len(padded) // decimation * decimation]
+    coarse = coarse.reshape(-1, decimation).mean(axis=1)
+    coarse_frame = frame_length // decimation
+    coarse_lags = 2 * tolerance // decimation + 1
+
+    positions = np.empty(n_frames, dtype=np.int64)
+    positions[0] = position = tolerance
+    for k in range(1, n_frames):
+        nominal = int(nominals[k])
+        start = position + hop
+        template = padded[start : start + frame_length]
+
+        region = nominal // decimation
+        template_start = start // decimation
+        lag = np.correlate(
+            coarse[region : region + coarse_lags + coarse_frame - 1],
+            coarse[template_start : template_start + coarse_frame],
+        ).argmax()
+        guess = (region + int(lag)) * decimation + start % decimation
+
+        low = max(nominal, guess - decimation + 1)
+        high = max(low, min(nominal + 2 * tolerance, guess + decimation - 1))
+        shift = np.correlate(padded[low : high + frame_length], template).argmax()
+        positions[k] = position = low + int(shift)
+
+    window = np.hanning(frame_length + 1)[:-1].astype(np.float32)
+    offsets = np.arange(frame_length)
+
+    # Saída pré-alocada: com hop = frame_length / 2, cada bloco de `hop` samples soma a 2ª metade
+    # de um frame e a 1ª do seguinte, adicionadas no lugar a cada lote de frames
+    output = np.zeros((n_frames + 1) * hop, dtype=np.float32)
+    blocks = output.reshape(-1, hop)
+    for block_start in range(0, n_frames, WSOLA_BLOCK_FRAMES):
+        block_end = min(block_start + WSOLA_BLOCK_FRAMES, n_frames)
+        frames = padded[positions[block_start:block_end, None] + offsets]
+        frames *= window
+        blocks[block_start:block_end] += frames[:, :hop]
+        blocks[block_start + 1 : block_end + 1] += frames[:, hop:]
+
+    return output[hop : hop + n_out]
+
+
+def stretch_pydub(wav: np.ndarray, rate: float, sample_rate: int) -> np.ndarray:
+    """
+    Change the speed of a waveform with `AudioSegment.speedup` (the original implementation, kept for comparison).
+
+    Args:
+        wav (np.ndarray): The mono float waveform.
+        rate (float): The playback rate (must be > 1).
+        sample_rate (int): The sample rate of the waveform.
+
+    Returns:
+        np.ndarray: The stretched float32 waveform.
+    """
+    from pydub import AudioSegment
+
+    seg = AudioSegment(
+        (np.clip(wav, -1, 1) * 32767).astype(np.int16).tobytes(),
+        frame_rate=sample_rate,
+        sample_width=2,
+        channels=1,
+    )
+    seg_speed = seg.speedup(playback_speed=rate)
+
+    return np.array(seg_speed.get_array_of_samples(), dtype=np.float32) / 32768
+
+
+TIME_STRETCH_BACKENDS: Dict[str, Callable[[np.ndarray, float, int], np.ndarray]] = {
+    "wsola": stretch_wsola,
+    "pydub": stretch_pydub,
+}
+
+
+def time_stretch(
+    wav: np.ndarray, rate: float, sample_rate: int, backend: str = "wsola"
+) -> np.ndarray:
+    """
+    Change the speed of a waveform with the selected backend.
+
+    Args:
+        wav (np.ndarray): The mono float waveform.
+        rate (float): The playback rate (> 1 speeds up).
+        sample_rate (int): The sample rate of the waveform.
+        backend (str, optional): One of `TIME_STRETCH_BACKENDS`. Defaults to "wsola".
+
+    Returns:
+        np.ndarray: The stretched float32 waveform.
+
+    Raises:
+        ValueError: If the backend is unknown or the rate is not positive.
+    """
+    if backend not in TIME_STRETCH_BACKENDS:
+        raise ValueError(
+            f"Invalid time-stretch backend. Please choose one of {sorted(TIME_STRETCH_BACKENDS)}."
+        )
+    if rate <= 0:
+        raise ValueError("The playback rate must be positive.")
+
+    return TIME_STRETCH_BACKENDS[backend](wav, rate, sample_rate)
@@ -0,0 +1,92 @@
+import numpy as np
+import soundfile as sf
+
+
+class AudioTimeline:
+    """
+    A preallocated mono audio buffer where chunks are written at their absolute sample offsets.
+
+    Writing a chunk costs O(len(chunk)), so assembling the whole track is linear in its length,
+    and each chunk starts exactly at its timestamp instead of accumulating rounding drift.
+    When a chunk is longer than the room left before the next one, the next chunk is pushed
+    to the end of the previous one, so speech never overlaps.
+
+    Args:
+        duration_seconds (float): The expected duration of the timeline, used to preallocate the buffer.
+        sample_rate (int): The sample rate of the timeline.
+
+    Attributes:
+        sample_rate (int): The sample rate of the timeline.
+        samples (np.ndarray): The float32 samples written so far (silence elsewhere).
+
+    Methods:
+        write(start_seconds: float, samples: np.ndarray) -> float:
+            Write a chunk at its start time and return the time where it was actually placed.
+
+        to_int16() -> np.ndarray:
+            Return the timeline as 16-bit PCM samples.
+
+        export(path: str) -> None:
+            Write the timeline to a .wav file.
+    """
+
+    def __init__(self, duration_seconds: float, sample_rate: int):
+        self.sample_rate = sample_rate
+        self._buffer = np.zeros(self._to_samples(duration_seconds), dtype=np.float32)
+        self._length = len(self._buffer)
+        self._cursor = 0
+
+    def _to_samples(self, seconds: float) -> int:
+        return max(0, int(round(seconds * self.sample_rate)))
+
+    @property
+    def samples(self) -> np.ndarray:
+        return self._buffer[: self._length]
+
+    @property
+    def duration_seconds(self) -> float:
+        return self._length / self.sample_rate
+
+    def write(self, start_seconds: float, samples: np.ndarray) -> float:
+        """
+        Write a chunk at its start time.
+
+        Args:
+            start_seconds (float): The absolute start time of the chunk.
+            samples (np.ndarray): The mono samples of the chunk.
+
+        Returns:
+            float: The time (in seconds) where the chunk was placed, later than `start_seconds` only if the previous chunk overflowed.
+        """
+        offset = max(self._to_samples(start_seconds), self._cursor)
+        end = offset + len(samples)
+
+        if end > len(self._buffer):
+            # Crescimento geométrico, para manter o custo amortizado linear
+            grown = np.zeros(max(end, 2 * len(self._buffer)), dtype=np.float32)
+            grown[: self._length] = self._buffer[: self._length]
+            self._buffer = grown
+
+        self._buffer[offset:end] = samples
+        self._cursor = end
+        self._length = max(self._length, end)
+
+        return offset / self.sample_rate
+
+    def to_int16(self) -> np.ndarray:
+        """
+        Return the timeline as 16-bit PCM samples.
+
+        Returns:
+            np.ndarray: The int16 samples.
+        """
+        return (np.clip(self.samples, -1, 1) * 32767).astype(np.int16)
+
+    def export(self, path: str) -> None:
+        """
+        Write the timeline to a .wav file.
+
+        Args:
+            path (str): The path of the .wav file.
+        """
+        sf.write(path, self.to_int16(), self.sample_rate, subtype="PCM_16")
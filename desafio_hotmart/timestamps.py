@@ -0,0 +1,123 @@
+from typing import List, Optional
+
+import numpy as np
+
+# Taxa de fala média (palavras por segundo), usada apenas para estimar o fim de um chunk sem timestamp final
+WORDS_PER_SECOND = 2.5
+
+
+def normalize_chunks(
+    chunks: List[dict],
+    window_offsets: Optional[List[float]] = None,
+    total_duration: Optional[float] = None,
+) -> List[dict]:
+    """
+    Put Whisper chunks on one monotonic, absolute timeline.
+
+    Whisper's long-form output restarts its timestamps at every 30 s window. A window starts
+    where the previous one stopped decoding (the end of its last chunk), so unless the window
+    offsets are known, each reset is shifted by the absolute end of the previous chunk. Missing
+    end timestamps (None) are filled with the start of the next chunk, the total duration, or an
+    estimate from the number of words. Chunks already on an absolute timeline are unchanged.
+
+    Args:
+        chunks (List[dict]): The chunks, each with a "timestamp" (start, end) and a "text".
+        window_offsets (List[float], optional): The absolute start of each decoding window, when known. Defaults to None (inferred).
+        total_duration (float, optional): The duration of the audio, used to close the last chunk. Defaults to None.
+
+    Returns:
+        List[dict]: New chunks with absolute [start, end] timestamps, in the same order.
+    """
+    normalized = []
+    window = 0
+    offset = window_offsets[0] if window_offsets else 0.0
+    previous_local_end = None
+
+    for i, chunk in enumerate(chunks):
+        start, end = chunk["timestamp"]
+
+        if previous_local_end is not None and start < previous_local_end:
+            # Reinício dos timestamps: início de uma nova janela
+            window += 1
+            if window_offsets and window < len(window_offsets):
+                offset = window_offsets[window]
+            else:
+                offset = normalized[-1]["timestamp"][1]
+
+        absolute_start = start + offset
+        if end is None:
+            absolute_end = _estimate_end(
+                chunks, i, offset, absolute_start, total_duration
+            )
+            previous_local_end = absolute_end - offset
+        else:
+            absolute_end = end + offset
+            previous_local_end = end
+
+        # Arredonda ao milissegundo, eliminando ruído de ponto flutuante das somas
+        absolute_start = round(absolute_start, 3)
+        absolute_end = round(max(absolute_end, absolute_start), 3)
+        normalized.append(dict(chunk, timestamp=[absolute_start, absolute_end]))
+
+    return normalized
+
+
+def _estimate_end(chunks, i, offset, absolute_start, total_duration):
+    if i + 1 < len(chunks):
+        next_start = chunks[i + 1]["timestamp"][0]
+        if next_start >= chunks[i]["timestamp"][0]:
+            return next_start + offset
+    if i + 1 == len(chunks) and total_duration is not None:
+        return max(total_duration, absolute_start)
+    return absolute_start + len(chunks[i]["text"].split()) / WORDS_PER_SECOND
+
+
+def chunk_timing(chunks: List[dict]) -> dict:
+    """
+    Precompute the timing arrays of chunks that are on an absolute timeline.
+
+    Args:
+        chunks (List[dict]): The normalized chunks.
+
+    Returns:
+        dict: float64 arrays "starts", "ends", "gaps" (silence until the next chunk, 0 for the last one),
+            "speech_durations" and "total_durations" (speech + following silence).
+    """
+    starts = np.array([chunk["timestamp"][0] for chunk in chunks], dtype=np.float64)
+    ends = np.array([chunk["timestamp"][1] for chunk in chunks], dtype=np.float64)
+    return bounds_timing(starts, ends)
+
+
+def is_absolute_timeline(starts: np.ndarray, ends: np.ndarray) -> bool:
+    """
+    Check whether start/end columns are already on one monotonic, absolute timeline (no window resets, no missing ends).
+    """
+    return bool(
+        not np.isnan(ends).any()
+        and np.all(ends >= starts)
+        and np.all(starts[1:] >= ends[:-1])
+    )
+
+
+def bounds_timing(starts: np.ndarray, ends: np.ndarray) -> dict:
+    """
+    Precompute the timing arrays from the start and end columns of chunks on an absolute timeline.
+
+    Args:
+        starts (np.ndarray): The start of each chunk, in seconds.
+        ends (np.ndarray): The end of each chunk, in seconds.
+
+    Returns:
+        dict: The same arrays as `chunk_timing`.
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    next_starts = np.append(starts[1:], ends[-1:])
+
+    return dict(
+        starts=starts,
+        ends=ends,
+        gaps=np.maximum(next_starts - ends, 0),
+        speech_durations=ends - starts,
+        total_durations=np.maximum(next_starts, ends) - starts,
+    )
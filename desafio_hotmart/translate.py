@@ -1,10 +1,110 @@
+import asyncio
 import json
 import os
-from typing import Literal
+import time
+from typing import TYPE_CHECKING, Dict, List, Literal, Optional, Tuple
 
+import numpy as np
 from dotenv import load_dotenv
-from openai import OpenAI
-from transformers import pipeline
+
+from desafio_hotmart.cache import TranslationCache
+from desafio_hotmart.chunk_store import load_chunks
+from desafio_hotmart.model_registry import model_registry
+from desafio_hotmart.onnx_backend import ONNX_CACHE_DIR
+from desafio_hotmart.profiling import profiler
+from desafio_hotmart.rate_limit import TokenBucket, backoff_delay, parse_retry_after
+
+# openai, torch e transformers são importados apenas pelo tradutor escolhido (ver desafio_hotmart.backends)
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+OPENAI_MODEL = "gpt-3.5-turbo"
+OPENAI_TEMPERATURE = 0.2
+NLLB_MODEL = "facebook/nllb-200-distilled-600M"
+NLLB_SRC_LANG = "por_Latn"
+NLLB_TGT_LANG = "eng_Latn"
+
+OPENAI_SYSTEM_PROMPT = """
+Translate this Portuguese sentence into English.
+Please, do not translate names, brands (such as 'Salude') and places, keeping them in the translated text.
+Do not insert any new information.
+If you see the isolated word 'Beleza?', consider translating it as 'Okay?' or 'Alright?'.
+Try to keep the same tone and style of the original text, and also the same length, considering that the translation will be used in a voice-over."""
+
+# Modo "packed": vários chunks consecutivos por requisição, com resposta estruturada (JSON schema)
+OPENAI_PACKED_SYSTEM_PROMPT = """
+Translate the Portuguese chunks of a video transcript into English.
+You receive a JSON object with "context", the chunks that come just before (for reference only, do not translate them), and "chunks", a list of {"id", "text"}.
+Return one translation per chunk, with the same id. Translate each chunk on its own, without merging or splitting chunks, since each one is dubbed over its own time slot.
+Please, do not translate names, brands (such as 'Salude') and places, keeping them in the translated text.
+Do not insert any new information.
+If you see the isolated word 'Beleza?', consider translating it as 'Okay?' or 'Alright?'.
+Try to keep the same tone and style of the original text, and also the same length, considering that the translation will be used in a voice-over."""
+# Schemas estritos não aceitam chaves dinâmicas, então o mapeamento id -> tradução é uma lista de pares
+OPENAI_PACKED_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "translations",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "translations": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "string"},
+                            "text": {"type": "string"},
+                        },
+                        "required": ["id", "text"],
+                        "additionalProperties": False,
+                    },
+                }
+            },
+            "required": ["translations"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+class EmptyResponseError(RuntimeError):
+    """
+    Raised when the OpenAI API keeps returning an empty message.
+    """
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough number of tokens of a text (about 4 characters per token), plus the JSON overhead of a packed chunk.
+    """
+    return len(text) // 4 + 8
+
+
+def pack_windows(texts: List[str], max_tokens: int, max_chunks: int) -> List[List[int]]:
+    """
+    Split texts into windows of consecutive indexes whose estimated size fits in a token budget.
+
+    Args:
+        texts (List[str]): The texts to pack.
+        max_tokens (int): The token budget of the texts of a window. A text larger than the budget gets a window of its own.
+        max_chunks (int): The maximum number of texts of a window.
+
+    Returns:
+        List[List[int]]: The indexes of the texts of each window, in order.
+    """
+    windows, window, size = [], [], 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if window and (size + tokens > max_tokens or len(window) >= max_chunks):
+            windows.append(window)
+            window, size = [], 0
+        window.append(i)
+        size += tokens
+    if window:
+        windows.append(window)
+    return windows
 
 
 class Translator:
@@ -12,51 +112,192 @@ class Translator:
     A class that provides translation functionality using different translation models.
 
     Args:
-        data_with_timestamps_path (str): The path to the file containing data with timestamps.
+        data_with_timestamps_path (str): The path to the file containing data with timestamps (JSON or chunk store). None when the chunks
+            are passed to `translate_chunks` directly (streaming mode).
         translator (Literal["nllb", "openai"]): The translator to use. Must be either "nllb" or "openai".
         output_path_json (str): The path to save the translated data in JSON format with the timestamps.
         output_path_txt (str): The path to save the translated data in text format.
+        concurrency (int, optional): The maximum number of concurrent OpenAI requests. With 1, chunks are translated sequentially. Defaults to 1.
+        requests_per_minute (float, optional): The rate limit of the concurrent OpenAI requests. Defaults to None (no limit).
+        max_retries (int, optional): The number of retries of a concurrent OpenAI request on 429 and 5xx responses. Defaults to 5.
+        base_url (str, optional): The base URL of the OpenAI API (e.g. a local stub server). Defaults to None (the OpenAI endpoint).
+        batch_size (int, optional): The number of chunks translated at once by NLLB. Defaults to 16.
+        quantize (bool, optional): Whether to apply int8 dynamic quantization to the NLLB model (CPU only). Defaults to False.
+        device (str, optional): The device where the NLLB model runs. Defaults to "cpu".
+        backend (Literal["torch", "onnx"], optional): The runtime of the NLLB model: PyTorch, or ONNX Runtime on CPU
+            (the model is exported once to `onnx_cache_dir`). Defaults to "torch".
+        onnx_cache_dir (str, optional): The directory of the exported ONNX graphs. Defaults to "data/cache/onnx".
+        intra_op_threads (int, optional): The intra-op threads of the ONNX Runtime sessions. Defaults to None (one per core).
+        inter_op_threads (int, optional): The inter-op threads of the ONNX Runtime sessions. Defaults to None (sequential execution).
+        cache_path (str, optional): The path of the persistent translation cache (SQLite). Defaults to None (no cache).
+        cache_max_bytes (int, optional): The maximum size of the cached translations, evicted in LRU order. Defaults to None (no limit).
+        packed (bool, optional): Whether to send windows of consecutive chunks in one OpenAI request, with a structured
+            JSON response. Chunks missing from the responses are re-requested, then translated one by one. Defaults to False.
+        pack_max_tokens (int, optional): The token budget of the chunks of a packed request. Defaults to 1500.
+        pack_max_chunks (int, optional): The maximum number of chunks of a packed request. Defaults to 40.
+        context_chunks (int, optional): The number of preceding chunks sent as context with a packed request. Defaults to 3.
+        packed_model (str, optional): The OpenAI model of the packed requests, which must support structured outputs
+            (e.g. "gpt-4o-mini"). Defaults to None (the model of the single-chunk requests).
 
     Attributes:
         translator (str): The translator being used.
-        openai_client (OpenAI): The OpenAI client for translation.
-        data_with_timesamps (dict): The data with timestamps loaded from the file.
+        data_with_timesamps (dict): The data with timestamps loaded from the file, or None.
+        cache (TranslationCache): The persistent translation cache, or None.
+        stats (dict): Latency and throughput of the last concurrent translation, and the cache hit rate.
 
     Methods:
+        get_nllb_pipeline: Returns the NLLB translation pipeline, built only once per process.
         translate_with_nllb: Translates text using the NLLB translation model.
+        translate_batch_with_nllb: Translates many texts using the NLLB translation model, in length-sorted batches.
         translate_with_openai: Translates text using the OpenAI translation model.
-        translate_chunks: Translates chunks of text using the selected translator.
+        translate_with_openai_async: Translates text using the OpenAI translation model, with rate limiting and retries.
+        translate_texts_async: Translates texts concurrently using the OpenAI translation model.
+        translate_window_async: Translates a window of consecutive chunks in a single OpenAI request.
+        translate_texts_packed_async: Translates texts in packed OpenAI requests, falling back to one request per chunk.
+        translate_texts: Translates texts using the selected translator.
+        translate_chunks: Translates chunks of text using the selected translator, reusing the cached translations.
+        build_translated_data: Builds the translated data from the translated chunks.
 
     Returns:
         dict: The translated data.
 
     Raises:
-        ValueError: If an invalid translator is provided.
+        ValueError: If an invalid translator or backend is provided.
     """
 
     def __init__(
         self,
-        data_with_timestamps_path: str,
+        data_with_timestamps_path: Optional[str],
         translator: Literal["nllb", "openai"],
         output_path_json: str,
         output_path_txt: str,
+        concurrency: int = 1,
+        requests_per_minute: Optional[float] = None,
+        max_retries: int = 5,
+        base_url: Optional[str] = None,
+        batch_size: int = 16,
+        quantize: bool = False,
+        device: str = "cpu",
+        cache_path: Optional[str] = None,
+        cache_max_bytes: Optional[int] = None,
+        packed: bool = False,
+        pack_max_tokens: int = 1500,
+        pack_max_chunks: int = 40,
+        context_chunks: int = 3,
+        packed_model: Optional[str] = None,
+        backend: Literal["torch", "onnx"] = "torch",
+        onnx_cache_dir: str = ONNX_CACHE_DIR,
+        intra_op_threads: Optional[int] = None,
+        inter_op_threads: Optional[int] = None,
     ):
+        if backend not in ("torch", "onnx"):
+            raise ValueError("Invalid backend. Please choose either 'torch' or 'onnx'.")
+
         load_dotenv()
 
         self.translator = translator
-        self.openai_client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+        self.base_url = base_url
         self.output_path_json = output_path_json
         self.output_path_txt = output_path_txt
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.max_retries = max_retries
+        self.batch_size = batch_size
+        self.quantize = quantize
+        self.device = device
+        self.packed = packed
+        self.pack_max_tokens = pack_max_tokens
+        self.pack_max_chunks = pack_max_chunks
+        self.context_chunks = context_chunks
+        self.packed_model = packed_model or OPENAI_MODEL
+        self.backend = backend
+        self.onnx_cache_dir = onnx_cache_dir
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.cache = (
+            TranslationCache(cache_path, max_bytes=cache_max_bytes)
+            if cache_path
+            else None
+        )
+        self.stats = {}
+
+        self.data_with_timesamps = None
+        if data_with_timestamps_path is not None:
+            self.data_with_timesamps = load_chunks(data_with_timestamps_path)
+
+    def _async_openai_client(self) -> "AsyncOpenAI":
+        from openai import AsyncOpenAI
+
+        # Os retries são feitos em _request_with_retries (com backoff e rate limit), e não pelo cliente
+        return AsyncOpenAI(
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            base_url=self.base_url,
+            max_retries=0,
+        )
+
+    def get_nllb_pipeline(
+        self,
+        model: str = NLLB_MODEL,
+        src_lang: str = NLLB_SRC_LANG,
+        tgt_lang: str = NLLB_TGT_LANG,
+    ):
+        """
+        Returns the NLLB translation pipeline, built only once per process and kept in the model registry.
+
+        Args:
+            model (str, optional): The NLLB translation model to use. Defaults to "facebook/nllb-200-distilled-600M".
+            src_lang (str, optional): The source language. Defaults to "por_Latn".
+            tgt_lang (str, optional): The target language. Defaults to "eng_Latn".
+
+        Returns:
+            TranslationPipeline: The translation pipeline.
+        """
 
-        with open(data_with_timestamps_path, "r") as f:
-            self.data_with_timesamps = json.load(f)
+        if self.backend == "onnx":
+            from desafio_hotmart.onnx_backend import load_nllb_pipeline
+
+            return model_registry.get(
+                f"{model}:{src_lang}->{tgt_lang}:onnx"
+                + (":int8" if self.quantize else ""),
+                "cpu",
+                lambda: load_nllb_pipeline(
+                    model,
+                    src_lang,
+                    tgt_lang,
+                    self.onnx_cache_dir,
+                    self.quantize,
+                    self.intra_op_threads,
+                    self.inter_op_threads,
+                ),
+            )
+
+        def load():
+            import torch
+            from transformers import pipeline
+
+            translator = pipeline(
+                "translation",
+                model=model,
+                tgt_lang=tgt_lang,
+                src_lang=src_lang,
+                device=self.device,
+            )
+            if self.quantize:
+                # Quantização dinâmica int8 das camadas lineares, para inferência em CPU
+                translator.model = torch.quantization.quantize_dynamic(
+                    translator.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+            return translator
+
+        name = f"{model}:{src_lang}->{tgt_lang}" + (":int8" if self.quantize else "")
+        return model_registry.get(name, self.device, load)
 
     def translate_with_nllb(
         self,
         src_text: str,
-        model: str = "facebook/nllb-200-distilled-600M",
-        src_lang: str = "por_Latn",
-        tgt_lang: str = "eng_Latn",
+        model: str = NLLB_MODEL,
+        src_lang: str = NLLB_SRC_LANG,
+        tgt_lang: str = NLLB_TGT_LANG,
     ) -> str:
         """
         Translates text using the NLLB translation model.
@@ -70,25 +311,58 @@ class Translator:
         Returns:
             str: The translated text.
         """
-        translator = pipeline(
-            "translation", model=model, tgt_lang=tgt_lang, src_lang=src_lang
-        )
-        return translator(src_text)[0]["translation_text"]
+        translator = self.get_nllb_pipeline(model, src_lang, tgt_lang)
+        with profiler.span("nllb", "inference", texts=1):
+            return translator(src_text)[0]["translation_text"]
+
+    def translate_batch_with_nllb(
+        self,
+        src_texts: list,
+        model: str = NLLB_MODEL,
+        src_lang: str = NLLB_SRC_LANG,
+        tgt_lang: str = NLLB_TGT_LANG,
+    ) -> list:
+        """
+        Translates many texts using the NLLB translation model.
+
+        The texts are sorted by length before being split in batches of `self.batch_size`,
+        so each batch pads to a similar length, and the translations are returned in the
+        original order.
+
+        Args:
+            src_texts (list): The source texts to be translated.
+            model (str, optional): The NLLB translation model to use. Defaults to "facebook/nllb-200-distilled-600M".
+            src_lang (str, optional): The source language. Defaults to "por_Latn".
+            tgt_lang (str, optional): The target language. Defaults to "eng_Latn".
+
+        Returns:
+            list: The translated texts.
+        """
+        if not src_texts:
+            return []
+
+        translator = self.get_nllb_pipeline(model, src_lang, tgt_lang)
+        order = sorted(range(len(src_texts)), key=lambda i: len(src_texts[i]))
+        with profiler.span("nllb", "inference", texts=len(src_texts)):
+            outputs = translator(
+                [src_texts[i] for i in order], batch_size=self.batch_size
+            )
+
+        translated_texts = [None] * len(src_texts)
+        for i, output in zip(order, outputs):
+            translated_texts[i] = output["translation_text"]
+
+        return translated_texts
 
     def translate_with_openai(
         self,
         src_text: str,
-        model: str = "gpt-3.5-turbo",
-        system_prompt: str = """
-Translate this Portuguese sentence into English.
-Please, do not translate names, brands (such as 'Salude') and places, keeping them in the translated text.
-Do not insert any new information.
-If you see the isolated word 'Beleza?', consider translating it as 'Okay?' or 'Alright?'.
-Try to keep the same tone and style of the original text, and also the same length, considering that the translation will be used in a voice-over.""",
-        temperature: float = 0.2,
+        model: str = OPENAI_MODEL,
+        system_prompt: str = OPENAI_SYSTEM_PROMPT,
+        temperature: float = OPENAI_TEMPERATURE,
     ) -> str:
         """
-        Translates text using the OpenAI translation model.
+        Translates text using the OpenAI translation model, with the retries of `translate_with_openai_async`.
 
         Args:
             src_text (str): The source text to be translated.
@@ -99,43 +373,500 @@ Try to keep the same tone and style of the original text, and also the same leng
         Returns:
             str: The translated text.
         """
-        response = self.openai_client.chat.completions.create(
-            model=model,
-            messages=[
+
+        async def translate():
+            async with self._async_openai_client() as client:
+                text, _, _ = await self.translate_with_openai_async(
+                    client, src_text, None, model, system_prompt, temperature
+                )
+            return text
+
+        return asyncio.run(translate())
+
+    async def translate_with_openai_async(
+        self,
+        client: "AsyncOpenAI",
+        src_text: str,
+        rate_limiter: Optional[TokenBucket] = None,
+        model: str = OPENAI_MODEL,
+        system_prompt: str = OPENAI_SYSTEM_PROMPT,
+        temperature: float = OPENAI_TEMPERATURE,
+    ) -> tuple:
+        """
+        Translates text using the OpenAI translation model, retrying with exponential backoff on 429 and 5xx responses.
+
+        Args:
+            client (AsyncOpenAI): The async OpenAI client.
+            src_text (str): The source text to be translated.
+            rate_limiter (TokenBucket, optional): The rate limiter shared by the concurrent requests. Defaults to None.
+            model (str, optional): The OpenAI translation model to use. Defaults to "gpt-3.5-turbo".
+            system_prompt (str, optional): The system prompt for the translation. Defaults to the system prompt provided.
+            temperature (float, optional): The temperature for the translation. Defaults to 0.2.
+
+        Returns:
+            tuple: The translated text, the latency of the successful request (in seconds) and the number of retries.
+
+        Raises:
+            openai.APIError: If the request still fails after `self.max_retries` retries.
+            EmptyResponseError: If the response is still empty after `self.max_retries` retries.
+        """
+        return await self._request_with_retries(
+            client,
+            [
                 {
                     "role": "system",
                     "content": system_prompt,
                 },
                 {"role": "user", "content": src_text},
             ],
-            temperature=temperature,
+            rate_limiter,
+            model,
+            temperature,
         )
 
-        return response.model_dump()["choices"][0]["message"]["content"]
+    async def _request_with_retries(
+        self,
+        client: "AsyncOpenAI",
+        messages: list,
+        rate_limiter: Optional[TokenBucket],
+        model: str,
+        temperature: float,
+        **kwargs,
+    ) -> tuple:
+        import openai
+
+        for attempt in range(self.max_retries + 1):
+            if rate_limiter is not None:
+                await rate_limiter.acquire()
+
+            start = time.perf_counter()
+            try:
+                with profiler.span("openai.chat", "api", model=model, attempt=attempt):
+                    response = await client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                        **kwargs,
+                    )
+            except (openai.RateLimitError, openai.InternalServerError) as e:
+                if attempt == self.max_retries:
+                    raise
+                retry_after = parse_retry_after(e.response.headers.get("retry-after"))
+                await asyncio.sleep(backoff_delay(attempt, retry_after=retry_after))
+            except openai.APIConnectionError:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt))
+            else:
+                latency = time.perf_counter() - start
+                content = response.model_dump()["choices"][0]["message"]["content"]
+                if content and content.strip():
+                    return content, latency, attempt
+                # Mensagem vazia (ex.: recusa ou filtro de conteúdo): tratada como um erro transitório
+                if attempt == self.max_retries:
+                    raise EmptyResponseError(
+                        f"The OpenAI API returned an empty message after {attempt} retries."
+                    )
+                await asyncio.sleep(backoff_delay(attempt))
 
-    def translate_chunks(self) -> dict:
+    async def translate_texts_async(self, texts: list) -> list:
+        """
+        Translates texts concurrently using the OpenAI translation model.
+
+        At most `self.concurrency` requests are in flight, throttled by a token bucket of
+        `self.requests_per_minute`. The translations keep the order of the source texts.
+
+        Args:
+            texts (list): The source texts to be translated.
+
+        Returns:
+            list: The translated texts.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        rate_limiter = (
+            TokenBucket(self.requests_per_minute / 60)
+            if self.requests_per_minute
+            else None
+        )
+
+        async def translate(client, text):
+            async with semaphore:
+                return await self.translate_with_openai_async(
+                    client, text, rate_limiter
+                )
+
+        start = time.perf_counter()
+        async with self._async_openai_client() as client:
+            results = await asyncio.gather(*[translate(client, t) for t in texts])
+        wall_time = time.perf_counter() - start
+        self._update_request_stats(results, wall_time)
+
+        return [text for text, _, _ in results]
+
+    def _update_request_stats(self, results: list, wall_time: float) -> None:
+        latencies = np.array([latency for _, latency, _ in results])
+        self.stats.update(
+            requests=len(results),
+            retries=sum(retries for _, _, retries in results),
+            wall_time=wall_time,
+            throughput=len(results) / wall_time if wall_time > 0 else 0.0,
+            latency_mean=float(latencies.mean()) if len(latencies) else 0.0,
+            latency_p50=float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            latency_p95=float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+        )
+
+    async def translate_window_async(
+        self,
+        client: "AsyncOpenAI",
+        chunks: Dict[str, str],
+        context: List[str],
+        rate_limiter: Optional[TokenBucket] = None,
+        model: Optional[str] = None,
+        system_prompt: str = OPENAI_PACKED_SYSTEM_PROMPT,
+        temperature: float = OPENAI_TEMPERATURE,
+    ) -> tuple:
+        """
+        Translates a window of consecutive chunks in a single OpenAI request, with a JSON-schema response.
+
+        Args:
+            client (AsyncOpenAI): The async OpenAI client.
+            chunks (Dict[str, str]): The source texts of the window, keyed by id.
+            context (List[str]): The source texts of the chunks that precede the window.
+            rate_limiter (TokenBucket, optional): The rate limiter shared by the concurrent requests. Defaults to None.
+            model (str, optional): The OpenAI translation model to use (with structured outputs). Defaults to None (`self.packed_model`).
+            system_prompt (str, optional): The system prompt for the packed translation. Defaults to the system prompt provided.
+            temperature (float, optional): The temperature for the translation. Defaults to 0.2.
+
+        Returns:
+            tuple: The valid translations (keyed by id; missing, unknown, duplicated or empty entries are left out),
+                the latency of the successful request (in seconds) and the number of retries.
+        """
+        payload = dict(
+            context=context,
+            chunks=[dict(id=id_, text=text) for id_, text in chunks.items()],
+        )
+        try:
+            content, latency, attempt = await self._request_with_retries(
+                client,
+                [
+                    {"role": "system", "content": system_prompt},
+                    {
+                        "role": "user",
+                        "content": json.dumps(payload, ensure_ascii=False),
+                    },
+                ],
+                rate_limiter,
+                model or self.packed_model,
+                temperature,
+                response_format=OPENAI_PACKED_RESPONSE_FORMAT,
+            )
+        except EmptyResponseError:
+            # Os chunks da janela são pedidos de novo (e, se preciso, um a um)
+            return {}, 0.0, self.max_retries
+
+        try:
+            entries = json.loads(content)["translations"]
+        except (TypeError, ValueError, KeyError):
+            return {}, latency, attempt
+
+        translations = {}
+        seen = set()
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            id_, text = entry.get("id"), entry.get("text")
+            if id_ in seen:
+                # Id repetido: não há como saber qual das traduções é a certa
+                translations.pop(id_, None)
+                continue
+            seen.add(id_)
+            if id_ in chunks and isinstance(text, str) and text.strip():
+                translations[id_] = text
+
+        return translations, latency, attempt
+
+    async def translate_texts_packed_async(
+        self, texts: list, context: Optional[List[str]] = None
+    ) -> list:
+        """
+        Translates texts in packed OpenAI requests: windows of consecutive chunks sized to `self.pack_max_tokens`.
+
+        Each window is sent with the `self.context_chunks` source chunks that precede it. The
+        chunks missing from a response (or malformed) are re-requested once, packed again; the
+        chunks still missing are translated one by one with the single-chunk prompt. At most
+        `self.concurrency` requests are in flight, throttled by `self.requests_per_minute`.
+
+        Args:
+            texts (list): The source texts to be translated.
+            context (List[str], optional): The source texts that precede `texts`, sent as context of the first window.
+                Defaults to None (no context).
+
+        Returns:
+            list: The translated texts, in the same order.
+        """
+        context = self._preceding_context(context)
+        translated_texts, _ = await self._translate_packed_async(
+            context + list(texts),
+            list(range(len(context), len(context) + len(texts))),
+        )
+        return translated_texts[len(context) :]
+
+    def _preceding_context(self, context: Optional[List[str]]) -> List[str]:
+        # Apenas os últimos `context_chunks` textos chegam a ser enviados
+        if not context or not self.context_chunks:
+            return []
+        return list(context[-self.context_chunks :])
+
+    def _pack_pending(self, texts: list, pending: List[int]) -> List[List[int]]:
+        # Uma janela só junta chunks consecutivos no texto original
+        runs = []
+        for i in pending:
+            if runs and i == runs[-1][-1] + 1:
+                runs[-1].append(i)
+            else:
+                runs.append([i])
+        return [
+            [run[j] for j in window]
+            for run in runs
+            for window in pack_windows(
+                [texts[i] for i in run], self.pack_max_tokens, self.pack_max_chunks
+            )
+        ]
+
+    async def _translate_packed_async(
+        self, texts: list, indexes: List[int]
+    ) -> Tuple[list, List[int]]:
+        """
+        Translates some of the texts in packed requests, with the other texts as context only.
+
+        Args:
+            texts (list): Every source text, in order.
+            indexes (List[int]): The sorted indexes of the texts to translate.
+
+        Returns:
+            Tuple[list, List[int]]: The translated texts (None for the texts not in `indexes`), and the indexes of the
+                texts translated with the single-chunk prompt.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        rate_limiter = (
+            TokenBucket(self.requests_per_minute / 60)
+            if self.requests_per_minute
+            else None
+        )
+        translated_texts = [None] * len(texts)
+
+        async def translate_window(client, window):
+            context = texts[max(0, window[0] - self.context_chunks) : window[0]]
+            async with semaphore:
+                translations, latency, retries = await self.translate_window_async(
+                    client, {str(i): texts[i] for i in window}, context, rate_limiter
+                )
+            for id_, text in translations.items():
+                translated_texts[int(id_)] = text
+            return None, latency, retries
+
+        async def translate(client, i):
+            async with semaphore:
+                text, latency, retries = await self.translate_with_openai_async(
+                    client, texts[i], rate_limiter
+                )
+            translated_texts[i] = text
+            return text, latency, retries
+
+        start = time.perf_counter()
+        results = []
+        async with self._async_openai_client() as client:
+            pending = list(indexes)
+            # Primeira rodada e uma nova tentativa, apenas com os chunks ausentes ou inválidos
+            for round_ in range(2):
+                results += await asyncio.gather(
+                    *[
+                        translate_window(client, window)
+                        for window in self._pack_pending(texts, pending)
+                    ]
+                )
+                pending = [i for i in pending if translated_texts[i] is None]
+                if round_ == 0:
+                    self.stats["rerequested"] = len(pending)
+                if not pending:
+                    break
+
+            self.stats["fallbacks"] = len(pending)
+            results += await asyncio.gather(*[translate(client, i) for i in pending])
+        self._update_request_stats(results, time.perf_counter() - start)
+
+        return translated_texts, pending
+
+    def translate_texts(self, texts: list, context: Optional[List[str]] = None) -> list:
+        """
+        Translates texts using the selected translator.
+
+        Args:
+            texts (list): The source texts to be translated.
+            context (List[str], optional): The source texts that precede `texts`, used as context by the packed
+                OpenAI requests. Defaults to None (no context).
+
+        Returns:
+            list: The translated texts, in the same order.
+        """
+        if not texts:
+            return []
+
+        if self.translator == "nllb":
+            return self.translate_batch_with_nllb(texts)
+        elif self.translator == "openai":
+            if self.packed:
+                return asyncio.run(self.translate_texts_packed_async(texts, context))
+            # Com concurrency = 1, as requisições são feitas uma a uma, com os mesmos retries
+            return asyncio.run(self.translate_texts_async(texts))
+        else:
+            raise ValueError(
+                "Invalid translator. Please choose either 'nllb' or 'openai'."
+            )
+
+    def _cache_key(self, text: str, packed: Optional[bool] = None) -> str:
+        if self.translator == "nllb":
+            return self.cache.make_translation_key(
+                text,
+                "nllb",
+                NLLB_MODEL,
+                None,
+                None,
+                NLLB_TGT_LANG,
+                runtime=self.backend,
+                precision="int8" if self.quantize else "float32",
+            )
+        if self.packed if packed is None else packed:
+            # O modo packed usa outro prompt (e, se configurado, outro modelo)
+            return self.cache.make_translation_key(
+                text,
+                "openai-packed",
+                self.packed_model,
+                OPENAI_PACKED_SYSTEM_PROMPT,
+                OPENAI_TEMPERATURE,
+                "en",
+            )
+        return self.cache.make_translation_key(
+            text,
+            "openai",
+            OPENAI_MODEL,
+            OPENAI_SYSTEM_PROMPT,
+            OPENAI_TEMPERATURE,
+            "en",
+        )
+
+    def _translate_missing_packed(self, texts: list, missing: Dict[str, int]) -> dict:
+        """
+        Translates the chunks missing from the cache in packed requests, and caches the translations.
+
+        The windows and their context are built from every chunk, so a chunk found in the cache
+        still gives context to the next ones. A translation made with the single-chunk prompt
+        (fallback) is cached under the single-chunk key, where the next runs also look for it.
+
+        Args:
+            texts (list): Every source text, in order.
+            missing (Dict[str, int]): The index of the first occurrence of each missing cache key.
+
+        Returns:
+            dict: The translations, keyed by the (packed) cache keys of `missing`.
+        """
+        single_keys = {
+            key: self._cache_key(texts[i], packed=False) for key, i in missing.items()
+        }
+        found = self.cache.get_translations(list(single_keys.values()))
+        translations = {
+            key: found[single_key]
+            for key, single_key in single_keys.items()
+            if single_key in found
+        }
+        missing = {key: i for key, i in missing.items() if key not in translations}
+        if not missing:
+            return translations
+
+        packed_texts, fallbacks = asyncio.run(
+            self._translate_packed_async(texts, sorted(missing.values()))
+        )
+        fallbacks = set(fallbacks)
+        self.cache.put_translations(
+            (self._cache_key(texts[i], packed=i not in fallbacks), packed_texts[i])
+            for i in missing.values()
+        )
+        translations.update({key: packed_texts[i] for key, i in missing.items()})
+        return translations
+
+    def translate_chunks(
+        self, chunks: Optional[list] = None, context: Optional[List[str]] = None
+    ) -> dict:
         """
         Translates chunks of text using the selected translator.
 
+        Chunks found in the persistent cache are not translated again, and repeated texts
+        are translated only once.
+
+        Args:
+            chunks (list, optional): The chunks to translate. Defaults to None (the chunks loaded from `data_with_timestamps_path`).
+            context (List[str], optional): The source texts of the chunks that precede `chunks` (e.g. the previous batch of
+                a stream), used as context by the packed OpenAI requests, as if every chunk were translated at once.
+                Defaults to None (no context).
+
         Returns:
             dict: The translated data.
         """
-        translated_chunks = []
-        for chunk in self.data_with_timesamps["chunks"]:
-            text = chunk["text"]
+        if chunks is None:
+            chunks = self.data_with_timesamps["chunks"]
+        texts = [chunk["text"] for chunk in chunks]
 
-            if self.translator == "nllb":
-                translated_text = self.translate_with_nllb(text)
-            elif self.translator == "openai":
-                translated_text = self.translate_with_openai(text)
+        if self.cache is None:
+            translated_texts = self.translate_texts(texts, context)
+        else:
+            keys = [self._cache_key(text) for text in texts]
+            translations = self.cache.get_translations(keys)
+
+            # Índice da primeira ocorrência de cada texto ausente do cache
+            missing = {}
+            for i, key in enumerate(keys):
+                if key not in translations:
+                    missing.setdefault(key, i)
+
+            if self.translator == "openai" and self.packed:
+                # O contexto entra antes dos textos, apenas como contexto das janelas
+                context = self._preceding_context(context)
+                new_translations = self._translate_missing_packed(
+                    context + texts,
+                    {key: i + len(context) for key, i in missing.items()},
+                )
             else:
-                raise ValueError(
-                    "Invalid translator. Please choose either 'nllb' or 'openai'."
+                new_translations = dict(
+                    zip(
+                        missing,
+                        self.translate_texts([texts[i] for i in missing.values()]),
+                    )
                 )
+                self.cache.put_translations(new_translations.items())
+            translations.update(new_translations)
 
-            translated_chunk = dict(timestamp=chunk["timestamp"], text=translated_text)
-            translated_chunks.append(translated_chunk)
+            translated_texts = [translations[key] for key in keys]
+            self.stats.update(
+                {f"cache_{name}": value for name, value in self.cache.stats().items()}
+            )
 
+        return self.build_translated_data(
+            [
+                dict(timestamp=chunk["timestamp"], text=text)
+                for chunk, text in zip(chunks, translated_texts)
+            ]
+        )
+
+    def build_translated_data(self, translated_chunks: list) -> dict:
+        """
+        Builds the translated data from the translated chunks.
+
+        Args:
+            translated_chunks (list): The translated chunks, with their timestamps.
+
+        Returns:
+            dict: The translated data, with the concatenated text.
+        """
         concatenated_text = ""
 
         for chunk in translated_chunks:
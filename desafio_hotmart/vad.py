@@ -0,0 +1,153 @@
+from typing import Iterable, Iterator, Tuple
+
+import numpy as np
+
+
+class EnergyVAD:
+    """
+    An offline, energy-based voice activity detector that splits streamed audio into speech segments.
+
+    Each frame is speech when its RMS level is above `threshold_db` (dBFS). A segment starts at
+    the first speech frame and ends after `min_silence_ms` of silence; segments longer than
+    `max_segment_seconds` (Whisper decodes at most 30 s at once) are cut at their quietest
+    frame. Only the current segment is kept in memory, so the audio can be arbitrarily long.
+
+    Args:
+        sample_rate (int, optional): The sample rate of the audio. Defaults to 16000.
+        frame_ms (int, optional): The length of the analysis frames in milliseconds. Defaults to 30.
+        threshold_db (float, optional): The RMS level (dBFS) above which a frame is speech. Defaults to -40.
+        min_silence_ms (int, optional): The silence that closes a segment, in milliseconds. Defaults to 500.
+        min_speech_ms (int, optional): Segments with less speech than this are dropped, in milliseconds. Defaults to 250.
+        speech_pad_ms (int, optional): The audio kept before and after the speech of each segment, in milliseconds. Defaults to 200.
+        max_segment_seconds (float, optional): The maximum length of a segment, padding included. Defaults to 29.
+
+    Methods:
+        frame_levels(samples: np.ndarray) -> np.ndarray:
+            Compute the RMS level (dBFS) of each complete frame.
+
+        segments(blocks: Iterable[np.ndarray]) -> Iterator[Tuple[float, np.ndarray]]:
+            Split streamed audio blocks into speech segments with their absolute start time.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        threshold_db: float = -40,
+        min_silence_ms: int = 500,
+        min_speech_ms: int = 250,
+        speech_pad_ms: int = 200,
+        max_segment_seconds: float = 29,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_size = int(sample_rate * frame_ms / 1000)
+        self.threshold_db = threshold_db
+        self.min_silence_frames = max(1, round(min_silence_ms / frame_ms))
+        self.min_speech_frames = max(1, round(min_speech_ms / frame_ms))
+        self.pad = int(sample_rate * speech_pad_ms / 1000)
+        # O padding das duas pontas também conta para o limite do segmento
+        self.max_segment_frames = max(
+            1,
+            int((max_segment_seconds * sample_rate - 2 * self.pad) // self.frame_size),
+        )
+
+    def frame_levels(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Compute the RMS level (dBFS) of each complete frame.
+
+        Args:
+            samples (np.ndarray): The mono float samples.
+
+        Returns:
+            np.ndarray: One level per frame; incomplete trailing samples are ignored.
+        """
+        n_frames = len(samples) // self.frame_size
+        if n_frames == 0:
+            # reshape(0, -1) falha em arrays vazios
+            return np.zeros(0)
+        frames = samples[: n_frames * self.frame_size].reshape(n_frames, -1)
+        power = np.mean(np.square(frames, dtype=np.float64), axis=1)
+        return 10 * np.log10(power + 1e-12)
+
+    def segments(
+        self, blocks: Iterable[np.ndarray]
+    ) -> Iterator[Tuple[float, np.ndarray]]:
+        """
+        Split streamed audio blocks into speech segments.
+
+        Args:
+            blocks (Iterable[np.ndarray]): Consecutive blocks of mono float32 samples, of any length.
+
+        Yields:
+            Tuple[float, np.ndarray]: The absolute start time (in seconds) and the samples of each segment, in order.
+        """
+        frame_size = self.frame_size
+        # Amostras ainda necessárias, a partir da amostra absoluta `buffer_start`
+        buffer = np.zeros(0, dtype=np.float32)
+        buffer_start = 0
+        frame = 0
+        emitted_until = 0
+
+        segment_start = None
+        last_speech = None
+        levels = []
+
+        def emit(start_frame, end_frame, pad_end=True):
+            start = max(start_frame * frame_size - self.pad, emitted_until, 0)
+            end = end_frame * frame_size + (self.pad if pad_end else 0)
+            end = min(end, buffer_start + len(buffer))
+            return start, end, buffer[start - buffer_start : end - buffer_start].copy()
+
+        for block in blocks:
+            buffer = np.concatenate((buffer, np.asarray(block, dtype=np.float32)))
+            # Frames completos ainda não analisados
+            first = frame * frame_size - buffer_start
+            block_levels = self.frame_levels(buffer[first:])
+
+            for level in block_levels:
+                is_speech = level > self.threshold_db
+                if segment_start is None:
+                    if is_speech:
+                        segment_start, last_speech, levels = frame, frame, [level]
+                else:
+                    levels.append(level)
+                    if is_speech:
+                        last_speech = frame
+
+                    if frame - last_speech >= self.min_silence_frames:
+                        if last_speech - segment_start + 1 >= self.min_speech_frames:
+                            start, emitted_until, samples = emit(
+                                segment_start, last_speech + 1
+                            )
+                            yield start / self.sample_rate, samples
+                        segment_start = None
+                    elif frame + 1 - segment_start >= self.max_segment_frames:
+                        # Segmento longo demais: corta no frame mais silencioso da metade final
+                        half = len(levels) // 2
+                        cut = segment_start + half + int(np.argmin(levels[half:])) + 1
+                        start, emitted_until, samples = emit(
+                            segment_start, cut, pad_end=False
+                        )
+                        yield start / self.sample_rate, samples
+                        levels = levels[cut - segment_start :]
+                        segment_start = cut
+                        if last_speech < cut:
+                            last_speech = cut
+                frame += 1
+
+            # Descarta as amostras que não serão mais usadas
+            keep_from = (
+                frame * frame_size - self.pad
+                if segment_start is None
+                else segment_start * frame_size - self.pad
+            )
+            keep_from = max(keep_from, emitted_until, buffer_start)
+            buffer = buffer[keep_from - buffer_start :]
+            buffer_start = keep_from
+
+        if (
+            segment_start is not None
+            and last_speech - segment_start + 1 >= self.min_speech_frames
+        ):
+            start, emitted_until, samples = emit(segment_start, last_speech + 1)
+            yield start / self.sample_rate, samples
@@ -1,4 +1,12 @@
-from moviepy.editor import AudioFileClip, VideoFileClip
+import os
+import re
+import subprocess
+from typing import Iterator, List, Literal, Optional, Union
+
+import numpy as np
+from imageio_ffmpeg import get_ffmpeg_exe
+
+from desafio_hotmart.profiling import profiler
 
 
 def video_to_audio(
@@ -16,6 +24,9 @@ def video_to_audio(
         subclip_start_seconds (int, optional): The start time of the subclip in seconds. Defaults to 0.
         subclip_end_seconds (int, optional): The end time of the subclip in seconds. Defaults to 245.
     """
+    # O moviepy só é importado pelos caminhos que o usam (ver desafio_hotmart.backends)
+    from moviepy.editor import VideoFileClip
+
     clip = VideoFileClip(video_path)
     sample_clip = clip.subclip(subclip_start_seconds, subclip_end_seconds)
     audio = sample_clip.audio
@@ -23,27 +34,355 @@ def video_to_audio(
     clip.close()
 
 
+def run_ffmpeg(args: List[str]) -> str:
+    """
+    Run ffmpeg (the binary bundled with imageio-ffmpeg, also used by moviepy).
+
+    Args:
+        args (List[str]): The ffmpeg arguments.
+
+    Returns:
+        str: The log written by ffmpeg to stderr.
+
+    Raises:
+        RuntimeError: If ffmpeg fails.
+    """
+    with profiler.span("ffmpeg", "subprocess", command=args[-1]):
+        result = subprocess.run(
+            [get_ffmpeg_exe(), "-hide_banner", "-nostdin", "-y", *args],
+            capture_output=True,
+            text=True,
+        )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed:\n{result.stderr[-2000:]}")
+    return result.stderr
+
+
+def extract_audio(
+    video_path: str,
+    asr_audio_path: Optional[str] = None,
+    speaker_audio_path: Optional[str] = None,
+    subclip_start_seconds: float = 0,
+    subclip_end_seconds: float = 245,
+    asr_sample_rate: int = 16000,
+) -> np.ndarray:
+    """
+    Extract the audio of a video with a single decode of the audio stream (video frames are never decoded).
+
+    The decoded audio feeds two outputs at once: 16 kHz mono float32 samples for the ASR,
+    and optionally a lossless .wav at the native sample rate, used as the speaker reference
+    for voice cloning.
+
+    Args:
+        video_path (str): The path to the video file.
+        asr_audio_path (str, optional): Where to write the raw float32 samples for the ASR. The samples are then
+            returned memory-mapped from this file. Defaults to None (kept in memory).
+        speaker_audio_path (str, optional): Where to write the .wav at the native sample rate. Defaults to None (not written).
+        subclip_start_seconds (float, optional): The start time of the subclip in seconds. Defaults to 0.
+        subclip_end_seconds (float, optional): The end time of the subclip in seconds. Defaults to 245.
+        asr_sample_rate (int, optional): The sample rate of the ASR samples. Defaults to 16000.
+
+    Returns:
+        np.ndarray: The mono float32 samples at `asr_sample_rate` (a read-only memory map if `asr_audio_path` is given).
+
+    Raises:
+        RuntimeError: If ffmpeg fails.
+    """
+    for path in (asr_audio_path, speaker_audio_path):
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    args = [
+        get_ffmpeg_exe(),
+        "-hide_banner",
+        "-nostdin",
+        "-y",
+        "-ss",
+        str(subclip_start_seconds),
+        "-to",
+        str(subclip_end_seconds),
+        "-i",
+        video_path,
+        "-map",
+        "0:a:0",
+        "-ac",
+        "1",
+        "-ar",
+        str(asr_sample_rate),
+        "-f",
+        "f32le",
+        asr_audio_path or "pipe:1",
+    ]
+    if speaker_audio_path:
+        args += ["-map", "0:a:0", "-c:a", "pcm_s16le", speaker_audio_path]
+
+    with profiler.span("ffmpeg.extract_audio", "subprocess"):
+        result = subprocess.run(args, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed:\n{result.stderr.decode()[-2000:]}")
+
+    if asr_audio_path:
+        return load_raw_audio(asr_audio_path)
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def load_raw_audio(path: str) -> np.ndarray:
+    """
+    Memory-map raw mono float32 samples written by `extract_audio`.
+
+    Args:
+        path (str): The path of the raw samples.
+
+    Returns:
+        np.ndarray: The read-only memory-mapped samples.
+    """
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=np.float32)
+    return np.memmap(path, dtype=np.float32, mode="r")
+
+
+def read_audio_blocks(
+    source: Union[str, np.ndarray],
+    sample_rate: int = 16000,
+    block_seconds: float = 30,
+) -> Iterator[np.ndarray]:
+    """
+    Read mono float32 audio in fixed-size blocks, so that only one block is in memory at a time.
+
+    Raw float32 files (.f32, written by `extract_audio`) and arrays are sliced directly; any
+    other audio or video file is decoded by ffmpeg and streamed through a pipe.
+
+    Args:
+        source (Union[str, np.ndarray]): The path of the audio (or video) file, or its mono float32 samples.
+        sample_rate (int, optional): The sample rate of the blocks. Raw samples must already be at this rate. Defaults to 16000.
+        block_seconds (float, optional): The length of each block in seconds. Defaults to 30.
+
+    Yields:
+        np.ndarray: The next block of samples (the last block may be shorter).
+
+    Raises:
+        RuntimeError: If ffmpeg fails.
+    """
+    block_size = int(block_seconds * sample_rate)
+
+    if isinstance(source, np.ndarray) or source.endswith(".f32"):
+        samples = source if isinstance(source, np.ndarray) else load_raw_audio(source)
+        for start in range(0, len(samples), block_size):
+            yield np.array(samples[start : start + block_size], dtype=np.float32)
+        return
+
+    process = subprocess.Popen(
+        [
+            get_ffmpeg_exe(),
+            "-hide_banner",
+            "-nostdin",
+            # Apenas erros no stderr, para que o pipe não encha em arquivos longos
+            "-loglevel",
+            "error",
+            "-i",
+            source,
+            "-map",
+            "0:a:0",
+            "-ac",
+            "1",
+            "-ar",
+            str(sample_rate),
+            "-f",
+            "f32le",
+            "pipe:1",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    finished = False
+    try:
+        # 4 bytes por amostra float32
+        while True:
+            data = process.stdout.read(block_size * 4)
+            if not data:
+                break
+            yield np.frombuffer(data[: len(data) // 4 * 4], dtype=np.float32)
+        finished = True
+    finally:
+        process.stdout.close()
+        if not finished:
+            # Gerador fechado antes do fim: o ffmpeg é encerrado
+            process.kill()
+        stderr = process.stderr.read()
+        process.stderr.close()
+        if process.wait() != 0 and finished:
+            raise RuntimeError(f"ffmpeg failed:\n{stderr.decode()[-2000:]}")
+
+
+def keyframe_times(
+    video_path: str, start_seconds: float = 0, duration_seconds: float = None
+) -> List[float]:
+    """
+    List the keyframe timestamps of the video stream, decoding only the keyframes.
+
+    Args:
+        video_path (str): The path to the video file.
+        start_seconds (float, optional): The start of the searched interval. Defaults to 0.
+        duration_seconds (float, optional): The length of the searched interval. Defaults to None (until the end).
+
+    Returns:
+        List[float]: The sorted keyframe timestamps, in seconds.
+    """
+    args = ["-skip_frame", "nokey", "-copyts"]
+    if start_seconds > 0:
+        args += ["-ss", str(start_seconds)]
+    if duration_seconds is not None:
+        args += ["-t", str(duration_seconds)]
+    args += ["-i", video_path, "-map", "0:v:0", "-vf", "showinfo", "-f", "null", "-"]
+
+    log = run_ffmpeg(args)
+    return sorted(float(t) for t in re.findall(r"pts_time:\s*([-\d.]+)", log))
+
+
+def previous_keyframe(
+    video_path: str, seconds: float, search_window_seconds: float = 30
+) -> float:
+    """
+    Find the last keyframe at or before the given time.
+
+    Args:
+        video_path (str): The path to the video file.
+        seconds (float): The time in seconds.
+        search_window_seconds (float, optional): How far back to look for a keyframe. Defaults to 30.
+
+    Returns:
+        float: The keyframe timestamp in seconds (0 if none is found).
+    """
+    if seconds <= 0:
+        return 0.0
+
+    window_start = max(0.0, seconds - search_window_seconds)
+    keyframes = keyframe_times(video_path, window_start, seconds - window_start + 0.001)
+    # Tolerância de 1 ms para arredondamentos do pts_time
+    candidates = [t for t in keyframes if t <= seconds + 0.001]
+    return candidates[-1] if candidates else 0.0
+
+
+def _replace_audio_reencode(
+    video_path: str,
+    audio_path: str,
+    output_video_path: str,
+    subclip_start_seconds: int,
+    subclip_end_seconds: int,
+    scratch_dir: Optional[str] = None,
+) -> None:
+    from moviepy.editor import AudioFileClip, VideoFileClip
+
+    clip = VideoFileClip(video_path)
+    sample_clip = clip.subclip(subclip_start_seconds, subclip_end_seconds)
+    new_audio = AudioFileClip(audio_path)
+    sample_clip = sample_clip.set_audio(new_audio)
+    # Por padrão, o moviepy grava o áudio temporário no diretório corrente, com um nome que depende apenas do nome do vídeo de saída
+    temp_audiofile = (
+        os.path.join(scratch_dir, "replace_audio_temp.mp3") if scratch_dir else None
+    )
+    sample_clip.write_videofile(output_video_path, temp_audiofile=temp_audiofile)
+    clip.close()
+    new_audio.close()
+
+
+def _replace_audio_copy(
+    video_path: str,
+    audio_path: str,
+    output_video_path: str,
+    subclip_start_seconds: float,
+    subclip_end_seconds: float,
+    audio_bitrate: str,
+    max_lead_in_seconds: float,
+) -> bool:
+    keyframe = previous_keyframe(video_path, subclip_start_seconds)
+    lead_in = subclip_start_seconds - keyframe
+    if lead_in > max_lead_in_seconds:
+        return False
+
+    # O vídeo copiado começa no keyframe; o áudio dublado é atrasado pelo mesmo intervalo para manter a sincronia
+    audio_filters = []
+    if lead_in > 0.001:
+        delay_ms = int(round(lead_in * 1000))
+        audio_filters = ["-af", f"adelay={delay_ms}:all=1"]
+
+    run_ffmpeg(
+        [
+            "-ss",
+            str(keyframe),
+            "-i",
+            video_path,
+            "-i",
+            audio_path,
+            "-map",
+            "0:v:0",
+            "-map",
+            "1:a:0",
+            "-t",
+            str(subclip_end_seconds - keyframe),
+            "-c:v",
+            "copy",
+            *audio_filters,
+            "-c:a",
+            "aac",
+            "-b:a",
+            audio_bitrate,
+            "-movflags",
+            "+faststart",
+            output_video_path,
+        ]
+    )
+    return True
+
+
 def replace_audio(
     video_path: str,
     audio_path: str,
     output_video_path: str,
     subclip_start_seconds: int = 0,
     subclip_end_seconds: int = 245,
+    method: Literal["copy", "reencode"] = "copy",
+    audio_bitrate: str = "192k",
+    max_lead_in_seconds: float = 1.0,
+    scratch_dir: Optional[str] = None,
 ) -> None:
     """
     Replace the audio of a video file with another audio file.
 
+    With `method="copy"`, the video stream is copied unchanged (no decoding or re-encoding of
+    frames) and only the new audio track is encoded. A stream copy can only start on a keyframe,
+    so the subclip starts at the last keyframe before `subclip_start_seconds` and the new audio
+    is delayed by the same lead-in. If that lead-in is longer than `max_lead_in_seconds`, the
+    video is re-encoded instead.
+
     Args:
         video_path (str): The path to the video file.
         audio_path (str): The path to the audio file.
         output_video_path (str): The path to save the video file with the new audio.
         subclip_start_seconds (int, optional): The start time of the subclip in seconds. Defaults to 0.
         subclip_end_seconds (int, optional): The end time of the subclip in seconds. Defaults to 245.
+        method (Literal["copy", "reencode"], optional): Stream-copy the video with ffmpeg, or re-encode it with moviepy. Defaults to "copy".
+        audio_bitrate (str, optional): The bitrate of the encoded AAC audio (copy method). Defaults to "192k".
+        max_lead_in_seconds (float, optional): The maximum lead-in accepted before falling back to re-encoding. Defaults to 1.
+        scratch_dir (str, optional): The directory of the temporary audio written when re-encoding. Defaults to None (moviepy's default,
+            in the current directory).
     """
-    clip = VideoFileClip(video_path)
-    sample_clip = clip.subclip(subclip_start_seconds, subclip_end_seconds)
-    new_audio = AudioFileClip(audio_path)
-    sample_clip = sample_clip.set_audio(new_audio)
-    sample_clip.write_videofile(output_video_path)
-    clip.close()
-    new_audio.close()
+    if method == "copy" and _replace_audio_copy(
+        video_path,
+        audio_path,
+        output_video_path,
+        subclip_start_seconds,
+        subclip_end_seconds,
+        audio_bitrate,
+        max_lead_in_seconds,
+    ):
+        return
+
+    _replace_audio_reencode(
+        video_path,
+        audio_path,
+        output_video_path,
+        subclip_start_seconds,
+        subclip_end_seconds,
+        scratch_dir,
+    )
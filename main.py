@@ -1,62 +1,199 @@
+import argparse
+import os
+import sys
+
 import yaml
 
-from desafio_hotmart.speech_to_text import ASR
-from desafio_hotmart.text_to_speech import TextToSpeech
-from desafio_hotmart.translate import Translator
-from desafio_hotmart.video_manipulation import replace_audio, video_to_audio
+from desafio_hotmart.backends import (
+    BACKENDS,
+    check_backends,
+    missing_modules,
+    selected_backends,
+)
+from desafio_hotmart.batch import BatchRunner, load_manifest
+from desafio_hotmart.pipeline import PipelineRunner
+from desafio_hotmart.profiling import profiler
+from desafio_hotmart.scratch import remove_stale_scratch
+from desafio_hotmart.stages import build_stages
+
+STAGE_COMMANDS = {
+    "extract": "Extract the audio of the video (ASR samples and speaker .wav).",
+    "transcribe": "Transcribe the extracted audio.",
+    "segment": "Re-segment the transcription into sentences.",
+    "translate": "Translate the transcription (or the sentence segments).",
+    "tts": "Synthesize the translation into the dubbed track.",
+    "dub": "Transcribe, translate and synthesize at once (streaming mode).",
+    "mux": "Replace the audio of the video with the dubbed track.",
+}
+COMMANDS = ["run", *STAGE_COMMANDS, "backends"]
 
-if __name__ == "__main__":
-    with open("params.yaml") as f:
-        config = yaml.safe_load(f)
 
-    # Convert video to audio
-    print("Converting video to audio...")
-    video_to_audio(
-        config["data"]["input"]["video"],
-        config["data"]["intermediate"]["original_audio"],
-        config["base"]["subclip_start_seconds"],
-        config["base"]["subclip_end_seconds"],
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the command-line parser: `run` (the whole pipeline, the default), one subcommand per stage, and `backends`.
+    """
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--config", default="params.yaml")
+    profile = argparse.ArgumentParser(add_help=False)
+    profile.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record a trace of the run and write a cProfile dump of each stage to profiling.output_dir.",
     )
 
-    # Transcribe the audio to text
-    print("Transcribing audio to text...")
-    asr = ASR(
-        config["data"]["intermediate"]["original_audio"],
-        config["data"]["output"]["transcribed_text_with_timestamps"],
-        config["data"]["output"]["transcribed_text"],
-        config["model"]["asr"],
+    parser = argparse.ArgumentParser(
+        description="Dub a video from Portuguese to English."
     )
-    transcription = asr.speech_to_text()
-    asr.export_transcription(transcription)
-
-    # Translate the transcription from Portuguese to English
-    print("Translating text...")
-    translator = Translator(
-        config["data"]["output"]["transcribed_text_with_timestamps"],
-        config["model"]["translator"],
-        config["data"]["output"]["translated_text_with_timestamps"],
-        config["data"]["output"]["translated_text"],
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    run = commands.add_parser(
+        "run",
+        parents=[common, profile],
+        help="Run every stage that is not up to date (the default command).",
+    )
+    run.add_argument(
+        "--force",
+        action="append",
+        default=[],
+        metavar="STAGE",
+        help="Run the stage even if it is up to date (extract, transcribe, segment, translate, tts, mux, dub in streaming mode, or all). Can be repeated.",
     )
-    translated_text = translator.translate_chunks()
-    translator.export_translation(translated_text)
-
-    # # Convert the translated text to speech
-    print("Converting text to speech...")
-    tts = TextToSpeech(
-        config["data"]["output"]["translated_text_with_timestamps"],
-        config["data"]["output"]["translated_audio"],
-        config["model"]["tts"],
-        config["data"]["intermediate"]["original_audio"],
+    run.add_argument(
+        "--manifest",
+        default=None,
+        help="Dub every video listed in the manifest (one path per line, or a YAML/JSON list) instead of data.input.video.",
     )
-    translated_audio = tts.convert_chunks_to_speech()
-    tts.export_audio(translated_audio, False)
-
-    # Replace the audio of the video with the translated audio
-    print("Replacing audio in video...")
-    replace_audio(
-        config["data"]["input"]["video"],
-        config["data"]["output"]["translated_audio"],
-        config["data"]["output"]["voice_over_video"],
-        config["base"]["subclip_start_seconds"],
-        config["base"]["subclip_end_seconds"],
+
+    for name, help_text in STAGE_COMMANDS.items():
+        stage = commands.add_parser(
+            name,
+            parents=[common, profile],
+            help=help_text,
+            description=f"{help_text} The outputs of the previous stages must exist.",
+        )
+        stage.add_argument(
+            "--force", action="store_true", help="Run even if it is up to date."
+        )
+
+    commands.add_parser(
+        "backends",
+        parents=[common],
+        help="List the backends, whether their libraries are installed and the ones selected in the config.",
     )
+    return parser
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    # Sem subcomando (ex.: python main.py --force translate), roda o pipeline inteiro, como antes
+    if not argv or argv[0] not in COMMANDS + ["-h", "--help"]:
+        argv = ["run", *argv]
+    return build_parser().parse_args(argv)
+
+
+def load_config(args: argparse.Namespace) -> dict:
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+
+    profiling = config["profiling"]
+    if getattr(args, "profile", False):
+        profiling.update(enabled=True, cprofile=True)
+    profiler.enabled = profiling["enabled"]
+    return config
+
+
+def run_pipeline(config: dict, args: argparse.Namespace) -> None:
+    profiling = config["profiling"]
+    # Remove os arquivos temporários de jobs interrompidos
+    remove_stale_scratch(config["scratch"]["root"])
+
+    if args.manifest:
+        check_backends(config)
+        batch = BatchRunner(
+            load_manifest(args.manifest),
+            config,
+            config["batch"]["output_root"],
+            cpu_workers=config["batch"]["cpu_workers"],
+            model_workers=config["batch"]["model_workers"],
+        )
+        results = batch.run(force=args.force)
+        batch.export_results(config["batch"]["results_path"])
+        failed = [
+            video for video, result in results.items() if result["status"] != "done"
+        ]
+        if failed:
+            raise SystemExit(
+                f"{len(failed)} of {len(results)} video(s) failed: {failed}"
+            )
+    else:
+        stages = build_stages(config)
+        check_backends(config, [stage.name for stage in stages])
+        runner = PipelineRunner(
+            stages,
+            config,
+            config["pipeline"]["state_path"],
+            profile_dir=profiling["output_dir"] if profiling["cprofile"] else None,
+        )
+        try:
+            runner.run(force=args.force)
+        finally:
+            if profiler.enabled:
+                profiler.export(os.path.join(profiling["output_dir"], "trace.json"))
+
+
+def run_single_stage(config: dict, args: argparse.Namespace) -> None:
+    profiling = config["profiling"]
+    stages = {stage.name: stage for stage in build_stages(config)}
+    stage = stages.get(args.command)
+    if stage is None:
+        raise SystemExit(
+            f"The stage {args.command} is not part of the pipeline with this config "
+            f"(stages: {list(stages)}; see pipeline.mode and segmentation.enabled)."
+        )
+    missing = [path for path in stage.inputs if not os.path.isfile(path)]
+    if missing:
+        raise SystemExit(
+            f"Missing input(s) of {stage.name}: {missing}. Run the previous stages first."
+        )
+    check_backends(config, [stage.name])
+
+    remove_stale_scratch(config["scratch"]["root"])
+    runner = PipelineRunner(
+        list(stages.values()),
+        config,
+        config["pipeline"]["state_path"],
+        profile_dir=profiling["output_dir"] if profiling["cprofile"] else None,
+    )
+    try:
+        runner.run_stage(stage.name, force=args.force)
+    finally:
+        if profiler.enabled:
+            profiler.export(
+                os.path.join(profiling["output_dir"], f"trace_{stage.name}.json")
+            )
+
+
+def list_backends(config: dict) -> None:
+    selected = selected_backends(config)
+    for kind, backends in BACKENDS.items():
+        for name in backends:
+            missing = missing_modules(kind, name)
+            print(
+                f"{'*' if selected[kind] == name else ' '} {kind:<11}{name:<16}"
+                + (f"missing {', '.join(missing)}" if missing else "installed")
+            )
+
+
+def main(argv: list = None) -> None:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    config = load_config(args)
+
+    if args.command == "run":
+        run_pipeline(config, args)
+    elif args.command == "backends":
+        list_backends(config)
+    else:
+        run_single_stage(config, args)
+
+
+if __name__ == "__main__":
+    main()
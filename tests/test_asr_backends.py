@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from desafio_hotmart.asr_backends import (
+    ASRBackend,
+    FasterWhisperBackend,
+    get_asr_backend,
+)
+
+
+def test_the_base_backend_is_abstract():
+    with pytest.raises(TypeError):
+        ASRBackend("openai/whisper-tiny")
+
+
+def test_the_compute_type_is_validated_per_backend():
+    assert get_asr_backend("faster-whisper", "tiny", compute_type="int8")
+    assert get_asr_backend("transformers", "tiny", compute_type="bfloat16")
+
+    with pytest.raises(ValueError, match="compute_type"):
+        get_asr_backend("transformers", "tiny", compute_type="int8")
+    with pytest.raises(ValueError, match="compute_type"):
+        get_asr_backend("faster-whisper", "tiny", compute_type="float64")
+
+
+def test_faster_whisper_detects_the_device_without_torch(monkeypatch):
+    ctranslate2 = pytest.importorskip("ctranslate2")
+    faster_whisper = pytest.importorskip("faster_whisper")
+    loaded = []
+    monkeypatch.setattr(ctranslate2, "get_cuda_device_count", lambda: 0)
+    monkeypatch.setattr(
+        faster_whisper, "WhisperModel", lambda *args, **kwargs: loaded.append(kwargs)
+    )
+
+    FasterWhisperBackend("test-device-detection").get_model()
+
+    assert loaded[0]["device"] == "cpu"
+    assert loaded[0]["compute_type"] == "int8"
+
+
+def test_faster_whisper_batches_the_segments(monkeypatch):
+    faster_whisper = pytest.importorskip("faster_whisper")
+    calls = []
+
+    class FakePipeline:
+        def __init__(self, model):
+            pass
+
+        def transcribe(self, audio, **kwargs):
+            calls.append(dict(kwargs, samples=len(audio)))
+            # Dois trechos por clip, com timestamps no tempo do áudio concatenado
+            segments = []
+            for i, clip in enumerate(kwargs["clip_timestamps"]):
+                middle = (clip["start"] + clip["end"]) / 2
+                segments += [
+                    SimpleNamespace(start=clip["start"], end=middle, text=f" a{i}"),
+                    SimpleNamespace(start=middle, end=clip["end"], text=f" b{i}"),
+                ]
+            return iter(segments), None
+
+    monkeypatch.setattr(faster_whisper, "BatchedInferencePipeline", FakePipeline)
+    backend = FasterWhisperBackend("tiny", batch_size=2)
+    monkeypatch.setattr(backend, "get_model", lambda: None)
+
+    segments = [np.zeros(16000 * n, dtype=np.float32) for n in (2, 4, 1)]
+    outputs = backend.transcribe_batch(segments, 16000, "portuguese")
+
+    assert len(calls) == 1
+    assert calls[0]["batch_size"] == 2
+    assert calls[0]["language"] == "pt"
+    assert calls[0]["samples"] == 7 * 16000
+    assert [output["text"] for output in outputs] == [" a0 b0", " a1 b1", " a2 b2"]
+    # Timestamps relativos ao início de cada segmento
+    assert outputs[1]["chunks"][0]["timestamp"] == (0, 2)
+    assert outputs[1]["chunks"][1]["timestamp"] == (2, 4)
+    assert backend.transcribe_batch([], 16000, "portuguese") == []
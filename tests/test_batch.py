@@ -0,0 +1,77 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+import yaml
+
+from desafio_hotmart import batch
+from desafio_hotmart.batch import BatchRunner
+from desafio_hotmart.stages import build_stages
+
+
+@pytest.fixture
+def config():
+    with open("params.yaml") as f:
+        return yaml.safe_load(f)
+
+
+class FakePool:
+    """Runs the tasks in the test process; the first "transcribe" of a.mp4 kills the pool."""
+
+    created = []
+
+    def __init__(self, max_workers, mp_context=None, initializer=None, initargs=()):
+        self.initializer = initializer
+        self.initargs = initargs
+        self.broken = False
+        FakePool.created.append(self)
+
+    def submit(self, fn, config, name, force):
+        if self.broken:
+            raise BrokenProcessPool("pool is broken")
+        future = Future()
+        if name == "transcribe" and config["data"]["input"]["video"] == "a.mp4":
+            if not any(pool.broken for pool in FakePool.created):
+                self.broken = True
+                future.set_exception(BrokenProcessPool("worker died"))
+                return future
+        future.set_result(fn(config, name, force))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def test_a_broken_pool_is_replaced(config, monkeypatch, tmp_path):
+    FakePool.created = []
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", FakePool)
+    monkeypatch.setattr(batch, "_run_stage", lambda config, name, force: 1.0)
+
+    runner = BatchRunner(
+        [{"video": "a.mp4"}, {"video": "b.mp4"}], config, str(tmp_path)
+    )
+    results = runner.run()
+
+    assert results["a.mp4"]["status"] == "failed"
+    assert "BrokenProcessPool" in results["a.mp4"]["error"]
+    assert results["b.mp4"]["status"] == "done"
+    assert len(results["b.mp4"]["timings"]) == len(build_stages(config))
+    # Um pool de CPU, o de modelos quebrado e o que o substitui
+    assert len(FakePool.created) == 3
+
+
+def test_only_the_model_pool_imports_torch(config, monkeypatch, tmp_path):
+    FakePool.created = []
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", FakePool)
+    monkeypatch.setattr(batch, "_run_stage", lambda config, name, force: 1.0)
+    BatchRunner([{"video": "c.mp4"}], config, str(tmp_path)).run()
+    cpu, model = FakePool.created
+    assert cpu.initializer is None
+    assert model.initargs[0] >= 1
+
+    FakePool.created = []
+    config["model"]["translator"] = "openai"
+    config["model"]["tts"] = "google"
+    config["asr"]["backend"] = "faster-whisper"
+    BatchRunner([{"video": "c.mp4"}], config, str(tmp_path)).run()
+    assert FakePool.created[1].initargs == (None,)
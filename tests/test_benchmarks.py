@@ -0,0 +1,30 @@
+import json
+
+import pytest
+
+from benchmarks.run import BASELINE_PATH, BENCHMARKS, compare
+
+
+def record(**seconds):
+    return dict(results={name: dict(seconds=s) for name, s in seconds.items()})
+
+
+def test_compare_reports_regressions_past_the_threshold():
+    baseline = dict(record(mux=1.0, tts=1.0, load=1.0), thresholds=dict(tts=0.5))
+    comparison = compare(record(mux=1.3, tts=1.3, load=0.5, hls=2.0), baseline, 0.25)
+
+    assert comparison["mux"]["status"] == "regression"
+    assert comparison["mux"]["change"] == pytest.approx(0.3)
+    # Limite próprio da etapa no baseline
+    assert comparison["tts"]["status"] == "ok"
+    assert comparison["tts"]["threshold"] == 0.5
+    assert comparison["load"]["status"] == "faster"
+    assert comparison["hls"]["status"] == "new"
+
+
+def test_the_committed_baseline_has_a_threshold_per_stage():
+    with open(BASELINE_PATH) as f:
+        baseline = json.load(f)
+
+    assert set(baseline["thresholds"]) == set(BENCHMARKS)
+    assert set(baseline["results"]) <= set(BENCHMARKS)
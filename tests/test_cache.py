@@ -0,0 +1,84 @@
+import numpy as np
+
+from desafio_hotmart.cache import AudioCache, SQLiteCache, TranslationCache
+
+
+def test_put_and_get_many(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"))
+    cache.put_many([("a", b"1"), ("b", b"22")])
+
+    assert cache.get_many(["a", "b", "c"]) == {"a": b"1", "b": b"22"}
+    assert cache.get("c") is None
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+
+
+def test_entries_are_evicted_in_lru_order(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    # "a" passa a ser a entrada usada mais recentemente
+    cache.get("a")
+    cache.put("c", b"3")
+
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+
+
+def test_eviction_by_total_bytes(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), max_bytes=10)
+    cache.put("a", b"x" * 6)
+    cache.put("b", b"y" * 6)
+
+    assert cache.stats()["bytes"] <= 10
+    assert cache.get("b") == b"y" * 6
+
+
+def test_cache_persists_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = TranslationCache(path)
+    key = cache.make_translation_key("Olá", "openai", "gpt", None, 0.0, "English")
+    cache.put_translations([(key, "Hello")])
+    cache.close()
+
+    assert TranslationCache(path).get_translations([key]) == {key: "Hello"}
+
+
+def test_translation_key_depends_on_every_setting():
+    cache_key = TranslationCache.make_key
+    assert cache_key(text="a", model="m1") != cache_key(text="a", model="m2")
+    assert cache_key(text="a", model="m1") == cache_key(model="m1", text="a")
+
+
+def test_audio_round_trip_is_close_to_the_original(tmp_path):
+    cache = AudioCache(str(tmp_path / "audio.sqlite"))
+    wav = (0.5 * np.sin(np.linspace(0, 100, 24000))).astype(np.float32)
+    key = cache.make_audio_key("Hi", "coqui", "xtts", "en", "abc", 24000)
+    cache.put_audios([(key, wav)], 24000)
+
+    cached = cache.get_audios([key])[key]
+    assert cached.dtype == np.float32
+    np.testing.assert_allclose(cached, wav, atol=1e-4)
+
+
+def test_keys_depend_on_the_runtime_and_the_precision(tmp_path):
+    cache = TranslationCache(str(tmp_path / "translations.sqlite"))
+    keys = {
+        cache.make_translation_key(
+            "a", "nllb", "m", None, None, "eng", runtime=runtime, precision=precision
+        )
+        for runtime, precision in [
+            ("torch", "float32"),
+            ("onnx", "float32"),
+            ("onnx", "int8"),
+        ]
+    }
+    assert len(keys) == 3
+
+    audio_cache = AudioCache(str(tmp_path / "audio.sqlite"))
+    audio_keys = {
+        audio_cache.make_audio_key(
+            "a", "coqui", "xtts", "en", "h", 24000, runtime=runtime
+        )
+        for runtime in ("torch", "onnx")
+    }
+    assert len(audio_keys) == 2
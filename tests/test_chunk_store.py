@@ -0,0 +1,123 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from desafio_hotmart import chunk_store
+from desafio_hotmart.chunk_store import (
+    ChunkStore,
+    chunk_store_to_json,
+    is_chunk_store,
+    json_to_chunk_store,
+    load_chunks,
+)
+
+TRANSCRIPT = {
+    "text": " Olá mundo. Tudo bem?",
+    "chunks": [
+        {"timestamp": [0.0, 1.5], "text": " Olá mundo."},
+        {"timestamp": [2.0, None], "text": " Tudo bem?", "source": [1, 2]},
+    ],
+}
+
+
+def test_json_round_trip_is_lossless(tmp_path):
+    json_path = tmp_path / "transcription.json"
+    json_path.write_text(json.dumps(TRANSCRIPT))
+
+    store_path = json_to_chunk_store(str(json_path))
+
+    assert store_path.endswith(".chunks")
+    assert is_chunk_store(store_path)
+    assert not is_chunk_store(str(json_path))
+    assert chunk_store_to_json(store_path) == TRANSCRIPT
+
+
+def test_columns_and_lazy_texts(tmp_path):
+    store = ChunkStore(str(tmp_path / "t.chunks"), meta={"text": "x"})
+    store.append(TRANSCRIPT["chunks"])
+
+    np.testing.assert_array_equal(store.starts, [0.0, 2.0])
+    assert np.isnan(store.ends[1])
+    assert store.text(1) == " Tudo bem?"
+    assert store[1]["source"] == [1, 2]
+
+
+def test_append_keeps_the_previous_chunks(tmp_path):
+    path = str(tmp_path / "t.chunks")
+    store = ChunkStore(path)
+    store.append(TRANSCRIPT["chunks"][:1])
+    store.append(TRANSCRIPT["chunks"][1:])
+
+    assert list(ChunkStore(path)) == TRANSCRIPT["chunks"]
+
+
+def test_load_chunks_reads_both_formats(tmp_path):
+    json_path = tmp_path / "transcription.json"
+    json_path.write_text(json.dumps(TRANSCRIPT))
+    store_path = json_to_chunk_store(str(json_path))
+
+    assert load_chunks(str(json_path)) == TRANSCRIPT
+    data = load_chunks(store_path)
+    assert isinstance(data["chunks"], ChunkStore)
+    assert data["text"] == TRANSCRIPT["text"]
+
+
+class FailingFooter:
+    size = chunk_store.FOOTER.size
+
+    def pack(self, *args):
+        raise OSError("No space left on device")
+
+    def unpack(self, data):
+        return chunk_store.FOOTER.unpack(data)
+
+
+def test_an_interrupted_append_keeps_the_previous_store(tmp_path, monkeypatch):
+    path = str(tmp_path / "t.chunks")
+    store = ChunkStore(path)
+    store.append(TRANSCRIPT["chunks"][:1])
+
+    monkeypatch.setattr(chunk_store, "FOOTER", FailingFooter())
+    with pytest.raises(OSError):
+        store.append(TRANSCRIPT["chunks"][1:])
+    monkeypatch.undo()
+
+    assert list(ChunkStore(path)) == TRANSCRIPT["chunks"][:1]
+    assert os.listdir(tmp_path) == ["t.chunks"]
+
+
+def test_append_does_not_rewrite_the_stored_chunks(tmp_path):
+    path = str(tmp_path / "t.chunks")
+    store = ChunkStore(path)
+    store.append(TRANSCRIPT["chunks"][:1])
+    starts = store.starts
+    with open(path, "rb") as f:
+        before = f.read()
+
+    store.append(TRANSCRIPT["chunks"][1:])
+
+    with open(path, "rb") as f:
+        assert f.read(len(before)) == before
+    np.testing.assert_array_equal(starts, [0.0])
+    assert list(ChunkStore(path)) == TRANSCRIPT["chunks"]
+
+
+def test_an_append_after_an_interrupted_one_overwrites_the_torn_tail(
+    tmp_path, monkeypatch
+):
+    path = str(tmp_path / "t.chunks")
+    store = ChunkStore(path)
+    store.append(TRANSCRIPT["chunks"][:1])
+
+    monkeypatch.setattr(chunk_store, "FOOTER", FailingFooter())
+    with pytest.raises(OSError):
+        store.append([{"timestamp": [9.0, 9.5], "text": " Perdido."}])
+    monkeypatch.undo()
+
+    ChunkStore(path).append(TRANSCRIPT["chunks"][1:])
+
+    assert list(ChunkStore(path)) == TRANSCRIPT["chunks"]
+    with open(path, "rb") as f:
+        assert b"Perdido" not in f.read()
@@ -0,0 +1,25 @@
+from desafio_hotmart.hls import plan_segments
+
+
+def test_segments_start_on_keyframes_and_last_at_least_the_target():
+    keyframes = [0, 2, 4, 6, 8, 10, 12, 14]
+
+    assert plan_segments(keyframes, 0, 15, segment_seconds=4) == [0, 4, 8, 12, 15]
+
+
+def test_a_short_last_segment_is_merged_with_the_previous_one():
+    keyframes = [0, 4, 8]
+
+    assert plan_segments(keyframes, 0, 9, segment_seconds=4) == [0, 4, 9]
+
+
+def test_sparse_keyframes_give_longer_segments():
+    assert plan_segments([0, 10], 0, 20, segment_seconds=4) == [0, 10, 20]
+
+
+def test_the_first_segment_starts_at_the_keyframe_before_the_subclip():
+    assert plan_segments([1.5, 6, 12], 3, 13, segment_seconds=4) == [1.5, 6, 13]
+
+
+def test_keyframes_after_the_end_are_ignored():
+    assert plan_segments([0, 4, 8, 12], 0, 8, segment_seconds=4) == [0, 4, 8]
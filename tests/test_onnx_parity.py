@@ -0,0 +1,62 @@
+"""
+Parity of the ONNX Runtime backends with PyTorch (see `benchmarks.onnx_parity`).
+
+Skipped unless torch, ONNX Runtime and the models are installed and in the local caches.
+"""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("optimum")
+huggingface_hub = pytest.importorskip("huggingface_hub")
+
+from benchmarks.fixtures import SOURCE_CHUNKS, TRANSLATED_CHUNKS  # noqa: E402
+from benchmarks.onnx_parity import load_texts, nllb_parity, vocoder_parity  # noqa: E402
+from desafio_hotmart.onnx_backend import ONNX_CACHE_DIR  # noqa: E402
+from desafio_hotmart.translate import NLLB_MODEL  # noqa: E402
+
+XTTS_MODEL = "tts_models/multilingual/multi-dataset/xtts_v2"
+SPEAKER = "data/raw/original_audio.wav"
+
+
+def parity_args(**kwargs) -> SimpleNamespace:
+    return SimpleNamespace(
+        cache_dir=ONNX_CACHE_DIR,
+        intra_op_threads=None,
+        inter_op_threads=None,
+        **kwargs,
+    )
+
+
+def test_nllb_onnx_matches_torch():
+    if not isinstance(
+        huggingface_hub.try_to_load_from_cache(NLLB_MODEL, "config.json"), str
+    ):
+        pytest.skip(f"{NLLB_MODEL} is not in the local Hugging Face cache")
+
+    reports = nllb_parity(
+        load_texts(SOURCE_CHUNKS, 5),
+        parity_args(quantize=True, max_wer=0.02, max_wer_int8=0.15),
+    )
+
+    assert [report["name"] for report in reports] == ["nllb:onnx", "nllb:onnx:int8"]
+    assert all(report["passed"] for report in reports), reports
+
+
+def test_xtts_onnx_vocoder_matches_torch():
+    generic_utils = pytest.importorskip("TTS.utils.generic_utils")
+    model_dir = os.path.join(
+        generic_utils.get_user_data_dir("tts"), XTTS_MODEL.replace("/", "--")
+    )
+    if not os.path.isdir(model_dir) or not os.path.isfile(SPEAKER):
+        pytest.skip("The XTTS model or the speaker audio is not available")
+
+    report = vocoder_parity(
+        load_texts(TRANSLATED_CHUNKS, 3), parity_args(speaker=SPEAKER, min_snr=40.0)
+    )
+
+    assert report["passed"], report
@@ -0,0 +1,69 @@
+import asyncio
+import datetime
+import email.utils
+import time
+
+import pytest
+
+from desafio_hotmart.rate_limit import TokenBucket, backoff_delay, parse_retry_after
+
+
+def test_token_bucket_allows_a_burst_up_to_capacity():
+    bucket = TokenBucket(rate=1, capacity=5)
+
+    async def acquire_all():
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(acquire_all()) < 0.1
+
+
+def test_token_bucket_waits_for_refill_when_empty():
+    bucket = TokenBucket(rate=20, capacity=1)
+
+    async def acquire_three():
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # Dois tokens a 20 por segundo: ~0.1 s
+    assert asyncio.run(acquire_three()) >= 0.09
+
+
+def test_token_bucket_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_backoff_delay_is_bounded_by_the_exponential_window():
+    for attempt in range(6):
+        assert (
+            0
+            <= backoff_delay(attempt, base=0.5, maximum=30)
+            <= min(30, 0.5 * 2**attempt)
+        )
+
+
+def test_backoff_delay_honours_retry_after_up_to_the_maximum():
+    assert backoff_delay(0, retry_after=3) == 3
+    assert backoff_delay(0, retry_after=120, maximum=30) == 30
+
+
+def test_parse_retry_after_in_seconds():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after(None) is None
+
+
+def test_parse_retry_after_http_date():
+    date = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=30)
+    delay = parse_retry_after(email.utils.format_datetime(date, usegmt=True))
+
+    assert 25 <= delay <= 30
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+
+
+def test_invalid_retry_after_falls_back_to_the_backoff():
+    assert parse_retry_after("soon") is None
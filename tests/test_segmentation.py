@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from desafio_hotmart.segmentation import SentenceSegmenter
+
+SAMPLE_RATE = 16000
+
+
+def chunk(start, end, text):
+    return dict(timestamp=[start, end], text=text)
+
+
+def test_fragments_are_merged_into_sentences():
+    segmenter = SentenceSegmenter(min_seconds=2, max_seconds=12)
+    segments = list(
+        segmenter.segment(
+            [
+                chunk(0, 1, " Oi,"),
+                chunk(1.1, 2.5, " tudo bem?"),
+                chunk(2.6, 5, " Hoje vamos falar de vendas."),
+            ]
+        )
+    )
+
+    assert [s["text"] for s in segments] == [
+        " Oi, tudo bem?",
+        " Hoje vamos falar de vendas.",
+    ]
+    assert segments[0]["source_chunks"] == [0, 1]
+    assert segments[0]["timestamp"] == [0, 2.5]
+    assert segmenter.stats()["reduction"] == pytest.approx(1 / 3)
+
+
+def test_long_pauses_are_not_merged():
+    segments = list(
+        SentenceSegmenter(max_gap_seconds=0.8).segment(
+            [chunk(0, 1, " Então"), chunk(3, 4, " vamos lá.")]
+        )
+    )
+
+    assert len(segments) == 2
+
+
+def test_long_chunks_are_split_at_sentences():
+    segments = list(
+        SentenceSegmenter(max_seconds=5).segment(
+            [chunk(0, 10, " Primeira frase aqui. Segunda frase aqui.")]
+        )
+    )
+
+    assert [s["text"] for s in segments] == [
+        " Primeira frase aqui.",
+        " Segunda frase aqui.",
+    ]
+    assert segments[0]["timestamp"][1] == segments[1]["timestamp"][0]
+
+
+def test_cuts_snap_to_the_quietest_frame():
+    samples = np.full(10 * SAMPLE_RATE, 0.5, dtype=np.float32)
+    # Silêncio entre 5.2 s e 5.3 s
+    samples[int(5.2 * SAMPLE_RATE) : int(5.3 * SAMPLE_RATE)] = 0
+    segments = list(
+        SentenceSegmenter(samples, max_seconds=5).segment(
+            [chunk(0, 10, " Primeira frase aqui. Segunda frase aqui.")]
+        )
+    )
+
+    assert 5.2 <= segments[0]["timestamp"][1] <= 5.3
+
+
+def test_a_cut_past_the_end_of_the_samples():
+    # O áudio termina antes do último timestamp do Whisper
+    samples = np.full(4 * SAMPLE_RATE, 0.5, dtype=np.float32)
+    segments = list(
+        SentenceSegmenter(samples, max_seconds=5).segment(
+            [chunk(0, 12, " Primeira frase aqui. Segunda frase aqui.")]
+        )
+    )
+
+    assert len(segments) == 2
+    # Sem áudio em volta do corte, fica o tempo proporcional ao texto
+    assert segments[0]["timestamp"][1] == pytest.approx(12 * 20 / 39, abs=1e-3)
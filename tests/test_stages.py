@@ -0,0 +1,38 @@
+import copy
+
+import pytest
+import yaml
+
+from desafio_hotmart.stages import build_stages
+
+
+@pytest.fixture
+def config():
+    with open("params.yaml") as f:
+        return yaml.safe_load(f)
+
+
+def stage_params(config, name):
+    return next(stage.params for stage in build_stages(config) if stage.name == name)
+
+
+@pytest.mark.parametrize(
+    "stage, section, key, value",
+    [
+        ("transcribe", "asr", "block_seconds", 10),
+        ("transcribe", "asr", "batch_size", 4),
+        ("transcribe", "asr", "vad_threshold_db", -30),
+        ("transcribe", "asr", "vad_min_silence_ms", 250),
+        ("transcribe", "asr", "compute_type", "float32"),
+        ("transcribe", "asr", "streaming", True),
+        ("tts", "tts", "model", "tts_models/en/ljspeech/vits"),
+        ("tts", "tts", "language", "es"),
+    ],
+)
+def test_the_params_of_a_stage_cover_the_settings_it_reads(
+    config, stage, section, key, value
+):
+    changed = copy.deepcopy(config)
+    changed[section][key] = value
+
+    assert stage_params(changed, stage) != stage_params(config, stage)
@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from desafio_hotmart.streaming import StreamingDubber
+
+
+class FakeTranslator:
+    context_chunks = 2
+
+    def __init__(self):
+        self.contexts = []
+
+    def translate_chunks(self, chunks, context=None):
+        self.contexts.append(list(context))
+        return dict(
+            chunks=[dict(chunk, text=chunk["text"].upper()) for chunk in chunks]
+        )
+
+
+class FakeTTS:
+    synthesizer = SimpleNamespace(sample_rate=100)
+
+    def __init__(self, n_workers=1):
+        self.n_workers = n_workers
+
+    def synthesize_chunks(self, texts):
+        return [np.zeros(10, dtype=np.float32) for _ in texts]
+
+    def fit_chunk(self, wav, source_speech_duration, source_total_duration, i=None):
+        return wav
+
+
+def test_each_translation_batch_gets_the_preceding_source_chunks():
+    translator = FakeTranslator()
+    dubber = StreamingDubber(
+        translator, FakeTTS(), queue_size=1, translate_batch_size=1
+    )
+
+    dubber.run(
+        {"timestamp": [i, i + 0.5], "text": text} for i, text in enumerate("abcd")
+    )
+
+    assert translator.contexts == [[], ["a"], ["a", "b"], ["b", "c"]]
+    assert [chunk["text"] for chunk in dubber.translated_chunks] == list("ABCD")
+
+
+def test_tts_worker_processes_are_rejected():
+    with pytest.raises(ValueError, match="n_workers"):
+        StreamingDubber(FakeTranslator(), FakeTTS(n_workers=2))
@@ -0,0 +1,109 @@
+import json
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from desafio_hotmart import synthesis
+from desafio_hotmart.text_to_speech import TextToSpeech
+
+TEXTS = ["um", "dois", "três", "dois", "cinco"]
+
+
+@pytest.fixture
+def make_tts(tmp_path):
+    transcript = tmp_path / "translation.json"
+    transcript.write_text(
+        json.dumps(
+            dict(
+                chunks=[
+                    dict(timestamp=[2.0 * i, 2.0 * i + 1.5], text=text)
+                    for i, text in enumerate(TEXTS)
+                ]
+            )
+        )
+    )
+    speaker = tmp_path / "speaker.wav"
+    sf.write(str(speaker), np.zeros(2400, dtype=np.float32), 24000)
+
+    def make_tts(**kwargs):
+        tts = TextToSpeech(
+            str(transcript),
+            str(tmp_path / "dubbed.wav"),
+            "google",
+            str(speaker),
+            batch_size=2,
+            **kwargs,
+        )
+        tts.calls = []
+
+        def synthesize_batch(texts):
+            tts.calls.append(list(texts))
+            return [np.full(2400, 0.1, dtype=np.float32) for _ in texts]
+
+        tts.synthesizer.synthesize_batch = synthesize_batch
+        return tts
+
+    return make_tts
+
+
+def test_on_audio_is_called_after_each_batch(make_tts):
+    tts = make_tts()
+    updates = []
+    tts.convert_chunks_to_speech(
+        on_audio=lambda audio, final_seconds: updates.append(
+            (final_seconds, len(tts.calls))
+        )
+    )
+
+    assert tts.calls == [["um", "dois"], ["três", "dois"], ["cinco"]]
+    # Cada atualização acontece antes da síntese do lote seguinte
+    assert updates == [(4.0, 1), (8.0, 2)]
+
+
+def test_cached_chunks_are_not_synthesized_again(make_tts, tmp_path):
+    cache_path = str(tmp_path / "audio.sqlite")
+    tts = make_tts(cache_path=cache_path)
+    wavs = tts.synthesize_chunks()
+
+    # "dois" se repete: só é sintetizado uma vez
+    assert tts.calls == [["um", "dois"], ["três", "cinco"]]
+    assert len(wavs) == len(TEXTS)
+
+    tts = make_tts(cache_path=cache_path)
+    batches = list(tts.iter_synthesize_chunks())
+    assert tts.calls == []
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
+class FakeExecutor:
+    """Runs the batches in the test process, recording how the pool was started."""
+
+    started = []
+
+    def __init__(self, max_workers, mp_context=None, initializer=None, initargs=()):
+        self.shut_down = False
+        FakeExecutor.started.append((max_workers, initargs[1], self))
+
+    def map(self, fn, batches):
+        return (
+            ([np.zeros(10, dtype=np.float32) for _ in batch], {}) for batch in batches
+        )
+
+    def shutdown(self, wait=True):
+        self.shut_down = True
+
+
+def test_the_worker_pool_is_kept_until_close(make_tts, monkeypatch):
+    FakeExecutor.started = []
+    monkeypatch.setattr(synthesis, "ProcessPoolExecutor", FakeExecutor)
+    monkeypatch.setattr(synthesis.os, "cpu_count", lambda: 8)
+    tts = make_tts(n_workers=4)
+
+    tts.synthesize_chunks()
+    tts.synthesize_chunks(TEXTS[:4])
+
+    # 3 lotes: um único pool, com 3 workers e as threads divididas entre eles
+    assert [(size, threads) for size, threads, _ in FakeExecutor.started] == [(3, 2)]
+    tts.close()
+    assert FakeExecutor.started[0][2].shut_down
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from desafio_hotmart.time_stretch import time_stretch
+
+SAMPLE_RATE = 16000
+
+
+def tone(seconds, frequency=220.0):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (0.5 * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+@pytest.mark.parametrize("rate", [1.1, 1.25, 1.5])
+def test_wsola_shortens_by_the_rate(rate):
+    wav = tone(2)
+    stretched = time_stretch(wav, rate, SAMPLE_RATE)
+
+    assert stretched.dtype == np.float32
+    assert len(stretched) == pytest.approx(len(wav) / rate, rel=0.02)
+
+
+def test_wsola_keeps_the_pitch():
+    stretched = time_stretch(tone(2, 440), 1.25, SAMPLE_RATE)
+    spectrum = np.abs(np.fft.rfft(stretched))
+    peak = np.argmax(spectrum) * SAMPLE_RATE / len(stretched)
+
+    assert peak == pytest.approx(440, rel=0.02)
+
+
+def test_invalid_backend_and_rate():
+    with pytest.raises(ValueError, match="Invalid time-stretch backend"):
+        time_stretch(tone(0.1), 1.2, SAMPLE_RATE, backend="rubberband")
+    with pytest.raises(ValueError):
+        time_stretch(tone(0.1), 0, SAMPLE_RATE)
+
+
+@pytest.mark.parametrize("rate", [1.1, 1.25])
+def test_wsola_splices_a_tone_in_phase(rate):
+    wav = tone(2)
+    stretched = time_stretch(wav, rate, SAMPLE_RATE)[
+        SAMPLE_RATE // 10 : -SAMPLE_RATE // 10
+    ]
+
+    # As emendas seguem a fase do tom: nenhum salto maior que a variação natural entre dois samples
+    assert np.abs(np.diff(stretched)).max() <= 1.1 * np.abs(np.diff(wav)).max()
@@ -0,0 +1,38 @@
+import numpy as np
+import soundfile as sf
+
+from desafio_hotmart.timeline import AudioTimeline
+
+
+def test_chunks_are_written_at_their_sample_offset():
+    timeline = AudioTimeline(2, 10)
+    placed = timeline.write(0.5, np.ones(3, dtype=np.float32))
+
+    assert placed == 0.5
+    assert len(timeline.samples) == 20
+    np.testing.assert_array_equal(np.nonzero(timeline.samples)[0], [5, 6, 7])
+
+
+def test_an_overflowing_chunk_pushes_the_next_one():
+    timeline = AudioTimeline(2, 10)
+    timeline.write(0, np.ones(8, dtype=np.float32))
+
+    assert timeline.write(0.5, np.ones(2, dtype=np.float32)) == 0.8
+
+
+def test_the_buffer_grows_past_the_expected_duration():
+    timeline = AudioTimeline(1, 10)
+    timeline.write(0.5, np.ones(20, dtype=np.float32))
+
+    assert timeline.duration_seconds == 2.5
+
+
+def test_export_clips_to_16_bit(tmp_path):
+    timeline = AudioTimeline(1, 100)
+    timeline.write(0, np.full(10, 2.0, dtype=np.float32))
+    path = str(tmp_path / "out.wav")
+    timeline.export(path)
+
+    samples, sample_rate = sf.read(path, dtype="int16")
+    assert sample_rate == 100
+    assert samples.max() == 32767
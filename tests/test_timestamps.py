@@ -0,0 +1,62 @@
+import numpy as np
+
+from desafio_hotmart.timestamps import (
+    bounds_timing,
+    chunk_timing,
+    is_absolute_timeline,
+    normalize_chunks,
+)
+
+
+def chunks(*timestamps):
+    return [dict(timestamp=list(ts), text="uma frase curta") for ts in timestamps]
+
+
+def test_window_resets_are_shifted_by_the_previous_end():
+    normalized = normalize_chunks(chunks((0, 10), (10, 29.5), (0, 8), (8, 20)))
+
+    assert [c["timestamp"] for c in normalized] == [
+        [0, 10],
+        [10, 29.5],
+        [29.5, 37.5],
+        [37.5, 49.5],
+    ]
+
+
+def test_known_window_offsets_take_precedence():
+    normalized = normalize_chunks(
+        chunks((0, 10), (10, 28), (0, 8)), window_offsets=[0, 30]
+    )
+
+    assert normalized[2]["timestamp"] == [30, 38]
+
+
+def test_missing_end_is_filled_with_the_next_start_or_the_total_duration():
+    normalized = normalize_chunks(chunks((0, None), (4, None)), total_duration=9)
+
+    assert [c["timestamp"] for c in normalized] == [[0, 4], [4, 9]]
+
+
+def test_absolute_chunks_are_unchanged():
+    original = chunks((0, 2), (3, 5), (6, 8))
+    assert normalize_chunks(original) == original
+
+
+def test_chunk_timing():
+    timing = chunk_timing(chunks((0, 2), (3, 5), (5.5, 8)))
+
+    np.testing.assert_allclose(timing["gaps"], [1, 0.5, 0])
+    np.testing.assert_allclose(timing["speech_durations"], [2, 2, 2.5])
+    np.testing.assert_allclose(timing["total_durations"], [3, 2.5, 2.5])
+
+
+def test_is_absolute_timeline():
+    assert is_absolute_timeline(np.array([0.0, 3]), np.array([2.0, 5]))
+    # Reinício de janela e fim ausente
+    assert not is_absolute_timeline(np.array([0.0, 1]), np.array([2.0, 5]))
+    assert not is_absolute_timeline(np.array([0.0, 3]), np.array([2.0, np.nan]))
+
+
+def test_bounds_timing_of_an_empty_timeline():
+    timing = bounds_timing(np.zeros(0), np.zeros(0))
+    assert len(timing["total_durations"]) == 0
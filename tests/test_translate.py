@@ -0,0 +1,182 @@
+import contextlib
+from types import SimpleNamespace
+
+import pytest
+
+from desafio_hotmart import translate
+from desafio_hotmart.translate import EmptyResponseError, Translator, pack_windows
+
+TEXTS = ["a", "b", "c", "d", "e"]
+
+
+def test_pack_windows_respects_the_budgets():
+    assert pack_windows(["x" * 40] * 5, max_tokens=40, max_chunks=10) == [
+        [0, 1],
+        [2, 3],
+        [4],
+    ]
+    assert pack_windows(["x"] * 5, max_tokens=100, max_chunks=2) == [
+        [0, 1],
+        [2, 3],
+        [4],
+    ]
+
+
+@pytest.fixture
+def translator(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "stub")
+    translator = Translator(
+        None,
+        "openai",
+        str(tmp_path / "out.json"),
+        str(tmp_path / "out.txt"),
+        cache_path=str(tmp_path / "cache.sqlite"),
+        packed=True,
+        base_url="http://127.0.0.1:9/v1",
+    )
+    translator.windows = []
+    translator.singles = []
+
+    async def translate_window_async(client, chunks, context, rate_limiter=None):
+        translator.windows.append((list(chunks), context))
+        # O chunk "d" nunca vem na resposta empacotada
+        return (
+            {id_: f"[en] {text}" for id_, text in chunks.items() if text != "d"},
+            0.0,
+            0,
+        )
+
+    async def translate_with_openai_async(client, text, rate_limiter=None):
+        translator.singles.append(text)
+        return f"[single] {text}", 0.0, 0
+
+    translator.translate_window_async = translate_window_async
+    translator.translate_with_openai_async = translate_with_openai_async
+    return translator
+
+
+def chunks(texts):
+    return [dict(timestamp=(i, i + 1), text=text) for i, text in enumerate(texts)]
+
+
+def test_packed_windows_and_context_come_from_every_chunk(translator):
+    translator.cache.put_translations([(translator._cache_key("b"), "[en] b")])
+
+    translated = translator.translate_chunks(chunks(TEXTS))
+
+    # A janela não atravessa o chunk em cache, que continua no contexto
+    assert translator.windows[:2] == [(["0"], []), (["2", "3", "4"], ["a", "b"])]
+    # Nova tentativa só com o chunk ausente, com o seu próprio contexto
+    assert translator.windows[2] == (["3"], ["a", "b", "c"])
+    assert [chunk["text"] for chunk in translated["chunks"]] == [
+        "[en] a",
+        "[en] b",
+        "[en] c",
+        "[single] d",
+        "[en] e",
+    ]
+
+
+def test_fallback_translations_are_cached_under_the_single_chunk_key(translator):
+    translator.translate_chunks(chunks(TEXTS))
+
+    cache = translator.cache
+    assert cache.get_translations([translator._cache_key("d", packed=False)])
+    assert not cache.get_translations([translator._cache_key("d")])
+
+    translator.windows, translator.singles = [], []
+    translated = translator.translate_chunks(chunks(TEXTS))
+    assert translator.windows == [] and translator.singles == []
+    assert translated["chunks"][3]["text"] == "[single] d"
+
+
+def test_nllb_cache_keys_depend_on_the_backend_and_quantization(tmp_path):
+    keys = {
+        Translator(
+            None,
+            "nllb",
+            None,
+            None,
+            cache_path=str(tmp_path / "cache.sqlite"),
+            backend=backend,
+            quantize=quantize,
+        )._cache_key("Olá")
+        for backend in ("torch", "onnx")
+        for quantize in (False, True)
+    }
+    assert len(keys) == 4
+
+
+def test_packed_cache_keys_depend_on_the_packed_model(translator):
+    default_key = translator._cache_key("Olá")
+
+    translator.packed_model = "gpt-4o-mini"
+
+    assert translator._cache_key("Olá") != default_key
+    assert translator._cache_key("Olá", packed=False) != translator._cache_key("Olá")
+
+
+def test_the_context_of_a_stream_precedes_the_first_window(translator):
+    translator.translate_chunks(chunks(["c", "e"]), context=["x", "a", "b"])
+
+    assert translator.windows[0] == (["3", "4"], ["x", "a", "b"])
+
+
+def test_the_context_is_cut_to_context_chunks(translator):
+    translator.context_chunks = 2
+
+    translated = translator.translate_chunks(chunks(["c"]), context=["x", "a", "b"])
+
+    assert translator.windows == [(["2"], ["a", "b"])]
+    assert translated["chunks"][0]["text"] == "[en] c"
+
+
+class FakeCompletions:
+    def __init__(self, contents):
+        self.contents = list(contents)
+        self.requests = 0
+
+    async def create(self, **kwargs):
+        self.requests += 1
+        content = self.contents.pop(0)
+        return SimpleNamespace(
+            model_dump=lambda: {"choices": [{"message": {"content": content}}]}
+        )
+
+
+@pytest.fixture
+def openai_translator(tmp_path, monkeypatch):
+    monkeypatch.setattr(translate, "backoff_delay", lambda *args, **kwargs: 0)
+    translator = Translator(
+        None, "openai", str(tmp_path / "out.json"), str(tmp_path / "out.txt")
+    )
+
+    def use_responses(*contents):
+        completions = FakeCompletions(contents)
+        client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+        @contextlib.asynccontextmanager
+        async def async_openai_client():
+            yield client
+
+        translator._async_openai_client = async_openai_client
+        return completions
+
+    translator.use_responses = use_responses
+    return translator
+
+
+def test_the_sequential_path_retries_empty_messages(openai_translator):
+    completions = openai_translator.use_responses(None, " ", "Hello", "World")
+
+    assert openai_translator.translate_texts(["Olá", "Mundo"]) == ["Hello", "World"]
+    assert completions.requests == 4
+    assert openai_translator.stats["retries"] == 2
+
+
+def test_a_message_still_empty_after_the_retries_raises(openai_translator):
+    openai_translator.max_retries = 1
+    openai_translator.use_responses(None, "")
+
+    with pytest.raises(EmptyResponseError):
+        openai_translator.translate_with_openai("Olá")
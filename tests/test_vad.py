@@ -0,0 +1,78 @@
+import numpy as np
+
+from desafio_hotmart.vad import EnergyVAD
+
+SAMPLE_RATE = 16000
+
+
+def audio(*parts):
+    """
+    Concatenate (seconds, is_speech) parts: a 0.5 amplitude tone for speech, silence otherwise.
+    """
+    rng = np.random.default_rng(0)
+    return np.concatenate(
+        [
+            (
+                0.5 * rng.uniform(-1, 1, int(seconds * SAMPLE_RATE))
+                if speech
+                else np.zeros(int(seconds * SAMPLE_RATE))
+            ).astype(np.float32)
+            for seconds, speech in parts
+        ]
+    )
+
+
+def blocks(samples, block_seconds):
+    size = int(block_seconds * SAMPLE_RATE)
+    return [samples[i : i + size] for i in range(0, len(samples), size)]
+
+
+def test_frame_levels_of_fewer_samples_than_a_frame():
+    vad = EnergyVAD(SAMPLE_RATE)
+
+    assert len(vad.frame_levels(np.zeros(100, dtype=np.float32))) == 0
+    assert len(vad.frame_levels(np.zeros(0, dtype=np.float32))) == 0
+
+
+def test_a_trailing_block_shorter_than_a_frame():
+    samples = audio((1, False), (2, True), (27, False))
+    tail = np.zeros(100, dtype=np.float32)
+
+    segments = list(EnergyVAD(SAMPLE_RATE).segments([samples, tail]))
+
+    assert len(segments) == 1
+
+
+def test_segments_are_split_on_silence_with_absolute_starts():
+    samples = audio((1, False), (2, True), (1, False), (1.5, True), (1, False))
+
+    segments = list(EnergyVAD(SAMPLE_RATE).segments(blocks(samples, 0.7)))
+
+    assert len(segments) == 2
+    # O padding de 200 ms antecede o início da fala
+    assert abs(segments[0][0] - 0.8) < 0.05
+    assert abs(segments[1][0] - 3.8) < 0.05
+    assert abs(len(segments[1][1]) / SAMPLE_RATE - 1.9) < 0.1
+
+
+def test_the_result_does_not_depend_on_the_block_size():
+    samples = audio((0.5, False), (3, True), (0.7, False), (0.4, True), (2, False))
+
+    expected = list(EnergyVAD(SAMPLE_RATE).segments([samples]))
+    for block_seconds in (0.05, 0.5, 1.3):
+        result = list(EnergyVAD(SAMPLE_RATE).segments(blocks(samples, block_seconds)))
+        assert [start for start, _ in result] == [start for start, _ in expected]
+        for (_, a), (_, b) in zip(result, expected):
+            np.testing.assert_array_equal(a, b)
+
+
+def test_long_speech_is_cut_below_the_maximum_length():
+    samples = audio((40, True))
+
+    segments = list(
+        EnergyVAD(SAMPLE_RATE, max_segment_seconds=10).segments(blocks(samples, 3))
+    )
+
+    assert len(segments) >= 4
+    assert all(len(wav) <= 10 * SAMPLE_RATE for _, wav in segments)
+    assert sum(len(wav) for _, wav in segments) == len(samples)